@@ -1,19 +1,18 @@
 # app/core/ai_text_engine.py
+import json
+import re
 from datetime import datetime
-from typing import Optional
-import os
+from typing import Dict, List, Optional
 
-from dotenv import load_dotenv
-from openai import OpenAI
+from app.core.llm_gateway import (
+    get_gateway,
+    CALL_SITE_NOTIFICATION,
+    CALL_SITE_NOTIFICATION_BATCH,
+    CALL_SITE_NOTIFICATION_VARIANTS,
+)
+from app.core.tracing import get_logger
 
-# ---------- Load API key from .env ----------
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY is not set in .env file")
-
-client = OpenAI(api_key=api_key)
+log = get_logger("ai_text_engine")
 
 # ---------- Notification Types ----------
 NOTIF_TYPE_MORNING = "morning_summary"
@@ -27,9 +26,12 @@ def _build_prompt(
     user_name: str,
     health_summary: Optional[str] = None,
     hours_since_last_talk: Optional[int] = None,
+    variants: Optional[int] = None,
 ) -> str:
     """
     Build prompt for generating notification text using GPT
+    (or `variants` alternative texts as a JSON list, see
+    request_notification_variants)
     """
 
     # Health status description text (if not available, use simple default)
@@ -38,7 +40,7 @@ def _build_prompt(
     base = f"""
 You are Sedi, a warm and caring intelligent health companion.
 You ALWAYS speak directly to the user using their name: {user_name}.
-You must output ONLY the notification message text, no explanations.
+{"You must output ONLY JSON, no explanations." if variants else "You must output ONLY the notification message text, no explanations."}
 
 Language:
 - If language='fa' → write fully in Persian (Farsi), friendly, natural, and short.
@@ -96,10 +98,18 @@ Create a short friendly notification.
 
     base += f"\nRemember: write the final message in language code='{language}'."
 
+    if variants:
+        base += f"""
+
+Write {variants} clearly different versions of this notification.
+Keep the placeholder {user_name} exactly as written wherever the user's name goes; it is replaced later.
+Output: {{"variants": ["<version 1>", "<version 2>", ...]}}
+"""
+
     return base.strip()
 
 
-def generate_notification_text(
+def request_notification_text(
     *,
     language: str,
     notification_type: str,
@@ -108,14 +118,10 @@ def generate_notification_text(
     hours_since_last_talk: Optional[int] = None,
 ) -> str:
     """
-    تولید متن نوتیف هوشمند با توجه به:
-    - language: 'fa' | 'en' | 'ar'
-    - notification_type: یکی از ثابت‌های بالا
-    - user_name: نام کاربر
-    - health_summary: خلاصه وضعیت سلامت (رشتهٔ کوتاه)
-    - hours_since_last_talk: چند ساعت از آخرین تعامل گذشته
+    Same as generate_notification_text(), but errors (rate limits,
+    timeouts, ...) are raised instead of replaced by the fallback text,
+    so callers can retry.
     """
-
     prompt = _build_prompt(
         language=language,
         notification_type=notification_type,
@@ -124,33 +130,267 @@ def generate_notification_text(
         hours_since_last_talk=hours_since_last_talk,
     )
 
+    return get_gateway().complete(
+        [
+            {
+                "role": "system",
+                "content": "You generate short, warm notification messages for the Sedi health assistant.",
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            },
+        ],
+        call_site=CALL_SITE_NOTIFICATION,
+        model="gpt-4.1-mini",  # Lightweight model for notifications
+        max_tokens=80,
+        temperature=0.8,
+    )
+
+
+# ---------- Batch mode ----------
+# One request for many users: the shared instructions are sent once and
+# the model answers with a JSON object holding one message per user id.
+BATCH_MAX_MESSAGE_CHARS = 400   # Longer entries are treated as malformed
+BATCH_TOKENS_PER_USER = 120     # Persian/Arabic text needs more tokens than English
+
+_BATCH_TYPE_CONTEXT = {
+    NOTIF_TYPE_MORNING: (
+        "MORNING greeting. The user just woke up. Briefly mention their general "
+        "health status and ask a gentle question like \"how are you feeling today?\"."
+    ),
+    NOTIF_TYPE_HEALTH_CHECK: (
+        "HEALTH CHECK in the middle of the day. Give a tiny piece of advice "
+        "(drink water, rest a bit, walk, ...) based on the health context."
+    ),
+    NOTIF_TYPE_INACTIVE: (
+        "INACTIVITY ping. The user has not talked to you for hours_since_last_talk "
+        "hours. You miss them: gently check in and invite them to say a simple word."
+    ),
+}
+
+
+def _build_batch_prompt(requests: List[Dict[str, any]]) -> str:
+    """
+    Prompt for many users at once (same fields as request_notification_text);
+    users are identified by their position in `requests`.
+    """
+    users = []
+    for index, request in enumerate(requests):
+        language = request.get("language")
+        user = {
+            "id": index,
+            "name": request.get("user_name") or "my friend",
+            "language": language if language in ("fa", "ar", "en") else "en",
+            "type": request.get("notification_type"),
+            "health": request.get("health_summary") or "No critical health issues detected recently.",
+        }
+        if request.get("notification_type") == NOTIF_TYPE_INACTIVE:
+            user["hours_since_last_talk"] = request.get("hours_since_last_talk") or 3
+        users.append(user)
+
+    types = []
+    for user in users:
+        if user["type"] not in types:
+            types.append(user["type"])
+    type_lines = "\n".join(
+        f"- {notification_type}: {_BATCH_TYPE_CONTEXT.get(notification_type, 'Generic friendly check-in.')}"
+        for notification_type in types
+    )
+
+    return f"""
+You are Sedi, a warm and caring intelligent health companion.
+Write one notification message for EACH user in the list below.
+
+Every message:
+- Speaks directly to the user using their name.
+- Is written fully in the user's language: 'fa' = Persian (Farsi), 'ar' = Arabic, 'en' = English.
+- Is 1–2 short sentences (max 180 characters), friendly and natural, with at most 1 emoji.
+- Sounds caring and alive, like a real companion, not like a robot.
+- Uses the user's health context where it fits.
+
+Notification types:
+{type_lines}
+
+Users:
+{json.dumps(users, ensure_ascii=False)}
+
+Output ONLY a JSON object, no explanations:
+{{"messages": [{{"id": <user id>, "text": "<notification message>"}}, ...]}}
+with exactly one entry per user id.
+""".strip()
+
+
+def parse_batch_response(content: str, count: int) -> List[Optional[str]]:
+    """
+    Messages by user position from a batch reply. Entries that are
+    missing or malformed are None; everything is None if the reply is
+    not valid JSON.
+    """
+    texts: List[Optional[str]] = [None] * count
+    content = re.sub(r"^```(?:json)?\s*|\s*```$", "", (content or "").strip())
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4.1-mini",  # Lightweight model for notifications
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You generate short, warm notification messages for the Sedi health assistant.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
-            max_tokens=80,
-            temperature=0.8,
-        )
+        payload = json.loads(content)
+    except ValueError:
+        return texts
+
+    entries = payload.get("messages") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return texts
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index, text = entry.get("id"), entry.get("text")
+        if isinstance(index, str) and index.isdigit():
+            index = int(index)
+        if not isinstance(index, int) or not 0 <= index < count:
+            continue
+        if isinstance(text, str) and text.strip() and len(text) <= BATCH_MAX_MESSAGE_CHARS:
+            texts[index] = text.strip()
+    return texts
+
+
+def request_notification_texts(requests: List[Dict[str, any]]) -> List[Optional[str]]:
+    """
+    Batch version of request_notification_text(): one LLM call for all
+    `requests` (dicts of its keyword arguments). Returns texts in request
+    order; None where the reply had no usable message, so the caller can
+    fall back to per-user calls. Call errors are raised.
+    """
+    if not requests:
+        return []
+
+    content = get_gateway().complete(
+        [
+            {
+                "role": "system",
+                "content": "You generate short, warm notification messages for the Sedi health assistant. You always answer with JSON.",
+            },
+            {
+                "role": "user",
+                "content": _build_batch_prompt(requests),
+            },
+        ],
+        call_site=CALL_SITE_NOTIFICATION_BATCH,
+        model="gpt-4.1-mini",  # Lightweight model for notifications
+        max_tokens=BATCH_TOKENS_PER_USER * len(requests) + 50,
+        temperature=0.8,
+        response_format={"type": "json_object"},
+    )
+
+    texts = parse_batch_response(content, len(requests))
+    missing = sum(text is None for text in texts)
+    if missing:
+        log.warning("notification_batch_incomplete", batch_size=len(requests), missing=missing)
+    return texts
 
-        text = completion.choices[0].message.content.strip()
-        return text
+
+# ---------- Variant mode ----------
+# Reusable texts with a name placeholder, cached per (language, type,
+# health bucket) by app/core/notification_variants.py
+VARIANT_NAME_PLACEHOLDER = "{name}"
+
+
+def request_notification_variants(
+    *,
+    count: int,
+    language: str,
+    notification_type: str,
+    health_summary: Optional[str] = None,
+    hours_since_last_talk: Optional[int] = None,
+) -> List[str]:
+    """
+    `count` alternative notification texts in one LLM call, each with
+    VARIANT_NAME_PLACEHOLDER where the user's name goes. Texts without
+    the placeholder or that are too long are dropped, so fewer than
+    `count` may be returned. Call errors are raised.
+    """
+    prompt = _build_prompt(
+        language=language,
+        notification_type=notification_type,
+        user_name=VARIANT_NAME_PLACEHOLDER,
+        health_summary=health_summary,
+        hours_since_last_talk=hours_since_last_talk,
+        variants=count,
+    )
+
+    content = get_gateway().complete(
+        [
+            {
+                "role": "system",
+                "content": "You generate short, warm notification messages for the Sedi health assistant. You always answer with JSON.",
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            },
+        ],
+        call_site=CALL_SITE_NOTIFICATION_VARIANTS,
+        model="gpt-4.1-mini",  # Lightweight model for notifications
+        max_tokens=BATCH_TOKENS_PER_USER * count + 50,
+        temperature=1.0,  # Variety between the versions
+        response_format={"type": "json_object"},
+    )
+
+    content = re.sub(r"^```(?:json)?\s*|\s*```$", "", (content or "").strip())
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return []
+    entries = payload.get("variants") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return []
+
+    texts = []
+    for text in entries:
+        if (
+            isinstance(text, str)
+            and text.count(VARIANT_NAME_PLACEHOLDER) == 1
+            and len(text) <= BATCH_MAX_MESSAGE_CHARS
+            and text.strip() not in texts
+        ):
+            texts.append(text.strip())
+    return texts
+
+
+def fallback_notification_text(language: str) -> str:
+    """Static text used when GPT is unavailable"""
+    fallback = {
+        "fa": "هی جواد، امیدوارم حالت خوب باشه. هر وقت خواستی در مورد حالت باهام حرف بزن 🌿",
+        "ar": "مرحباً، أتمنى أن تكون بخير. أنا هنا إذا أحببت أن تتحدث عن حالتك 🌿",
+        "en": "Hey, I hope you're doing okay. I'm here anytime you want to talk about how you feel 🌿",
+    }
+    return fallback.get(language, fallback["en"])
+
+
+def generate_notification_text(
+    *,
+    language: str,
+    notification_type: str,
+    user_name: str,
+    health_summary: Optional[str] = None,
+    hours_since_last_talk: Optional[int] = None,
+) -> str:
+    """
+    تولید متن نوتیف هوشمند با توجه به:
+    - language: 'fa' | 'en' | 'ar'
+    - notification_type: یکی از ثابت‌های بالا
+    - user_name: نام کاربر
+    - health_summary: خلاصه وضعیت سلامت (رشتهٔ کوتاه)
+    - hours_since_last_talk: چند ساعت از آخرین تعامل گذشته
+    """
+    try:
+        return request_notification_text(
+            language=language,
+            notification_type=notification_type,
+            user_name=user_name,
+            health_summary=health_summary,
+            hours_since_last_talk=hours_since_last_talk,
+        )
 
     except Exception as e:
         print(f"[AI_TEXT_ENGINE ERROR] {e}")
 
         # Fallback if GPT is unavailable
-        fallback = {
-            "fa": "هی جواد، امیدوارم حالت خوب باشه. هر وقت خواستی در مورد حالت باهام حرف بزن 🌿",
-            "ar": "مرحباً، أتمنى أن تكون بخير. أنا هنا إذا أحببت أن تتحدث عن حالتك 🌿",
-            "en": "Hey, I hope you're doing okay. I'm here anytime you want to talk about how you feel 🌿",
-        }
-        return fallback.get(language, fallback["en"])
+        return fallback_notification_text(language)
@@ -14,12 +14,13 @@ Architecture:
 """
 
 from .brain import ConversationBrain
-from .stages import ConversationStage, get_stage, transition_stage
+from .stages import ConversationStage, get_stage, stage_for_count, transition_stage
 
 __all__ = [
     'ConversationBrain',
     'ConversationStage',
     'get_stage',
+    'stage_for_count',
     'transition_stage',
 ]
 
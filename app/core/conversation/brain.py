@@ -13,13 +13,18 @@ RESPONSIBILITY:
 - NO hardcoded text
 """
 
-from typing import Dict, Optional
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.core.conversation.stages import ConversationStage, get_stage, transition_stage
 from app.core.conversation.memory import ConversationMemory
 from app.core.conversation.context import ConversationContext
-from app.core.conversation.prompts import ConversationPrompts
-from app.models import User
+from app.core.conversation.prompts import ConversationPrompts, StreamingReplyFilter
+from app.core.llm_gateway import get_gateway, CALL_SITE_GREETING
+from app.core.tracing import phase, record_phase, get_logger
+
+log = get_logger("brain")
 
 
 class ConversationBrain:
@@ -47,6 +52,12 @@ class ConversationBrain:
         5. Check for stage transition
         6. Return response with metadata
         
+        Database access is limited to one snapshot load (see
+        ConversationMemory.load_snapshot) and the memory insert.
+        
+        Each step is timed as a tracing phase (snapshot, stage, context,
+        llm, save, transition) and shows up in the Server-Timing header.
+        
         Args:
             user_id: User ID
             user_message: User's message
@@ -58,14 +69,122 @@ class ConversationBrain:
             - stage: Current conversation stage
             - metadata: Optional metadata (tone, intent, etc.)
         """
-        # TEMP DEBUG: Log entry
-        print(f"[BRAIN DEBUG] ===== PROCESSING MESSAGE =====")
-        print(f"[BRAIN DEBUG] user_id={user_id}, message={user_message[:50]}...")
-        
-        # Validate user exists
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user:
-            print(f"[BRAIN DEBUG] ERROR: User not found")
+        turn = self._prepare_turn(user_id, user_message)
+        if "error" in turn:
+            return turn
+        
+        # Generate response with engagement-aware prompts
+        with phase("llm"):
+            sedi_response = self.prompts.generate_response(
+                turn["context"], 
+                user_message,
+                turn["engagement_level"]
+            )
+        log.debug("response_generated", user_id=user_id, length=len(sedi_response))
+        
+        return self._finish_turn(turn, sedi_response)
+    
+    async def aprocess_message(
+        self,
+        user_id: int,
+        user_message: str
+    ) -> Dict[str, any]:
+        """
+        Async variant of process_message().
+        
+        Same flow, but the LLM call is awaited on the async client and the
+        (short) database phases run in a worker thread, so the event loop
+        is never blocked by either.
+        """
+        turn = await asyncio.to_thread(self._prepare_turn, user_id, user_message)
+        if "error" in turn:
+            return turn
+        
+        with phase("llm"):
+            sedi_response = await self.prompts.agenerate_response(
+                turn["context"],
+                user_message,
+                turn["engagement_level"]
+            )
+        log.debug("response_generated", user_id=user_id, length=len(sedi_response))
+        
+        return await asyncio.to_thread(self._finish_turn, turn, sedi_response)
+    
+    async def astream_message(
+        self,
+        user_id: int,
+        user_message: str,
+        session_factory: Optional[Callable[[], Session]] = None
+    ) -> AsyncIterator[Dict[str, any]]:
+        """
+        Streaming variant of aprocess_message().
+        
+        Yields events:
+        - {"event": "token", "delta": "..."} for each post-processed chunk
+        - {"event": "done", ...process_message() result} once the reply
+          is complete and saved to memory
+        - {"event": "error", ...} if the user does not exist
+        
+        With `session_factory` the reply is saved on a new short session
+        from it instead of self.db (a stream outlives its request).
+        """
+        turn = await asyncio.to_thread(self._prepare_turn, user_id, user_message)
+        if "error" in turn:
+            yield {"event": "error", **turn}
+            return
+        
+        reply = StreamingReplyFilter()
+        deltas = self.prompts.astream_response(
+            turn["context"],
+            user_message,
+            turn["engagement_level"]
+        )
+        started = time.perf_counter()
+        first_token_ms = None
+        try:
+            async for delta in deltas:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000.0
+                    record_phase("llm_first_token", first_token_ms)
+                chunk = reply.feed(delta)
+                if chunk:
+                    yield {"event": "token", "delta": chunk}
+                if reply.done:
+                    break
+        finally:
+            await deltas.aclose()
+            record_phase("llm", (time.perf_counter() - started) * 1000.0)
+        
+        sedi_response = reply.result()
+        log.debug(
+            "response_streamed",
+            user_id=user_id,
+            length=len(sedi_response),
+            first_token_ms=round(first_token_ms, 1) if first_token_ms is not None else None,
+        )
+        
+        if session_factory is None:
+            result = await asyncio.to_thread(self._finish_turn, turn, sedi_response)
+        else:
+            result = await asyncio.to_thread(self._finish_turn_in_session, session_factory, turn, sedi_response)
+        yield {"event": "done", **result}
+    
+    def _prepare_turn(self, user_id: int, user_message: str) -> Dict[str, any]:
+        """
+        Steps 1-2 of the flow (everything before the LLM call).
+        
+        Returns:
+            Dict with user_id, user_message, current_stage, memory_count,
+            context and engagement_level - or the error response if the
+            user does not exist.
+        """
+        log.debug("turn_started", user_id=user_id, message_length=len(user_message))
+        
+        # Load user + conversation state in one snapshot (validates user exists)
+        with phase("snapshot"):
+            snapshot = self.memory.load_snapshot(user_id)
+        if snapshot is None:
+            log.info("user_not_found", user_id=user_id)
             return {
                 "message": self._get_error_message("user_not_found"),
                 "language": self.language,
@@ -73,50 +192,83 @@ class ConversationBrain:
                 "error": "User not found"
             }
         
+        memory_count = snapshot["conversation_count"]
+        
         # Get current stage (BEFORE save - to know where we are)
-        current_stage = get_stage(user_id, self.db)
-        print(f"[BRAIN DEBUG] Current stage: {current_stage.value}")
+        with phase("stage"):
+            current_stage = get_stage(user_id, self.db, memory_count=memory_count)
         
         # Build context (BEFORE save - includes previous state)
-        context = ConversationContext(
+        with phase("context"):
+            context = ConversationContext(
+                user_id=user_id,
+                stage=current_stage,
+                memory=self.memory,
+                user_message=user_message,
+                snapshot=snapshot
+            )
+            context_data = context.build()
+            
+            # Determine engagement level (minimal logic - selection only)
+            engagement_level = self._determine_engagement_level(context_data)
+        # Read-only so far: end the transaction so the pooled connection is
+        # not held while the LLM call is awaited (context_data is plain data)
+        self.db.rollback()
+        log.debug(
+            "turn_prepared",
             user_id=user_id,
-            stage=current_stage,
-            memory=self.memory,
-            user_message=user_message
+            stage=current_stage.value,
+            conversation_count=context_data.get("conversation_count", 0),
+            engagement_level=engagement_level,
         )
-        context_data = context.build()
-        print(f"[BRAIN DEBUG] Context built - conversation_count={context_data.get('conversation_count', 0)}")
-        
-        # Determine engagement level (minimal logic - selection only)
-        engagement_level = self._determine_engagement_level(context_data)
-        print(f"[BRAIN DEBUG] Engagement level: {engagement_level}")
         
-        # Generate response with engagement-aware prompts
-        sedi_response = self.prompts.generate_response(
-            context_data, 
-            user_message,
-            engagement_level
-        )
-        print(f"[BRAIN DEBUG] Response generated (length={len(sedi_response)})")
+        return {
+            "user_id": user_id,
+            "user_message": user_message,
+            "current_stage": current_stage,
+            "memory_count": memory_count,
+            "context": context_data,
+            "engagement_level": engagement_level,
+        }
+    
+    def _finish_turn_in_session(
+        self,
+        session_factory: Callable[[], Session],
+        turn: Dict[str, any],
+        sedi_response: str
+    ) -> Dict[str, any]:
+        """_finish_turn() on a session of its own, closed right after the save"""
+        with session_factory() as db:
+            return ConversationBrain(db, language=self.language)._finish_turn(turn, sedi_response)
+    
+    def _finish_turn(self, turn: Dict[str, any], sedi_response: str) -> Dict[str, any]:
+        """Steps 4-6 of the flow (everything after the LLM call)"""
+        user_id = turn["user_id"]
         
         # CRITICAL FIX: Save conversation to memory BEFORE checking stage transition
         # This ensures memory_count is updated for next request
-        self.memory.save_conversation(
-            user_id=user_id,
-            user_message=user_message,
-            sedi_response=sedi_response,
-            language=self.language
-        )
+        with phase("save"):
+            self.memory.save_conversation(
+                user_id=user_id,
+                user_message=turn["user_message"],
+                sedi_response=sedi_response,
+                language=self.language
+            )
         
         # Check for stage transition (AFTER save - uses updated memory_count)
-        new_stage = transition_stage(current_stage, user_id, self.db)
-        print(f"[BRAIN DEBUG] New stage: {new_stage.value}")
-        print(f"[BRAIN DEBUG] ===== MESSAGE PROCESSED =====")
+        with phase("transition"):
+            new_stage = transition_stage(
+                turn["current_stage"],
+                user_id,
+                self.db,
+                memory_count=turn["memory_count"] + 1
+            )
+        log.debug("turn_finished", user_id=user_id, stage=new_stage.value)
         
         # Build metadata
         metadata = {
             "stage": new_stage.value,
-            "conversation_count": context_data.get("conversation_count", 0) + 1,
+            "conversation_count": turn["context"].get("conversation_count", 0) + 1,
             "tone": self._infer_tone(sedi_response),
         }
         
@@ -139,20 +291,48 @@ class ConversationBrain:
         Returns:
             Dict with greeting message and metadata
         """
+        with phase("greeting_prepare"):
+            context_data, stage = self._prepare_greeting(user_id)
+        
+        # Generate greeting based on stage
+        greeting = self._generate_greeting(context_data, stage)
+        
+        return self._greeting_result(greeting, stage)
+    
+    async def aget_greeting(self, user_id: int) -> Dict[str, any]:
+        """Async variant of get_greeting()"""
+        with phase("greeting_prepare"):
+            context_data, stage = await asyncio.to_thread(self._prepare_greeting, user_id)
+        
+        greeting = await self._agenerate_greeting(context_data, stage)
+        
+        return self._greeting_result(greeting, stage)
+    
+    def _prepare_greeting(self, user_id: int) -> Tuple[Dict[str, any], ConversationStage]:
+        """Load snapshot, stage and context for a greeting"""
+        # Load snapshot once (missing user behaves like a user with no memory)
+        snapshot = self.memory.load_snapshot(user_id) or {}
+        
         # Get current stage
-        stage = get_stage(user_id, self.db)
+        stage = get_stage(
+            user_id,
+            self.db,
+            memory_count=snapshot.get("conversation_count", 0)
+        )
         
         # Build context
         context = ConversationContext(
             user_id=user_id,
             stage=stage,
-            memory=self.memory
+            memory=self.memory,
+            snapshot=snapshot
         )
         context_data = context.build()
-        
-        # Generate greeting based on stage
-        greeting = self._generate_greeting(context_data, stage)
-        
+        self.db.rollback()  # Release the connection before the greeting LLM call
+        return context_data, stage
+    
+    def _greeting_result(self, greeting: str, stage: ConversationStage) -> Dict[str, any]:
+        """Wrap greeting text with metadata"""
         return {
             "message": greeting,
             "language": self.language,
@@ -173,6 +353,50 @@ class ConversationBrain:
         
         SCENARIO 7: Daily greeting - calm, optional, no reply required.
         """
+        try:
+            messages = self._build_greeting_messages(context, stage)
+            
+            with phase("greeting_llm"):
+                return get_gateway().complete(
+                    messages,
+                    call_site=CALL_SITE_GREETING,
+                    model="gpt-4o-mini",
+                    temperature=0.7,
+                    max_tokens=80,  # Shorter for greetings
+                )
+            
+        except Exception as e:
+            log.warning("greeting_failed", error=str(e), error_type=type(e).__name__)
+            return self.prompts._get_fallback_response(stage)
+    
+    async def _agenerate_greeting(
+        self,
+        context: Dict[str, any],
+        stage: ConversationStage
+    ) -> str:
+        """Async variant of _generate_greeting()"""
+        try:
+            messages = self._build_greeting_messages(context, stage)
+            
+            with phase("greeting_llm"):
+                return await get_gateway().acomplete(
+                    messages,
+                    call_site=CALL_SITE_GREETING,
+                    model="gpt-4o-mini",
+                    temperature=0.7,
+                    max_tokens=80,  # Shorter for greetings
+                )
+            
+        except Exception as e:
+            log.warning("greeting_failed", error=str(e), error_type=type(e).__name__)
+            return self.prompts._get_fallback_response(stage)
+    
+    def _build_greeting_messages(
+        self,
+        context: Dict[str, any],
+        stage: ConversationStage
+    ) -> List[Dict[str, str]]:
+        """Build system + user messages for a greeting"""
         user_name = context.get("user_name") or "friend"
         time_since = context.get("time_since_last")
         engagement_level = self._determine_engagement_level(context)
@@ -187,41 +411,26 @@ class ConversationBrain:
             # Regular greeting - short and optional
             greeting_prompt = f"Greet {user_name} with a calm, short greeting. This is optional - no reply required. Keep it brief."
         
-        try:
-            completion = self.prompts._build_system_prompt(
-                stage,
-                user_name,
-                context.get("conversation_count", 0),
-                engagement_level
-            )
-            
-            # Add greeting-specific instruction
-            greeting_instruction = {
-                "en": "\nThis is a greeting message. Keep it calm and brief. No questions required. User can respond if they want, or not.",
-                "fa": "\nاین یک پیام سلام است. آرام و مختصر نگه دار. سوال لازم نیست. کاربر می‌تواند پاسخ دهد یا نه.",
-                "ar": "\nهذه رسالة تحية. اجعلها هادئة ومختصرة. لا أسئلة مطلوبة. يمكن للمستخدم الرد إذا أراد، أو لا."
-            }
-            
-            completion += greeting_instruction.get(self.language, greeting_instruction["en"])
-            
-            messages = [
-                {"role": "system", "content": completion},
-                {"role": "user", "content": greeting_prompt}
-            ]
-            
-            from app.core.conversation.prompts import client as gpt_client
-            response = gpt_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=80,  # Shorter for greetings
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"[BRAIN GREETING ERROR] {e}")
-            return self.prompts._get_fallback_response(stage)
+        completion = self.prompts._build_system_prompt(
+            stage,
+            user_name,
+            context.get("conversation_count", 0),
+            engagement_level
+        )
+        
+        # Add greeting-specific instruction
+        greeting_instruction = {
+            "en": "\nThis is a greeting message. Keep it calm and brief. No questions required. User can respond if they want, or not.",
+            "fa": "\nاین یک پیام سلام است. آرام و مختصر نگه دار. سوال لازم نیست. کاربر می‌تواند پاسخ دهد یا نه.",
+            "ar": "\nهذه رسالة تحية. اجعلها هادئة ومختصرة. لا أسئلة مطلوبة. يمكن للمستخدم الرد إذا أراد، أو لا."
+        }
+        
+        completion += greeting_instruction.get(self.language, greeting_instruction["en"])
+        
+        return [
+            {"role": "system", "content": completion},
+            {"role": "user", "content": greeting_prompt}
+        ]
     
     def _determine_engagement_level(self, context: Dict[str, any]) -> str:
         """
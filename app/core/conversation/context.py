@@ -27,12 +27,14 @@ class ConversationContext:
         user_id: int,
         stage: ConversationStage,
         memory: ConversationMemory,
-        user_message: Optional[str] = None
+        user_message: Optional[str] = None,
+        snapshot: Optional[Dict[str, any]] = None
     ):
         self.user_id = user_id
         self.stage = stage
         self.memory = memory
         self.user_message = user_message
+        self.snapshot = snapshot
     
     def build(self) -> Dict[str, any]:
         """
@@ -48,11 +50,18 @@ class ConversationContext:
             - conversation_count: Total conversation exchanges
             - time_since_last: Time since last interaction
             - user_message: Current user message (if any)
+        
+        Uses the snapshot passed in by the brain; loads one only if missing.
         """
-        memory_facts = self.memory.extract_memory_facts(self.user_id)
-        recent_messages = self.memory.get_recent_messages(self.user_id, limit=5)
-        conversation_count = self.memory.get_conversation_count(self.user_id)
-        time_since_last = self.memory.get_time_since_last_interaction(self.user_id)
+        snapshot = self.snapshot
+        if snapshot is None:
+            snapshot = self.memory.load_snapshot(self.user_id) or {}
+        
+        memory_facts = self.memory.extract_memory_facts(self.user_id, snapshot=snapshot)
+        recent_messages = snapshot.get("recent_messages", [])
+        conversation_count = snapshot.get("conversation_count", 0)
+        last_time = snapshot.get("last_interaction_at")
+        time_since_last = datetime.utcnow() - last_time if last_time else None
         
         # Format recent messages for context
         recent_history = []
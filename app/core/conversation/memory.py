@@ -10,10 +10,16 @@ RESPONSIBILITY:
 """
 
 from typing import Optional, Dict, List
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from app.models import User, Memory
+from app.database import upsert_insert
+from app.models import User, Memory, ConversationState
+from app.core.conversation.stages import ConversationStage, advance_stage, stage_for_count
+from app.core.tracing import get_logger
 from datetime import datetime, timedelta
 
+log = get_logger("memory")
+
 
 class ConversationMemory:
     """Handles conversation memory read/write operations"""
@@ -26,6 +32,56 @@ class ConversationMemory:
         user = self.db.query(User).filter(User.id == user_id).first()
         return user.name if user else None
     
+    def load_snapshot(self, user_id: int, recent_limit: int = 5) -> Optional[Dict[str, any]]:
+        """
+        Load everything one chat turn needs in two round trips.
+        
+        Query 1: User row joined with its conversation_state row
+                 (message count, stage, last interaction time).
+        Query 2: Most recent messages (newest first).
+        
+        Users without a state row (no messages yet, or created before the
+        table existed) fall back to one aggregate over Memory.
+        
+        The snapshot is passed through brain, stages and context so none of
+        them has to go back to the database during the turn.
+        
+        Returns:
+            Dict with user, user_name, conversation_count,
+            last_interaction_at and recent_messages, or None if the user
+            does not exist.
+        """
+        row = (
+            self.db.query(User, ConversationState)
+            .outerjoin(ConversationState, ConversationState.user_id == User.id)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if not row:
+            return None
+        
+        user, state = row
+        if state is not None:
+            count, last_time = state.message_count, state.last_interaction_at
+        else:
+            count, last_time = (
+                self.db.query(func.count(Memory.id), func.max(Memory.created_at))
+                .filter(Memory.user_id == user_id)
+                .one()
+            )
+        
+        recent_messages = []
+        if count:
+            recent_messages = self.get_recent_messages(user_id, limit=recent_limit)
+        
+        return {
+            "user": user,
+            "user_name": user.name,
+            "conversation_count": count or 0,
+            "last_interaction_at": last_time,
+            "recent_messages": recent_messages,
+        }
+    
     def get_recent_messages(self, user_id: int, limit: int = 10) -> List[Memory]:
         """Get recent conversation messages"""
         memories = (
@@ -35,14 +91,20 @@ class ConversationMemory:
             .limit(limit)
             .all()
         )
-        # TEMP DEBUG: Log memory load
-        print(f"[MEMORY DEBUG] Loaded {len(memories)} recent messages for user_id={user_id}")
+        log.debug("recent_messages_loaded", user_id=user_id, count=len(memories))
         return memories
     
-    def extract_memory_facts(self, user_id: int) -> Dict[str, any]:
+    def extract_memory_facts(
+        self,
+        user_id: int,
+        snapshot: Optional[Dict[str, any]] = None
+    ) -> Dict[str, any]:
         """
         Extract structured facts from conversation memory.
         
+        If a snapshot from load_snapshot() is given, facts are taken from it
+        without touching the database.
+        
         Returns:
             Dict with:
             - name: User's name (if mentioned)
@@ -51,8 +113,6 @@ class ConversationMemory:
             - lifestyle_hints: List of lifestyle information
             - identification_phrase: Unique phrase user uses
         """
-        memories = self.get_recent_messages(user_id, limit=50)
-        
         facts = {
             "name": None,
             "interests": [],
@@ -62,7 +122,10 @@ class ConversationMemory:
         }
         
         # Extract name from User model
-        facts["name"] = self.get_user_name(user_id)
+        if snapshot is not None:
+            facts["name"] = snapshot.get("user_name")
+        else:
+            facts["name"] = self.get_user_name(user_id)
         
         # For now, we'll rely on the brain to extract facts from messages
         # In future phases, this can be enhanced with NLP extraction
@@ -76,12 +139,12 @@ class ConversationMemory:
         sedi_response: str,
         language: str = "en"
     ) -> Memory:
-        """Save a conversation exchange to memory"""
-        # TEMP DEBUG: Log before save
-        memory_count_before = self.get_conversation_count(user_id)
-        print(f"[MEMORY DEBUG] Saving conversation - user_id={user_id}, count_before={memory_count_before}")
-        print(f"[MEMORY DEBUG] Message snippet: {user_message[:50]}...")
+        """
+        Save a conversation exchange to memory.
         
+        The Memory insert and the conversation_state update are committed
+        in the same transaction, so the counters never drift from Memory.
+        """
         memory = Memory(
             user_id=user_id,
             user_message=user_message,
@@ -90,15 +153,69 @@ class ConversationMemory:
             created_at=datetime.utcnow()
         )
         self.db.add(memory)
+        # Flush assigns the primary key (INSERT ... RETURNING) so logging
+        # the id after commit does not need a refresh round trip
+        self.db.flush()
+        memory_id = memory.id
+        self._update_state(user_id, memory.created_at)
         self.db.commit()
-        self.db.refresh(memory)
         
-        # TEMP DEBUG: Log after save
-        memory_count_after = self.get_conversation_count(user_id)
-        print(f"[MEMORY DEBUG] Memory saved - user_id={user_id}, count_after={memory_count_after}, memory_id={memory.id}")
+        log.debug("memory_saved", user_id=user_id, memory_id=memory_id)
         
         return memory
     
+    def _update_state(self, user_id: int, interaction_time: datetime) -> None:
+        """
+        Upsert the user's conversation_state row (must run inside the save
+        transaction, after the Memory row is flushed).
+        
+        - Existing row: message_count + 1, last_interaction_at = now
+        - Missing row: counters are initialised from Memory, which also
+          backfills users that chatted before the table existed
+        
+        The stored stage only moves forward; it is rewritten only when the
+        new count crosses a stage boundary.
+        """
+        insert = upsert_insert(self.db.get_bind())
+        memory_count = (
+            select(func.count(Memory.id))
+            .where(Memory.user_id == user_id)
+            .scalar_subquery()
+        )
+        first_contact_at = (
+            select(func.min(Memory.created_at))
+            .where(Memory.user_id == user_id)
+            .scalar_subquery()
+        )
+        stmt = (
+            insert(ConversationState)
+            .values(
+                user_id=user_id,
+                message_count=memory_count,
+                stage=ConversationStage.FIRST_CONTACT.value,
+                first_contact_at=first_contact_at,
+                last_interaction_at=interaction_time,
+            )
+            .on_conflict_do_update(
+                index_elements=[ConversationState.user_id],
+                set_={
+                    "message_count": ConversationState.message_count + 1,
+                    "last_interaction_at": interaction_time,
+                },
+            )
+            .returning(ConversationState.message_count, ConversationState.stage)
+        )
+        message_count, stored_stage = self.db.execute(stmt).one()
+        
+        current_stage = ConversationStage(stored_stage)
+        new_stage = advance_stage(current_stage, stage_for_count(message_count))
+        if new_stage != current_stage:
+            self.db.execute(
+                update(ConversationState)
+                .where(ConversationState.user_id == user_id)
+                .values(stage=new_stage.value)
+            )
+    
     def get_conversation_count(self, user_id: int) -> int:
         """Get total number of conversation exchanges"""
         return self.db.query(Memory).filter(Memory.user_id == user_id).count()
@@ -120,3 +237,40 @@ class ConversationMemory:
             return datetime.utcnow() - last_time
         return None
 
+
+
+def backfill_conversation_state(db: Session) -> int:
+    """
+    Create conversation_state rows for users that have Memory but no state
+    row yet (one INSERT ... SELECT ... GROUP BY). Safe to re-run.
+    
+    Returns:
+        int: Number of rows created
+    """
+    has_state = (
+        select(ConversationState.user_id)
+        .where(ConversationState.user_id == Memory.user_id)
+        .exists()
+    )
+    aggregates = (
+        select(
+            Memory.user_id,
+            func.count(Memory.id),
+            func.min(Memory.created_at),
+            func.max(Memory.created_at),
+        )
+        .where(~has_state)
+        .group_by(Memory.user_id)
+    )
+    rows = db.execute(aggregates).all()
+    
+    for user_id, message_count, first_contact_at, last_interaction_at in rows:
+        db.add(ConversationState(
+            user_id=user_id,
+            message_count=message_count,
+            stage=stage_for_count(message_count).value,
+            first_contact_at=first_contact_at,
+            last_interaction_at=last_interaction_at,
+        ))
+    db.commit()
+    return len(rows)
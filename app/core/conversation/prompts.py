@@ -10,17 +10,59 @@ RESPONSIBILITY:
 - Uses context only
 - NO state changes
 - NO database access
-- Uses ai_text_engine for GPT generation
+- Uses the LLM gateway for GPT generation
 """
 
-from typing import Dict, Optional
-from openai import OpenAI
+from typing import AsyncIterator, Dict, List, Optional
 from app.core.conversation.stages import ConversationStage
-import os
-from dotenv import load_dotenv
+from app.core.llm_gateway import (
+    get_gateway,
+    CALL_SITE_CHAT_REPLY,
+    CALL_SITE_CHAT_STREAM,
+)
+from app.core.tracing import get_logger
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+log = get_logger("prompts")
+
+
+class StreamingReplyFilter:
+    """
+    Incremental version of ConversationPrompts._limit_questions (+ strip)
+    for streamed replies.
+    
+    feed() returns the part of each delta that may be sent to the client;
+    once a second question mark appears the reply is cut there and `done`
+    is set so the caller can stop the stream.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self._question_count = 0
+    
+    def feed(self, delta: str) -> str:
+        if self.done:
+            return ""
+        if not self.text:
+            # Same as strip() on the full response: drop leading whitespace
+            delta = delta.lstrip()
+        
+        end = len(delta)
+        for index, char in enumerate(delta):
+            if char == '?':
+                self._question_count += 1
+                if self._question_count > 1:
+                    end = index
+                    self.done = True
+                    break
+        
+        chunk = delta[:end]
+        self.text += chunk
+        return chunk
+    
+    def result(self) -> str:
+        """Final reply text, identical to the non-streaming post-processing"""
+        return self.text if self.done else self.text.rstrip()
 
 
 class ConversationPrompts:
@@ -49,6 +91,98 @@ class ConversationPrompts:
             str: Sedi's response text
         """
         stage = ConversationStage(context["stage"])
+        messages = self.build_messages(context, user_message, engagement_level)
+        
+        try:
+            response = get_gateway().complete(
+                messages,
+                call_site=CALL_SITE_CHAT_REPLY,
+                model="gpt-4o-mini",
+                temperature=0.7,
+                max_tokens=150,  # Reduced to encourage brevity
+            )
+            
+            return self._limit_questions(response)
+            
+        except Exception as e:
+            log.warning("llm_reply_failed", error=str(e), error_type=type(e).__name__)
+            return self._get_fallback_response(stage)
+    
+    async def agenerate_response(
+        self,
+        context: Dict[str, any],
+        user_message: str,
+        engagement_level: str = "normal"
+    ) -> str:
+        """
+        Async variant of generate_response().
+        
+        Awaits the completion on the gateway's async client, so the calling
+        event loop stays free while the model is generating.
+        """
+        stage = ConversationStage(context["stage"])
+        messages = self.build_messages(context, user_message, engagement_level)
+        
+        try:
+            response = await get_gateway().acomplete(
+                messages,
+                call_site=CALL_SITE_CHAT_REPLY,
+                model="gpt-4o-mini",
+                temperature=0.7,
+                max_tokens=150,  # Reduced to encourage brevity
+            )
+            
+            return self._limit_questions(response)
+            
+        except Exception as e:
+            log.warning("llm_reply_failed", error=str(e), error_type=type(e).__name__)
+            return self._get_fallback_response(stage)
+    
+    async def astream_response(
+        self,
+        context: Dict[str, any],
+        user_message: str,
+        engagement_level: str = "normal"
+    ) -> AsyncIterator[str]:
+        """
+        Stream Sedi's response as raw text deltas while the model produces them.
+        
+        Post-processing is NOT applied here - feed the deltas through
+        StreamingReplyFilter. If the request fails before the first token,
+        the stage fallback is yielded as a single delta.
+        """
+        stage = ConversationStage(context["stage"])
+        messages = self.build_messages(context, user_message, engagement_level)
+        produced = False
+        
+        try:
+            deltas = get_gateway().astream(
+                messages,
+                call_site=CALL_SITE_CHAT_STREAM,
+                model="gpt-4o-mini",
+                temperature=0.7,
+                max_tokens=150,  # Reduced to encourage brevity
+            )
+            try:
+                async for delta in deltas:
+                    produced = True
+                    yield delta
+            finally:
+                await deltas.aclose()
+            
+        except Exception as e:
+            log.warning("llm_reply_failed", error=str(e), error_type=type(e).__name__)
+            if not produced:
+                yield self._get_fallback_response(stage)
+    
+    def build_messages(
+        self,
+        context: Dict[str, any],
+        user_message: str,
+        engagement_level: str = "normal"
+    ) -> List[Dict[str, str]]:
+        """Build the chat messages (system prompt + history + user turn) for a reply"""
+        stage = ConversationStage(context["stage"])
         user_name = context.get("user_name") or "friend"
         conversation_count = context.get("conversation_count", 0)
         recent_messages = context.get("recent_messages", [])
@@ -67,40 +201,29 @@ class ConversationPrompts:
         # Build user prompt
         user_prompt = self._build_user_prompt(user_message, stage, context)
         
-        try:
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Add conversation history (last 2-3 exchanges only)
-            for msg in conversation_history:
-                messages.append({"role": "user", "content": msg["user"]})
-                messages.append({"role": "assistant", "content": msg["sedi"]})
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_prompt})
-            
-            completion = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=150,  # Reduced to encourage brevity
-            )
-            
-            response = completion.choices[0].message.content.strip()
-            
-            # Post-process: Ensure no more than one question mark
-            question_count = response.count('?')
-            if question_count > 1:
-                # Keep only the first question
-                parts = response.split('?')
-                response = '?'.join(parts[:2]) if len(parts) > 1 else response
-            
-            return response
-            
-        except Exception as e:
-            print(f"[PROMPTS ERROR] {e}")
-            return self._get_fallback_response(stage)
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # Add conversation history (last 2-3 exchanges only)
+        for msg in conversation_history:
+            messages.append({"role": "user", "content": msg["user"]})
+            messages.append({"role": "assistant", "content": msg["sedi"]})
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_prompt})
+        
+        return messages
+    
+    def _limit_questions(self, response: str) -> str:
+        """Post-process: Ensure no more than one question mark"""
+        question_count = response.count('?')
+        if question_count > 1:
+            # Keep only the first question
+            parts = response.split('?')
+            response = '?'.join(parts[:2]) if len(parts) > 1 else response
+        
+        return response
     
     def _build_system_prompt(
         self,
@@ -5,14 +5,20 @@ Conversation Stages - Relationship State Machine
 RESPONSIBILITY:
 - Defines relationship and conversation stages
 - Handles stage transitions only
+- Reads only: get_stage() loads the conversation_state row by primary
+  key (and counts memories for users without one) when memory_count is
+  not given
 - NO text generation
-- NO database access
+- NO database writes (memory.py stores the stage)
 """
 
 from enum import Enum
 from typing import Optional
 from sqlalchemy.orm import Session
-from app.models import User, Memory
+from app.models import User, Memory, ConversationState
+from app.core.tracing import get_logger
+
+log = get_logger("stages")
 
 
 class ConversationStage(Enum):
@@ -24,9 +30,19 @@ class ConversationStage(Enum):
     STABLE_RELATION = "stable_relation"  # Long-term companion, deep understanding
 
 
-def get_stage(user_id: int, db: Session) -> ConversationStage:
+# Stages only move forward along this order
+STAGE_ORDER = [
+    ConversationStage.FIRST_CONTACT,
+    ConversationStage.INTRODUCTION,
+    ConversationStage.GETTING_TO_KNOW,
+    ConversationStage.DAILY_RELATION,
+    ConversationStage.STABLE_RELATION,
+]
+
+
+def stage_for_count(memory_count: int) -> ConversationStage:
     """
-    Determine current conversation stage for a user.
+    Map a conversation count to its relationship stage.
     
     Logic:
     - FIRST_CONTACT: No memory entries
@@ -34,59 +50,78 @@ def get_stage(user_id: int, db: Session) -> ConversationStage:
     - GETTING_TO_KNOW: 4-10 memory entries, learning preferences
     - DAILY_RELATION: 11-30 memory entries, regular interaction
     - STABLE_RELATION: 30+ memory entries, established relationship
-    
-    Returns:
-        ConversationStage: Current stage
     """
-    memory_count = db.query(Memory).filter(Memory.user_id == user_id).count()
-    
-    # TEMP DEBUG: Log stage detection
-    print(f"[STAGE DEBUG] user_id={user_id}, memory_count={memory_count}")
-    
     if memory_count == 0:
-        stage = ConversationStage.FIRST_CONTACT
+        return ConversationStage.FIRST_CONTACT
     elif memory_count <= 3:
-        stage = ConversationStage.INTRODUCTION
+        return ConversationStage.INTRODUCTION
     elif memory_count <= 10:
-        stage = ConversationStage.GETTING_TO_KNOW
+        return ConversationStage.GETTING_TO_KNOW
     elif memory_count <= 30:
-        stage = ConversationStage.DAILY_RELATION
+        return ConversationStage.DAILY_RELATION
     else:
-        stage = ConversationStage.STABLE_RELATION
+        return ConversationStage.STABLE_RELATION
+
+
+def get_stage(
+    user_id: int,
+    db: Session,
+    memory_count: Optional[int] = None
+) -> ConversationStage:
+    """
+    Determine current conversation stage for a user.
+    
+    If memory_count is already known (e.g. from a conversation snapshot),
+    no query is made. Otherwise the stored conversation_state row is read
+    by primary key; memory entries are only counted for users that have
+    no state row yet.
+    
+    Returns:
+        ConversationStage: Current stage
+    """
+    if memory_count is None:
+        state = db.get(ConversationState, user_id)
+        if state is not None:
+            stage = ConversationStage(state.stage)
+            log.debug("stage_loaded", user_id=user_id, stage=stage.value)
+            return stage
+        memory_count = db.query(Memory).filter(Memory.user_id == user_id).count()
+    
+    stage = stage_for_count(memory_count)
     
-    print(f"[STAGE DEBUG] Detected stage: {stage.value}")
+    log.debug("stage_detected", user_id=user_id, memory_count=memory_count, stage=stage.value)
     return stage
 
 
 def transition_stage(
     current_stage: ConversationStage,
     user_id: int,
-    db: Session
+    db: Session,
+    memory_count: Optional[int] = None
 ) -> ConversationStage:
     """
     Check if stage transition is needed and return new stage.
     
     This function only determines transitions, does not modify state.
+    Pass memory_count (count after the current save) to skip the query.
     
     Returns:
         ConversationStage: New stage (may be same as current)
     """
-    new_stage = get_stage(user_id, db)
-    
-    # Only allow forward progression (no regression)
-    stage_order = [
-        ConversationStage.FIRST_CONTACT,
-        ConversationStage.INTRODUCTION,
-        ConversationStage.GETTING_TO_KNOW,
-        ConversationStage.DAILY_RELATION,
-        ConversationStage.STABLE_RELATION,
-    ]
-    
-    current_index = stage_order.index(current_stage)
-    new_index = stage_order.index(new_stage)
+    new_stage = get_stage(user_id, db, memory_count=memory_count)
+    return advance_stage(current_stage, new_stage)
+
+
+def advance_stage(
+    current_stage: ConversationStage,
+    candidate_stage: ConversationStage
+) -> ConversationStage:
+    """Return the later of two stages (only forward progression, no regression)"""
+    current_index = STAGE_ORDER.index(current_stage)
+    new_index = STAGE_ORDER.index(candidate_stage)
     
     if new_index > current_index:
-        return new_stage
+        return candidate_stage
     else:
         return current_stage
 
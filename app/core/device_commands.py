@@ -0,0 +1,279 @@
+# app/core/device_commands.py
+"""
+Device Commands - Per-User Command Queue with Long-Poll Delivery
+
+RESPONSIBILITY:
+- device_commands table as the queue: enqueue() in the producer's
+  transaction (e.g. next to the alert notification it belongs to)
+- claim(): one statement moves up to `limit` pending commands to
+  "delivered" and returns them (UPDATE ... WHERE id IN (SELECT ... FOR
+  UPDATE SKIP LOCKED) RETURNING), so two concurrent polls never get the
+  same command and never wait for each other
+- next_commands(): long-poll - parks the request (asyncio, no thread)
+  until a command for the user is committed or `wait` seconds pass
+- Wake-ups: committed enqueues wake local waiters (session after_commit);
+  on PostgreSQL pg_notify() in the same transaction reaches the waiters
+  of every worker through a LISTEN thread
+- NO command texts (the routers that raise alerts write them)
+
+Environment:
+- DEVICE_COMMAND_MAX_WAIT_SECONDS   longest long-poll a device may ask for (default 30)
+- DEVICE_COMMAND_RECHECK_SECONDS    parked polls re-check the queue this often, in
+                                    case a wake-up was lost (default 10)
+"""
+
+import asyncio
+import os
+import select as select_module
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.models import DeviceCommand
+from app.core.metrics import DEVICE_COMMAND_WAITERS
+from app.core.tracing import get_logger
+
+log = get_logger("device_commands")
+
+MAX_WAIT_SECONDS = float(os.getenv("DEVICE_COMMAND_MAX_WAIT_SECONDS", "30"))
+RECHECK_SECONDS = float(os.getenv("DEVICE_COMMAND_RECHECK_SECONDS", "10"))
+CHANNEL = "device_commands"
+
+STATUS_PENDING = "pending"
+STATUS_DELIVERED = "delivered"
+STATUS_ACKNOWLEDGED = "acknowledged"
+
+_SESSION_KEY = "device_command_users"  # Session.info: users with commands enqueued in the open transaction
+
+
+def command_row(
+    user_id: int,
+    text: str,
+    sound_id: str = "alert_default",
+    volume: int = 90,
+    repeat: int = 1,
+    language: str = "fa",
+    priority: int = 3,
+    device_id: Optional[str] = None,
+    notification_id: Optional[int] = None,
+) -> Dict[str, any]:
+    return {
+        "user_id": user_id,
+        "device_id": device_id,
+        "notification_id": notification_id,
+        "sound_id": sound_id,
+        "text": text,
+        "volume": volume,
+        "repeat": repeat,
+        "language": language,
+        "priority": priority,
+        "status": STATUS_PENDING,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def enqueue(db: Session, rows: List[Dict[str, any]]) -> int:
+    """
+    Insert commands (see command_row) in the session's transaction - the
+    caller commits. Waiting polls are woken once the commit succeeds.
+    """
+    if not rows:
+        return 0
+    db.execute(DeviceCommand.__table__.insert(), rows)
+    user_ids = {row["user_id"] for row in rows}
+    if db.get_bind().dialect.name == "postgresql":
+        # Delivered by PostgreSQL at commit, to the LISTEN thread of every worker
+        for user_id in user_ids:
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": str(user_id)})
+    db.info.setdefault(_SESSION_KEY, set()).update(user_ids)
+    return len(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    user_ids = session.info.pop(_SESSION_KEY, None)
+    if user_ids:
+        waiters.wake(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+
+def claim(db: Session, user_id: int, device_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, any]]:
+    """
+    Atomically take up to `limit` pending commands of the user (oldest
+    first) and mark them delivered; commits. Rows locked by a concurrent
+    claim are skipped, not waited for.
+    """
+    candidates = (
+        select(DeviceCommand.id)
+        .where(DeviceCommand.user_id == user_id, DeviceCommand.status == STATUS_PENDING)
+        .order_by(DeviceCommand.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if device_id is not None:
+        candidates = candidates.where(or_(DeviceCommand.device_id.is_(None), DeviceCommand.device_id == device_id))
+
+    rows = db.execute(
+        update(DeviceCommand)
+        .where(DeviceCommand.id.in_(candidates.scalar_subquery()), DeviceCommand.status == STATUS_PENDING)
+        .values(status=STATUS_DELIVERED, delivered_at=datetime.utcnow(), delivered_to=device_id)
+        .returning(
+            DeviceCommand.id,
+            DeviceCommand.sound_id,
+            DeviceCommand.text,
+            DeviceCommand.volume,
+            DeviceCommand.repeat,
+            DeviceCommand.language,
+            DeviceCommand.priority,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [row._asdict() for row in sorted(rows, key=lambda row: row.id)]
+
+
+def acknowledge(db: Session, user_id: int, command_ids: Iterable[int]) -> int:
+    """Record that the device played the commands (one UPDATE); commits"""
+    ids = [int(command_id) for command_id in command_ids]
+    if not ids:
+        return 0
+    count = db.execute(
+        update(DeviceCommand)
+        .where(DeviceCommand.id.in_(ids), DeviceCommand.user_id == user_id)
+        .values(status=STATUS_ACKNOWLEDGED, acknowledged_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def _claim_in_session(user_id: int, device_id: Optional[str], limit: int) -> List[Dict[str, any]]:
+    with SessionLocal() as db:
+        return claim(db, user_id, device_id, limit)
+
+
+async def next_commands(
+    user_id: int, device_id: Optional[str] = None, wait: float = 0.0, limit: int = 20
+) -> List[Dict[str, any]]:
+    """
+    Claim the user's pending commands; if there are none, park until one
+    is enqueued or `wait` seconds (capped at MAX_WAIT_SECONDS) pass.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(wait, MAX_WAIT_SECONDS)
+    while True:
+        # Subscribe before claiming, so a command committed in between still wakes us
+        waiter = waiters.subscribe(user_id, loop)
+        try:
+            commands = await run_in_threadpool(_claim_in_session, user_id, device_id, limit)
+            remaining = deadline - loop.time()
+            if commands or remaining <= 0:
+                return commands
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=min(remaining, RECHECK_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            waiters.unsubscribe(user_id, loop, waiter)
+
+
+class Waiters:
+    """Parked long-polls per user; wake() is safe from any thread"""
+
+    def __init__(self):
+        self._by_user: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+        DEVICE_COMMAND_WAITERS.set_function(self.count)
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(len(parked) for parked in self._by_user.values())
+
+    def subscribe(self, user_id: int, loop: asyncio.AbstractEventLoop) -> asyncio.Event:
+        waiter = asyncio.Event()
+        with self._lock:
+            self._by_user.setdefault(user_id, set()).add((loop, waiter))
+        return waiter
+
+    def unsubscribe(self, user_id: int, loop: asyncio.AbstractEventLoop, waiter: asyncio.Event) -> None:
+        with self._lock:
+            parked = self._by_user.get(user_id)
+            if parked is not None:
+                parked.discard((loop, waiter))
+                if not parked:
+                    del self._by_user[user_id]
+
+    def wake(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            parked = [entry for user_id in user_ids for entry in self._by_user.get(user_id, ())]
+        for loop, waiter in parked:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                pass  # Loop already closed (shutdown)
+
+
+waiters = Waiters()
+
+
+class Listener:
+    """PostgreSQL LISTEN on CHANNEL in a thread: wakes this worker's waiters for other workers' enqueues"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """No-op off PostgreSQL (one process; after_commit wakes the waiters)"""
+        if engine.dialect.name != "postgresql" or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sedi-device-commands", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while not self._stop.is_set():
+                    if select_module.select([dbapi_connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    user_ids = set()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        user_ids.add(int(notify.payload))
+                    waiters.wake(user_ids)
+            except Exception as e:
+                log.warning("device_command_listen_failed", error=str(e))
+                self._stop.wait(5)
+            finally:
+                if connection is not None:
+                    try:
+                        # Not back to the pool: it is in autocommit mode and LISTENing
+                        connection.invalidate()
+                    except Exception:
+                        pass
+
+
+listener = Listener()
@@ -0,0 +1,218 @@
+# app/core/device_status.py
+"""
+Device Status - Last-Value Store for Device Heartbeats
+
+RESPONSIBILITY:
+- record(): O(1) heartbeat handling - the latest values per device_id go
+  into an in-memory map, no database write per heartbeat
+- A background thread flushes devices changed since the last flush every
+  DEVICE_STATUS_FLUSH_SECONDS as batched upserts into device_status (one
+  row per device, so the table stays as small as the fleet). A batch
+  the table rejects (IntegrityError) is written row by row and the
+  rejected rows are dropped, so one bad heartbeat cannot block the flush
+- Reads (device_status / user_devices): the table, overlaid with this
+  worker's newer in-memory values
+- NO notifications: heartbeats used to be stored as Notification rows
+
+Every worker process keeps its own map; a heartbeat received by another
+worker is visible to this one after that worker's next flush. Upserts
+never replace a newer last_seen_at, so flushes arriving out of order
+between workers are harmless.
+
+Environment:
+- DEVICE_STATUS_FLUSH_SECONDS   flush interval (default 5)
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, upsert_insert
+from app.models import DeviceStatus
+from app.core.tracing import get_logger
+
+log = get_logger("device_status")
+
+FLUSH_SECONDS = float(os.getenv("DEVICE_STATUS_FLUSH_SECONDS", "5"))
+FLUSH_BATCH_SIZE = 1000
+FORGET_AFTER = timedelta(hours=24)  # Devices silent this long are dropped from memory (the table keeps them)
+
+_FIELDS = ("device_id", "user_id", "battery", "temperature", "status", "last_seen_at")
+
+
+def _number(value, cast):
+    try:
+        return cast(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def status_dict(row) -> Dict[str, any]:
+    """Public shape of a device's status (from a DeviceStatus row or a map entry)"""
+    get = row.get if isinstance(row, dict) else lambda key: getattr(row, key)
+    return {field: get(field) for field in _FIELDS}
+
+
+class DeviceStatusStore:
+    """In-memory last value per device, flushed periodically as upserts"""
+
+    def __init__(self, flush_interval: float = FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._latest: Dict[str, Dict[str, any]] = {}
+        self._dirty: Dict[str, Dict[str, any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def known_user(self, device_id: str) -> Optional[int]:
+        """User id of a device seen by this worker (skips the user lookup on repeat heartbeats)"""
+        entry = self._latest.get(device_id)
+        return entry["user_id"] if entry else None
+
+    def record(
+        self,
+        device_id: str,
+        user_id: int,
+        battery=None,
+        temperature=None,
+        status: Optional[str] = None,
+        seen_at: Optional[datetime] = None,
+    ) -> Dict[str, any]:
+        entry = {
+            "device_id": device_id,
+            "user_id": user_id,
+            "battery": _number(battery, int),
+            "temperature": _number(temperature, float),
+            "status": status,
+            "last_seen_at": seen_at or datetime.utcnow(),
+        }
+        with self._lock:
+            self._latest[device_id] = entry
+            self._dirty[device_id] = entry
+        return entry
+
+    def get(self, device_id: str) -> Optional[Dict[str, any]]:
+        return self._latest.get(device_id)
+
+    def for_user(self, user_id: int) -> List[Dict[str, any]]:
+        with self._lock:
+            return [entry for entry in self._latest.values() if entry["user_id"] == user_id]
+
+    def flush(self) -> int:
+        """Upsert devices changed since the last flush; returns rows written"""
+        with self._lock:
+            rows, self._dirty = list(self._dirty.values()), {}
+        if not rows:
+            return 0
+        try:
+            with SessionLocal() as db:
+                for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    _upsert(db, rows[start:start + FLUSH_BATCH_SIZE])
+                db.commit()
+        except IntegrityError:
+            # A row the table rejects would fail every later flush: write row by row, drop the rejected ones
+            return self._flush_each(rows)
+        except Exception as e:
+            # Keep them for the next flush unless a newer heartbeat arrived meanwhile
+            with self._lock:
+                for row in rows:
+                    self._dirty.setdefault(row["device_id"], row)
+            log.warning("device_status_flush_failed", devices=len(rows), error=str(e))
+            return 0
+        self._forget_silent()
+        return len(rows)
+
+    def _flush_each(self, rows: List[Dict[str, any]]) -> int:
+        """One transaction per row; rows failing with IntegrityError are dropped, other failures are kept"""
+        written = 0
+        with SessionLocal() as db:
+            for index, row in enumerate(rows):
+                try:
+                    _upsert(db, [row])
+                    db.commit()
+                    written += 1
+                except IntegrityError as e:
+                    db.rollback()
+                    with self._lock:
+                        if self._latest.get(row["device_id"]) is row:
+                            del self._latest[row["device_id"]]
+                    log.warning("device_status_row_dropped", device_id=row["device_id"], error=str(e.orig))
+                except Exception as e:
+                    db.rollback()
+                    with self._lock:
+                        for kept in rows[index:]:
+                            self._dirty.setdefault(kept["device_id"], kept)
+                    log.warning("device_status_flush_failed", devices=len(rows) - index, error=str(e))
+                    break
+        self._forget_silent()
+        return written
+
+    def _forget_silent(self) -> None:
+        cutoff = datetime.utcnow() - FORGET_AFTER
+        with self._lock:
+            for device_id in [d for d, entry in self._latest.items() if entry["last_seen_at"] < cutoff]:
+                if device_id not in self._dirty:
+                    del self._latest[device_id]
+
+    def start(self) -> None:
+        """Start the flush thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+
+        self._thread = threading.Thread(target=run, name="sedi-device-status", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write what is still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+def _upsert(db: Session, rows: List[Dict[str, any]]) -> None:
+    insert = upsert_insert(db.get_bind())
+    statement = insert(DeviceStatus)
+    statement = statement.on_conflict_do_update(
+        index_elements=[DeviceStatus.device_id],
+        set_={field: statement.excluded[field] for field in _FIELDS if field != "device_id"},
+        where=DeviceStatus.last_seen_at <= statement.excluded.last_seen_at,
+    )
+    db.execute(statement, rows)
+
+
+# Process-wide store used by the device router
+store = DeviceStatusStore()
+
+
+def _newest(stored: Optional[DeviceStatus], cached: Optional[Dict[str, any]]) -> Optional[Dict[str, any]]:
+    if cached is not None and (stored is None or cached["last_seen_at"] >= stored.last_seen_at):
+        return status_dict(cached)
+    return status_dict(stored) if stored is not None else None
+
+
+def device_status(db: Session, device_id: str) -> Optional[Dict[str, any]]:
+    """Last seen / battery / temperature of one device (one primary-key lookup)"""
+    return _newest(db.get(DeviceStatus, device_id), store.get(device_id))
+
+
+def user_devices(db: Session, user_id: int) -> List[Dict[str, any]]:
+    """Status of every device of a user, most recently seen first"""
+    stored = db.execute(select(DeviceStatus).where(DeviceStatus.user_id == user_id)).scalars().all()
+    devices = {row.device_id: status_dict(row) for row in stored}
+    for entry in store.for_user(user_id):
+        current = devices.get(entry["device_id"])
+        if current is None or entry["last_seen_at"] >= current["last_seen_at"]:
+            devices[entry["device_id"]] = status_dict(entry)
+    return sorted(devices.values(), key=lambda device: device["last_seen_at"], reverse=True)
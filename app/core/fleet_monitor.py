@@ -0,0 +1,271 @@
+# app/core/fleet_monitor.py
+"""
+Fleet Monitor - Device Liveness with Timing-Wheel Expiry
+
+RESPONSIBILITY:
+- Every heartbeat (re)schedules the device's deadline (last heartbeat +
+  DEVICE_OFFLINE_AFTER_SECONDS) in a hashed timing wheel: O(1) per
+  heartbeat, and each tick only touches the devices whose deadline is in
+  the current slot, so detection cost follows the number of devices that
+  go silent, not the fleet size
+- A passed deadline emits an "offline" event (listeners, log, metric)
+  and moves the device to the offline set; its next heartbeat emits
+  "online"
+- Online / offline counts and lists for /device/fleet
+- NO periodic table scans: device_status is read once at startup (seed,
+  in keyset chunks) and then only by primary key for devices whose
+  deadline just passed
+
+Heartbeats reach the worker that received them. Before a device is
+declared offline its device_status row is checked, so heartbeats that
+went to another worker (flushed within DEVICE_STATUS_FLUSH_SECONDS) keep
+it online. Devices that only ever talked to other workers appear here
+after the next restart's seed.
+
+Environment:
+- DEVICE_OFFLINE_AFTER_SECONDS  silence before a device is offline (default 30)
+- FLEET_TICK_SECONDS            wheel resolution (default 1)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import DeviceStatus
+from app.core.metrics import DEVICE_FLEET, DEVICE_LIVENESS_EVENTS
+from app.core.tracing import get_logger
+
+log = get_logger("fleet_monitor")
+
+OFFLINE_AFTER_SECONDS = float(os.getenv("DEVICE_OFFLINE_AFTER_SECONDS", "30"))
+TICK_SECONDS = float(os.getenv("FLEET_TICK_SECONDS", "1"))
+SEED_CHUNK_SIZE = 1000
+
+EVENT_OFFLINE = "offline"
+EVENT_ONLINE = "online"
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel over monotonic time. schedule() and cancel() are
+    O(1); advance() visits the slots of the ticks that passed and returns
+    the keys whose deadline has come. Deadlines further out than one
+    revolution stay in their slot until the right round.
+    """
+
+    def __init__(self, tick_seconds: float, slots: int):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._current = self._tick(time.monotonic())
+
+    def _tick(self, at: float) -> int:
+        return int(at / self.tick_seconds)
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        self.cancel(key)
+        # Never in a tick that was already visited
+        tick = max(self._tick(deadline), self._current + 1)
+        slot = tick % len(self._slots)
+        self._slots[slot][key] = tick
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        target = self._tick(now if now is not None else time.monotonic())
+        expired = []
+        # After a long pause every slot is visited once, not once per missed tick
+        start = max(self._current + 1, target - len(self._slots) + 1)
+        for tick in range(start, target + 1):
+            slot = self._slots[tick % len(self._slots)]
+            due = [key for key, deadline in slot.items() if deadline <= target]
+            for key in due:
+                del slot[key]
+                del self._slot_of[key]
+            expired.extend(due)
+        self._current = max(self._current, target)
+        return expired
+
+
+class FleetMonitor:
+    """Online/offline state of every known device"""
+
+    def __init__(self, offline_after: float = OFFLINE_AFTER_SECONDS, tick_seconds: float = TICK_SECONDS):
+        self.offline_after = offline_after
+        self.tick_seconds = tick_seconds
+        # One revolution covers the timeout, so deadlines expire on their first visit
+        self._wheel = TimingWheel(tick_seconds, slots=int(offline_after / tick_seconds) + 2)
+        # Insertion order: online = least recently seen first, offline = longest offline first
+        self._online: Dict[str, datetime] = {}       # device_id -> last heartbeat
+        self._offline: Dict[str, datetime] = {}      # device_id -> offline since
+        self._listeners: List[Callable[[str, str, datetime], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        DEVICE_FLEET.set_function(lambda: len(self._online), state=EVENT_ONLINE)
+        DEVICE_FLEET.set_function(lambda: len(self._offline), state=EVENT_OFFLINE)
+
+    def add_listener(self, listener: Callable[[str, str, datetime], None]) -> None:
+        """listener(event, device_id, at) for every "offline" / "online" transition"""
+        self._listeners.append(listener)
+
+    def heartbeat(self, device_id: str, seen_at: Optional[datetime] = None) -> None:
+        seen_at = seen_at or datetime.utcnow()
+        with self._lock:
+            came_back = self._offline.pop(device_id, None) is not None
+            self._online.pop(device_id, None)  # Re-insert at the end (most recently seen)
+            self._online[device_id] = seen_at
+            self._wheel.schedule(device_id, self._deadline(seen_at))
+        if came_back:
+            self._emit(EVENT_ONLINE, device_id, seen_at)
+
+    def _deadline(self, seen_at: datetime) -> float:
+        """Monotonic time at which a device last seen at `seen_at` goes offline"""
+        age = (datetime.utcnow() - seen_at).total_seconds()
+        return time.monotonic() + self.offline_after - age
+
+    def tick(self, now: Optional[float] = None) -> List[str]:
+        """Expire passed deadlines; returns the devices that went offline"""
+        with self._lock:
+            expired = self._wheel.advance(now)
+        if not expired:
+            return []
+
+        newer = self._last_seen_elsewhere(expired)
+        offline = []
+        with self._lock:
+            for device_id in expired:
+                last_seen = self._online.get(device_id)
+                if last_seen is None or device_id in self._wheel:
+                    continue  # Heartbeat arrived while the lock was released
+                stored = newer.get(device_id)
+                if stored is not None and stored > last_seen:
+                    del self._online[device_id]
+                    self._online[device_id] = stored
+                    self._wheel.schedule(device_id, self._deadline(stored))
+                    continue
+                del self._online[device_id]
+                since = last_seen + timedelta(seconds=self.offline_after)
+                self._offline[device_id] = since
+                offline.append((device_id, since))
+
+        for device_id, since in offline:
+            self._emit(EVENT_OFFLINE, device_id, since)
+        return [device_id for device_id, _ in offline]
+
+    def _last_seen_elsewhere(self, device_ids: List[str]) -> Dict[str, datetime]:
+        """last_seen_at in device_status (heartbeats received by other workers)"""
+        last_seen = {}
+        try:
+            with SessionLocal() as db:
+                for start in range(0, len(device_ids), SEED_CHUNK_SIZE):
+                    last_seen.update(db.execute(
+                        select(DeviceStatus.device_id, DeviceStatus.last_seen_at)
+                        .where(DeviceStatus.device_id.in_(device_ids[start:start + SEED_CHUNK_SIZE]))
+                    ).all())
+            return last_seen
+        except Exception as e:
+            log.warning("fleet_status_lookup_failed", devices=len(device_ids), error=str(e))
+            return {}
+
+    def _emit(self, event: str, device_id: str, at: datetime) -> None:
+        DEVICE_LIVENESS_EVENTS.labels(event=event).inc()
+        log.info("device_" + event, device_id=device_id, at=at)
+        for listener in self._listeners:
+            try:
+                listener(event, device_id, at)
+            except Exception as e:
+                log.warning("fleet_listener_failed", event=event, device_id=device_id, error=str(e))
+
+    def seed(self) -> int:
+        """Load device_status once (startup) so devices seen before a restart are tracked"""
+        loaded = 0
+        last_id = ""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            while True:
+                rows = db.execute(
+                    select(DeviceStatus.device_id, DeviceStatus.last_seen_at)
+                    .where(DeviceStatus.device_id > last_id)
+                    .order_by(DeviceStatus.device_id)
+                    .limit(SEED_CHUNK_SIZE)
+                ).all()
+                if not rows:
+                    return loaded
+                with self._lock:
+                    for device_id, last_seen in rows:
+                        if device_id in self._online or device_id in self._offline:
+                            continue  # A live heartbeat is newer
+                        if (now - last_seen).total_seconds() < self.offline_after:
+                            self._online[device_id] = last_seen
+                            self._wheel.schedule(device_id, self._deadline(last_seen))
+                        else:
+                            self._offline[device_id] = last_seen + timedelta(seconds=self.offline_after)
+                loaded += len(rows)
+                last_id = rows[-1].device_id
+
+    def fleet(self, state: Optional[str] = None, limit: int = 100, offset: int = 0) -> Dict[str, any]:
+        """
+        Counts, plus one page of the `state` list: online devices least
+        recently seen first, offline devices most recently lost first
+        (devices loaded by the startup seed come last).
+        """
+        with self._lock:
+            data = {
+                "online": len(self._online),
+                "offline": len(self._offline),
+                "offline_after_seconds": self.offline_after,
+            }
+            if state == EVENT_ONLINE:
+                page = islice(self._online.items(), offset, offset + limit)
+                data["devices"] = [{"device_id": d, "last_seen_at": at} for d, at in page]
+            elif state == EVENT_OFFLINE:
+                page = islice(reversed(self._offline.items()), offset, offset + limit)
+                data["devices"] = [{"device_id": d, "offline_since": at} for d, at in page]
+        return data
+
+    def start(self) -> None:
+        """Seed from device_status and tick every FLEET_TICK_SECONDS in a thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            try:
+                print(f"[Fleet Monitor] {self.seed()} devices loaded")
+            except Exception as e:
+                log.warning("fleet_seed_failed", error=str(e))
+            while not self._stop.wait(self.tick_seconds):
+                try:
+                    self.tick()
+                except Exception as e:
+                    log.warning("fleet_tick_failed", error=str(e))
+
+        self._thread = threading.Thread(target=run, name="sedi-fleet-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Process-wide monitor fed by the device router
+monitor = FleetMonitor()
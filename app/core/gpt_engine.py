@@ -1,13 +1,5 @@
 # app/core/gpt_engine.py
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# Load API key from .env file
-load_dotenv()
-
-# No need to pass api_key to constructor - it reads from env automatically
-client = OpenAI()
+from app.core.llm_gateway import get_gateway, CALL_SITE_ASK_SEDI
 
 
 def ask_sedi(prompt: str, language: str = "en") -> str:
@@ -21,18 +13,17 @@ def ask_sedi(prompt: str, language: str = "en") -> str:
             "ar": "أنت صدي، مساعد صحي ذكي يتحدث بلطف واهتمام."
         }
 
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        return get_gateway().complete(
+            [
                 {"role": "system", "content": base_prompt.get(language, base_prompt["en"])},
                 {"role": "user", "content": prompt}
             ],
+            call_site=CALL_SITE_ASK_SEDI,
+            model="gpt-4o-mini",
             temperature=0.7,
             max_tokens=200,
         )
 
-        return completion.choices[0].message.content.strip()
-
     except Exception as e:
         print(f"[GPT ERROR] {e}")
         fallback = {
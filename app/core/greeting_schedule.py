@@ -0,0 +1,254 @@
+# app/core/greeting_schedule.py
+"""
+Greeting Schedule - Per-User Local-Time Morning Greetings
+
+RESPONSIBILITY:
+- greeting_schedule table as a due-queue: one row per user with the UTC
+  time of their next greeting, indexed on next_due_at
+- next_due_at = MORNING_HOUR in the user's timezone plus a per-user
+  jitter inside GREETING_WINDOW_MINUTES, so a timezone's users are spread
+  over the window instead of all arriving at 08:00:00
+- Rows for new users (sync_schedule), advancing rows after a send or
+  when they are too late to send (advance / skip_stale), timezone changes
+- Pre-generated greetings: unreleased Notification rows (release_at =
+  next_due_at) written ahead of time, made visible by release_due() with
+  one UPDATE when they come due
+- NO text generation (the scheduler's morning_greeting and
+  greeting_pregeneration jobs generate)
+
+Environment:
+- GREETING_DEFAULT_TIMEZONE    zone for users without one (default Asia/Tehran)
+- GREETING_WINDOW_MINUTES      jitter window after MORNING_HOUR (default 60)
+- GREETING_MAX_LATENESS_HOURS  overdue greetings older than this are skipped,
+                               e.g. after downtime (default 3)
+"""
+
+import hashlib
+import os
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+
+import pytz
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models import GreetingSchedule, Notification, User
+
+MORNING_HOUR = 8
+DEFAULT_TIMEZONE = os.getenv("GREETING_DEFAULT_TIMEZONE", "Asia/Tehran")
+WINDOW_MINUTES = int(os.getenv("GREETING_WINDOW_MINUTES", "60"))
+MAX_LATENESS = timedelta(hours=float(os.getenv("GREETING_MAX_LATENESS_HOURS", "3")))
+SYNC_CHUNK_SIZE = 1000
+GREETING_TYPE = "morning_summary"  # Notification.type of morning greetings
+
+
+def valid_timezone(name: Optional[str]) -> bool:
+    return bool(name) and name in pytz.all_timezones_set
+
+
+def jitter_seconds(user_id: int) -> int:
+    """Stable offset of a user inside the greeting window (same user, same minute every day)"""
+    if WINDOW_MINUTES <= 0:
+        return 0
+    digest = hashlib.sha1(str(user_id).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % (WINDOW_MINUTES * 60)
+
+
+def next_due_at(user_id: int, timezone: Optional[str], now: Optional[datetime] = None) -> datetime:
+    """Next greeting time after `now` (naive UTC, like every DateTime column)"""
+    zone = pytz.timezone(timezone if valid_timezone(timezone) else DEFAULT_TIMEZONE)
+    now = now or datetime.utcnow()
+    local_now = pytz.utc.localize(now).astimezone(zone)
+    offset = timedelta(hours=MORNING_HOUR, seconds=jitter_seconds(user_id))
+
+    day = local_now.date()
+    while True:
+        # localize() resolves DST gaps/overlaps for the wall-clock time of that day
+        due = zone.localize(datetime.combine(day, time()) + offset)
+        if due > local_now:
+            return due.astimezone(pytz.utc).replace(tzinfo=None)
+        day += timedelta(days=1)
+
+
+def set_timezone(db: Session, user_id: int, timezone: str) -> datetime:
+    """
+    Store a user's timezone and reschedule their next greeting; returns
+    the new due time. A pre-generated greeting moves with it.
+    """
+    due = next_due_at(user_id, timezone)
+    current = db.get(GreetingSchedule, user_id)
+    if current is not None and current.pregenerated_for is not None and current.pregenerated_for == current.next_due_at:
+        db.execute(
+            update(Notification)
+            .where(
+                Notification.user_id == user_id,
+                Notification.type == GREETING_TYPE,
+                Notification.release_at == current.next_due_at,
+            )
+            .values(release_at=due)
+        )
+        current.pregenerated_for = due
+    insert = upsert_insert(db.get_bind())
+    db.execute(
+        insert(GreetingSchedule)
+        .values(user_id=user_id, timezone=timezone, next_due_at=due)
+        .on_conflict_do_update(
+            index_elements=[GreetingSchedule.user_id],
+            set_={"timezone": timezone, "next_due_at": due},
+        )
+    )
+    db.commit()
+    return due
+
+
+def sync_schedule(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Add rows for users that have none (new users), in keyset chunks.
+    Returns the number of rows added.
+    """
+    now = now or datetime.utcnow()
+    added = 0
+    last_id = 0
+    while True:
+        user_ids = db.execute(
+            select(User.id)
+            .outerjoin(GreetingSchedule, GreetingSchedule.user_id == User.id)
+            .where(GreetingSchedule.user_id.is_(None), User.id > last_id)
+            .order_by(User.id)
+            .limit(SYNC_CHUNK_SIZE)
+        ).scalars().all()
+        if not user_ids:
+            return added
+        insert = upsert_insert(db.get_bind())
+        db.execute(
+            insert(GreetingSchedule).on_conflict_do_nothing(index_elements=[GreetingSchedule.user_id]),
+            [{"user_id": user_id, "timezone": None, "next_due_at": next_due_at(user_id, None, now)} for user_id in user_ids],
+        )
+        db.commit()
+        added += len(user_ids)
+        last_id = user_ids[-1]
+
+
+def _not_pregenerated():
+    return or_(
+        GreetingSchedule.pregenerated_for.is_(None),
+        GreetingSchedule.pregenerated_for != GreetingSchedule.next_due_at,
+    )
+
+
+def due_statement(now: datetime):
+    """
+    Users whose greeting is due, not yet too late and not pre-generated
+    (first column User.id, for iter_user_chunks)
+    """
+    return (
+        select(User.id, User.name, User.preferred_language, GreetingSchedule.timezone)
+        .join(GreetingSchedule, GreetingSchedule.user_id == User.id)
+        .where(
+            GreetingSchedule.next_due_at <= now,
+            GreetingSchedule.next_due_at > now - MAX_LATENESS,
+            _not_pregenerated(),
+        )
+    )
+
+
+def pregeneration_statement(start: datetime, end: datetime):
+    """
+    Users whose next greeting falls in [start, end) and has no pre-generated
+    row yet (first column User.id, for iter_user_chunks)
+    """
+    return (
+        select(User.id, User.name, User.preferred_language, GreetingSchedule.timezone, GreetingSchedule.next_due_at)
+        .join(GreetingSchedule, GreetingSchedule.user_id == User.id)
+        .where(
+            GreetingSchedule.next_due_at >= start,
+            GreetingSchedule.next_due_at < end,
+            _not_pregenerated(),
+        )
+    )
+
+
+def mark_pregenerated(db: Session, rows: List) -> None:
+    """Record that `rows` (from pregeneration_statement) have an unreleased greeting; caller commits"""
+    if rows:
+        db.execute(
+            update(GreetingSchedule),
+            [{"user_id": row.id, "pregenerated_for": row.next_due_at} for row in rows],
+        )
+
+
+def release_due(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Make pre-generated notifications whose time has come visible: one
+    UPDATE (partial index on release_at). Ones that missed their time by
+    more than MAX_LATENESS are deleted, like late greetings are skipped.
+    Advances the released users' schedule. Returns rows released.
+    """
+    now = now or datetime.utcnow()
+    db.execute(
+        delete(Notification)
+        .where(Notification.release_at.isnot(None), Notification.release_at <= now - MAX_LATENESS)
+        .execution_options(synchronize_session=False)
+    )
+    released = db.execute(
+        update(Notification)
+        .where(Notification.release_at.isnot(None), Notification.release_at <= now)
+        .values(created_at=Notification.release_at, release_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+
+    while True:
+        rows = db.execute(
+            select(GreetingSchedule.user_id.label("id"), GreetingSchedule.timezone)
+            .where(
+                GreetingSchedule.next_due_at <= now,
+                GreetingSchedule.pregenerated_for == GreetingSchedule.next_due_at,
+            )
+            .limit(SYNC_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return released
+        advance(db, rows, now)
+        db.commit()
+
+
+def advance(db: Session, rows: List, now: Optional[datetime] = None) -> None:
+    """Move `rows` (user id + timezone) to their next greeting; one executemany, caller commits"""
+    if not rows:
+        return
+    now = now or datetime.utcnow()
+    # ORM bulk UPDATE by primary key (executemany)
+    db.execute(
+        update(GreetingSchedule),
+        [{"user_id": row.id, "next_due_at": next_due_at(row.id, row.timezone, now)} for row in rows],
+    )
+
+
+def skip_stale(db: Session, now: Optional[datetime] = None) -> int:
+    """Reschedule greetings overdue by more than MAX_LATENESS without sending them"""
+    now = now or datetime.utcnow()
+    skipped = 0
+    while True:
+        rows = db.execute(
+            select(GreetingSchedule.user_id.label("id"), GreetingSchedule.timezone)
+            .where(GreetingSchedule.next_due_at <= now - MAX_LATENESS)
+            .limit(SYNC_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return skipped
+        advance(db, rows, now)
+        db.commit()
+        skipped += len(rows)
+
+
+def schedule_info(db: Session, user_id: int) -> Optional[Dict[str, any]]:
+    row = db.get(GreetingSchedule, user_id)
+    if row is None:
+        return None
+    return {
+        "user_id": user_id,
+        "timezone": row.timezone or DEFAULT_TIMEZONE,
+        "next_due_at": row.next_due_at,
+    }
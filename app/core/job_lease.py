@@ -0,0 +1,164 @@
+# app/core/job_lease.py
+"""
+Job Lease - One Node per Scheduler Job Run
+
+RESPONSIBILITY:
+- Every API worker process starts its own BackgroundScheduler; a lease
+  row per job in scheduler_leases decides which of them actually runs
+  a given run, so 4 workers send 1 morning greeting, not 4
+- Acquire: one atomic upsert, works on PostgreSQL and SQLite
+- Renewed by a heartbeat thread while the job runs; a crashed node's
+  lease expires after JOB_LEASE_TTL_SECONDS. A renewal that finds the
+  lease taken over sets `lost`; the job (current_lease()) has to stop
+  writing
+- NO job logic
+
+A lease is granted only if nobody holds it AND the job has not started
+on any node within `min_interval`. The second condition stops workers
+whose interval triggers are out of phase (every worker counts "every 2
+hours" from its own start) from running the same job back to back.
+
+Environment:
+- JOB_LEASE_TTL_SECONDS   lease lifetime without a heartbeat (default 120)
+"""
+
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import update
+
+from app.database import SessionLocal, upsert_insert
+from app.models import SchedulerLease
+from app.core.tracing import get_logger
+
+log = get_logger("job_lease")
+
+LEASE_TTL_SECONDS = float(os.getenv("JOB_LEASE_TTL_SECONDS", "120"))
+
+_node_id = None
+_node_pid = None
+_held = threading.local()  # Lease held by the job running on this thread
+
+
+def node_id() -> str:
+    """Identifies this process in scheduler_leases.owner (recomputed after fork)"""
+    global _node_id, _node_pid
+    if _node_pid != os.getpid():
+        _node_pid = os.getpid()
+        _node_id = f"{socket.gethostname()}:{_node_pid}:{uuid.uuid4().hex[:8]}"
+    return _node_id
+
+
+class JobLease:
+    """Result of job_lease(): `acquired` tells whether this node runs the job"""
+
+    def __init__(self, job_id: str, acquired: bool):
+        self.job_id = job_id
+        self.acquired = acquired
+        self.lost = False  # Set if a heartbeat found the lease taken over
+
+
+def current_lease() -> Optional[JobLease]:
+    """The lease of the job running on this thread (None outside job_lease())"""
+    return getattr(_held, "lease", None)
+
+
+def try_acquire(job_id: str, min_interval: timedelta, owner: Optional[str] = None) -> bool:
+    """Take the lease for one run of `job_id`; False if another node has it or ran it recently"""
+    owner = owner or node_id()
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        insert = upsert_insert(db.get_bind())
+        stmt = (
+            insert(SchedulerLease)
+            .values(
+                job_id=job_id,
+                owner=owner,
+                expires_at=now + timedelta(seconds=LEASE_TTL_SECONDS),
+                last_run_at=now,
+            )
+            .on_conflict_do_update(
+                index_elements=[SchedulerLease.job_id],
+                set_={
+                    "owner": owner,
+                    "expires_at": now + timedelta(seconds=LEASE_TTL_SECONDS),
+                    "last_run_at": now,
+                },
+                where=(SchedulerLease.expires_at < now) & (SchedulerLease.last_run_at <= now - min_interval),
+            )
+        )
+        acquired = db.execute(stmt).rowcount == 1
+        db.commit()
+    return acquired
+
+
+def renew(job_id: str, owner: Optional[str] = None) -> bool:
+    """Extend a held lease; False if it expired and another node took it"""
+    owner = owner or node_id()
+    with SessionLocal() as db:
+        result = db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.job_id == job_id, SchedulerLease.owner == owner)
+            .values(expires_at=datetime.utcnow() + timedelta(seconds=LEASE_TTL_SECONDS))
+        )
+        db.commit()
+    return result.rowcount == 1
+
+
+def release(job_id: str, owner: Optional[str] = None) -> None:
+    """Let the lease expire now (last_run_at stays, so min_interval still applies)"""
+    owner = owner or node_id()
+    with SessionLocal() as db:
+        db.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.job_id == job_id, SchedulerLease.owner == owner)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.commit()
+
+
+@contextmanager
+def job_lease(job_id: str, min_interval: timedelta) -> Iterator[JobLease]:
+    """
+    with job_lease("morning_greeting", timedelta(hours=12)) as lease:
+        if lease.acquired:
+            ...run the job...
+
+    While held, the lease is renewed every third of its TTL.
+    """
+    lease = JobLease(job_id, try_acquire(job_id, min_interval))
+    if not lease.acquired:
+        yield lease
+        return
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(LEASE_TTL_SECONDS / 3):
+            try:
+                if not renew(job_id):
+                    lease.lost = True
+                    log.warning("job_lease_lost", job=job_id, owner=node_id())
+                    return
+            except Exception as e:
+                log.warning("job_lease_renew_failed", job=job_id, error=str(e))
+
+    thread = threading.Thread(target=heartbeat, name=f"sedi-lease-{job_id}", daemon=True)
+    thread.start()
+    outer, _held.lease = current_lease(), lease
+    try:
+        yield lease
+    finally:
+        _held.lease = outer
+        stop.set()
+        thread.join()
+        try:
+            release(job_id)
+        except Exception as e:
+            # The lease simply expires after its TTL
+            log.warning("job_lease_release_failed", job=job_id, error=str(e))
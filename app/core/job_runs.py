@@ -0,0 +1,250 @@
+# app/core/job_runs.py
+"""
+Job Runs - Persistent, Resumable Scheduler Runs
+
+RESPONSIBILITY:
+- One scheduler_runs row per run of a notification job: status, owner,
+  progress and a checkpoint (highest user id done)
+- The checkpoint is written in the same transaction as the chunk's
+  notifications (NotificationWriter.flush(before_commit=...)), so after a
+  crash every user is either done and behind the checkpoint or not done
+  at all: nobody is notified twice, nobody is skipped
+- start_run(): resume the job's latest run if it was interrupted (still
+  "running" after its node died) or failed, within `resume_within`
+- Run history: notifications written, LLM calls and failures, seconds
+  per phase, and whether the run overran the job's interval (RunStats,
+  recorded by finish_run); list_runs() / summarize() for /admin
+- NO job logic
+
+APScheduler's own job store stays in memory: the triggers are defined in
+code, so only the run state has to survive a restart.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import SchedulerRun
+from app.core.job_lease import node_id
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class RunState:
+    """Plain copy of the run row (ORM objects expire on every commit)"""
+
+    __slots__ = ("id", "job_id", "checkpoint_user_id", "processed", "resumed")
+
+    def __init__(self, run: SchedulerRun, resumed: bool):
+        self.id = run.id
+        self.job_id = run.job_id
+        self.checkpoint_user_id = run.checkpoint_user_id or 0
+        self.processed = run.processed or 0
+        self.resumed = resumed
+
+
+class RunStats:
+    """Counters and phase timings of one run; thread-safe (generation workers count LLM calls)"""
+
+    def __init__(self):
+        self.notifications = 0
+        self.llm_calls = 0
+        self.llm_failures = 0
+        self.phase_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def count_llm_call(self) -> None:
+        with self._lock:
+            self.llm_calls += 1
+
+    def count_llm_failure(self) -> None:
+        with self._lock:
+            self.llm_failures += 1
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + elapsed
+
+
+def latest_run(db: Session, job_id: str) -> Optional[SchedulerRun]:
+    return db.execute(
+        select(SchedulerRun)
+        .where(SchedulerRun.job_id == job_id)
+        .order_by(SchedulerRun.started_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def is_resumable(run: Optional[SchedulerRun], resume_within: Optional[timedelta], now: Optional[datetime] = None) -> bool:
+    """Interrupted or failed, and recent enough that its users still need the notification"""
+    if run is None or resume_within is None:
+        return False
+    now = now or datetime.utcnow()
+    return run.status in (STATUS_RUNNING, STATUS_FAILED) and run.started_at >= now - resume_within
+
+
+def start_run(
+    db: Session,
+    job_id: str,
+    resume_within: Optional[timedelta] = None,
+    interval: Optional[timedelta] = None,
+) -> RunState:
+    """
+    Resume the job's latest run if is_resumable(), else start a new one.
+    Call with the job lease held, so a "running" run is not alive elsewhere.
+    `interval` (the job's schedule) is kept to flag runs that overran it.
+    """
+    now = datetime.utcnow()
+    interval_seconds = int(interval.total_seconds()) if interval else None
+    run = latest_run(db, job_id)
+    if is_resumable(run, resume_within, now):
+        run.status = STATUS_RUNNING
+        run.owner = node_id()
+        run.resumes += 1
+        run.error = None
+        run.updated_at = now
+        run.interval_seconds = interval_seconds
+        state = RunState(run, resumed=True)
+        db.commit()
+        return state
+
+    run = SchedulerRun(
+        job_id=job_id,
+        status=STATUS_RUNNING,
+        owner=node_id(),
+        started_at=now,
+        updated_at=now,
+        interval_seconds=interval_seconds,
+    )
+    db.add(run)
+    db.flush()
+    state = RunState(run, resumed=False)
+    db.commit()
+    return state
+
+
+def set_total(db: Session, state: RunState, total: int) -> None:
+    db.execute(update(SchedulerRun).where(SchedulerRun.id == state.id).values(total=total))
+    db.commit()
+
+
+def checkpoint(db: Session, state: RunState, last_user_id: int, count: int) -> None:
+    """Advance the checkpoint inside the caller's transaction (no commit)"""
+    state.checkpoint_user_id = last_user_id
+    state.processed += count
+    db.execute(
+        update(SchedulerRun)
+        .where(SchedulerRun.id == state.id)
+        .values(checkpoint_user_id=last_user_id, processed=state.processed, updated_at=datetime.utcnow())
+    )
+
+
+def finish_run(
+    db: Session,
+    state: RunState,
+    status: str,
+    stats: Optional[RunStats] = None,
+    error: Optional[str] = None,
+) -> None:
+    """Record the outcome; stats add to those of earlier attempts of a resumed run"""
+    db.rollback()  # A failed chunk may have left the transaction unusable
+    run = db.get(SchedulerRun, state.id)
+    now = datetime.utcnow()
+    run.status = status
+    run.finished_at = now
+    run.error = error[:1000] if error else None
+    if run.interval_seconds:
+        run.overran = (now - run.started_at).total_seconds() > run.interval_seconds
+    if stats is not None:
+        run.notifications = (run.notifications or 0) + stats.notifications
+        run.llm_calls = (run.llm_calls or 0) + stats.llm_calls
+        run.llm_failures = (run.llm_failures or 0) + stats.llm_failures
+        phases = json.loads(run.phase_seconds) if run.phase_seconds else {}
+        for name, seconds in stats.phase_seconds.items():
+            phases[name] = round(phases.get(name, 0.0) + seconds, 3)
+        run.phase_seconds = json.dumps(phases)
+    db.commit()
+
+
+def run_dict(run: SchedulerRun) -> Dict[str, any]:
+    end = run.finished_at or run.updated_at
+    return {
+        "id": run.id,
+        "job_id": run.job_id,
+        "status": run.status,
+        "owner": run.owner,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "duration_seconds": round((end - run.started_at).total_seconds(), 3) if end else None,
+        "users_scanned": run.total,
+        "users_processed": run.processed,
+        "notifications": run.notifications,
+        "llm_calls": run.llm_calls,
+        "llm_failures": run.llm_failures,
+        "phase_seconds": json.loads(run.phase_seconds) if run.phase_seconds else {},
+        "interval_seconds": run.interval_seconds,
+        "overran": run.overran,
+        "resumes": run.resumes,
+        "error": run.error,
+    }
+
+
+def list_runs(
+    db: Session,
+    job_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> List[SchedulerRun]:
+    """Newest first; page with before_id (id of the last run of the previous page)"""
+    statement = select(SchedulerRun)
+    if job_id:
+        statement = statement.where(SchedulerRun.job_id == job_id)
+    if status:
+        statement = statement.where(SchedulerRun.status == status)
+    if since:
+        statement = statement.where(SchedulerRun.started_at >= since)
+    if before_id:
+        statement = statement.where(SchedulerRun.id < before_id)
+    return db.execute(statement.order_by(SchedulerRun.id.desc()).limit(limit)).scalars().all()
+
+
+def summarize(runs: List[SchedulerRun]) -> List[Dict[str, any]]:
+    """Per job: run count, duration (avg / max) against the interval, overruns, work done"""
+    by_job: Dict[str, List[SchedulerRun]] = {}
+    for run in runs:
+        by_job.setdefault(run.job_id, []).append(run)
+
+    summary = []
+    for job_id, runs_of_job in sorted(by_job.items()):
+        finished = [run for run in runs_of_job if run.finished_at]
+        durations = [(run.finished_at - run.started_at).total_seconds() for run in finished]
+        summary.append({
+            "job_id": job_id,
+            "runs": len(runs_of_job),
+            "failed": sum(run.status == STATUS_FAILED for run in runs_of_job),
+            "overran": sum(bool(run.overran) for run in runs_of_job),
+            "interval_seconds": runs_of_job[0].interval_seconds,
+            "avg_duration_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            "max_duration_seconds": round(max(durations), 3) if durations else None,
+            "avg_users_scanned": round(sum(run.total or 0 for run in runs_of_job) / len(runs_of_job), 1),
+            "notifications": sum(run.notifications or 0 for run in runs_of_job),
+            "llm_calls": sum(run.llm_calls or 0 for run in runs_of_job),
+            "llm_failures": sum(run.llm_failures or 0 for run in runs_of_job),
+        })
+    return summary
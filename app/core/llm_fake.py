@@ -0,0 +1,328 @@
+# app/core/llm_fake.py
+"""
+Fake LLM - Offline Stand-in for Load Testing
+
+RESPONSIBILITY:
+- Deterministic replies (same messages -> same text), no network
+- Configurable latency distribution, token-rate streaming, error injection
+- Usable in-process (LLM_PROVIDER=fake) or as an OpenAI-compatible HTTP
+  server, so the real OpenAI provider and its connection pool can be
+  exercised too:
+
+    python -m app.core.llm_fake --port 8900
+    LLM_PROVIDER=openai OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+Environment:
+- LLM_FAKE_LATENCY          time to first token, "<dist>:<params>" in seconds
+                            fixed:0.3 | uniform:0.2,1.5 | normal:0.8,0.2 | lognormal:-0.5,0.4
+                            (default fixed:0.05)
+- LLM_FAKE_TOKENS_PER_SEC   generation speed after the first token (default 80, 0 = instant)
+- LLM_FAKE_ERRORS           injected failure rates, e.g. "rate_limit:0.02,server:0.01,timeout:0.005"
+- LLM_FAKE_SEED             RNG seed for latency/errors (default 42)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.llm_gateway import LLMProvider
+
+# Replies are picked by hashing the conversation, so runs are repeatable
+_REPLIES = [
+    "That sounds like a good plan. How are you feeling about it?",
+    "I'm glad you told me. Take it easy today 🌿",
+    "Thanks for sharing that with me. What would help you most right now?",
+    "Good morning! Your numbers look steady. Ready for a new day?",
+    "Remember to drink some water and rest a little.",
+    "I missed you. Everything okay? Say hi when you can.",
+    "Nice to meet you. I'm Sedi. What should I call you?",
+    "I hear you. Would you like to talk now, or later?",
+]
+
+# HTTP status codes used for injected failures
+_ERROR_STATUS = {
+    "rate_limit": 429,
+    "server": 500,
+}
+
+
+class FakeLLMError(Exception):
+    """Injected failure; status_code mirrors what the real API would return"""
+
+    def __init__(self, kind: str, status_code: Optional[int]):
+        super().__init__(f"Injected fake LLM error: {kind}")
+        self.kind = kind
+        self.status_code = status_code
+
+
+def _parse_latency(spec: str):
+    """'uniform:0.2,1.5' -> callable(rng) returning seconds (never negative)"""
+    dist, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+
+    if dist == "fixed":
+        return lambda rng: values[0]
+    if dist == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if dist == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if dist == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown LLM_FAKE_LATENCY distribution '{dist}'")
+
+
+def _parse_errors(spec: str) -> List[Tuple[str, float]]:
+    """'rate_limit:0.02,server:0.01' -> [("rate_limit", 0.02), ("server", 0.01)]"""
+    errors = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        kind, _, rate = item.partition(":")
+        kind = kind.strip()
+        if kind not in _ERROR_STATUS and kind != "timeout":
+            raise ValueError(f"Unknown LLM_FAKE_ERRORS kind '{kind}'")
+        errors.append((kind, float(rate)))
+    return errors
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split into word-sized tokens, keeping whitespace attached"""
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+class FakeLLMProvider(LLMProvider):
+    """In-process provider with simulated latency, streaming and failures"""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: Optional[str] = None,
+        tokens_per_sec: Optional[float] = None,
+        errors: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        self._latency = _parse_latency(latency or os.getenv("LLM_FAKE_LATENCY", "fixed:0.05"))
+        self.tokens_per_sec = float(
+            tokens_per_sec if tokens_per_sec is not None else os.getenv("LLM_FAKE_TOKENS_PER_SEC", "80")
+        )
+        self._errors = _parse_errors(errors if errors is not None else os.getenv("LLM_FAKE_ERRORS", ""))
+        self._rng = random.Random(int(seed if seed is not None else os.getenv("LLM_FAKE_SEED", "42")))
+        self._rng_lock = threading.Lock()
+
+    # ---------- Simulation ----------
+    def reply_for(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        Deterministic reply text for a conversation. In JSON mode
+        (response_format={"type": "json_object"}) the reply is
+        {"messages": [{"id", "text"}]} with one entry per "id" in the last
+        message, the shape batched notification requests ask for, or
+        {"variants": [...]} with "Write N" texts for variant requests.
+        """
+        digest = hashlib.sha256(
+            json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).digest()
+        if (response_format or {}).get("type") == "json_object":
+            prompt = messages[-1].get("content") or ""
+            if '"variants"' in prompt:
+                match = re.search(r"Write (\d+) ", prompt)
+                count = int(match.group(1)) if match else 1
+                return json.dumps(
+                    {"variants": [f"{{name}}, {_REPLIES[(digest[0] + i) % len(_REPLIES)]}" for i in range(count)]},
+                    ensure_ascii=False,
+                )
+            ids = [int(i) for i in re.findall(r'"id":\s*(\d+)', prompt)]
+            return json.dumps(
+                {"messages": [{"id": i, "text": _REPLIES[(digest[0] + i) % len(_REPLIES)]} for i in ids]},
+                ensure_ascii=False,
+            )
+        text = _REPLIES[digest[0] % len(_REPLIES)]
+        if max_tokens:
+            text = "".join(_tokenize(text)[:max_tokens]).strip()
+        return text
+
+    def plan(self, timeout: Optional[float]) -> Tuple[float, Optional[str]]:
+        """
+        Draw one call's behaviour.
+
+        Returns:
+            (time_to_first_token, injected_error_kind or None)
+        """
+        with self._rng_lock:
+            first_token = self._latency(self._rng)
+            roll = self._rng.random()
+
+        error = None
+        threshold = 0.0
+        for kind, rate in self._errors:
+            threshold += rate
+            if roll < threshold:
+                error = kind
+                break
+
+        if timeout is not None and first_token > timeout:
+            error = "timeout"
+        return first_token, error
+
+    @staticmethod
+    def count_usage(messages: List[Dict[str, str]], text: str) -> Dict[str, int]:
+        """Word-token counts in the shape of the OpenAI usage object"""
+        return {
+            "prompt_tokens": sum(len(_tokenize(m.get("content") or "")) for m in messages),
+            "completion_tokens": len(_tokenize(text)),
+        }
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+
+    def _raise(self, kind: str):
+        if kind == "timeout":
+            raise TimeoutError("Fake LLM request timed out")
+        raise FakeLLMError(kind, _ERROR_STATUS.get(kind))
+
+    # ---------- LLMProvider ----------
+    def complete(self, messages, *, model, timeout, usage=None, **params) -> str:
+        text = self.reply_for(messages, params.get("max_tokens"), params.get("response_format"))
+        first_token, error = self.plan(timeout)
+        if error:
+            time.sleep(min(first_token, timeout or first_token))
+            self._raise(error)
+        time.sleep(first_token + self.token_delay() * (len(_tokenize(text)) - 1))
+        if usage is not None:
+            usage.update(self.count_usage(messages, text))
+        return text
+
+    async def acomplete(self, messages, *, model, timeout, usage=None, **params) -> str:
+        text = self.reply_for(messages, params.get("max_tokens"), params.get("response_format"))
+        first_token, error = self.plan(timeout)
+        if error:
+            await asyncio.sleep(min(first_token, timeout or first_token))
+            self._raise(error)
+        await asyncio.sleep(first_token + self.token_delay() * (len(_tokenize(text)) - 1))
+        if usage is not None:
+            usage.update(self.count_usage(messages, text))
+        return text
+
+    async def astream(self, messages, *, model, timeout, usage=None, **params) -> AsyncIterator[str]:
+        text = self.reply_for(messages, params.get("max_tokens"), params.get("response_format"))
+        first_token, error = self.plan(timeout)
+        await asyncio.sleep(min(first_token, timeout or first_token))
+        if error:
+            self._raise(error)
+        if usage is not None:
+            usage.update(self.count_usage(messages, text))
+        for index, token in enumerate(_tokenize(text)):
+            if index:
+                await asyncio.sleep(self.token_delay())
+            yield token
+
+
+# -------------------------------
+# OpenAI-compatible HTTP server
+# -------------------------------
+def create_app(provider: Optional[FakeLLMProvider] = None):
+    """FastAPI app serving /v1/models and /v1/chat/completions (plain + stream)"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    provider = provider or FakeLLMProvider()
+    app = FastAPI(title="Sedi Fake LLM")
+
+    def error_response(kind: str) -> JSONResponse:
+        status = _ERROR_STATUS.get(kind, 504)
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"Injected fake LLM error: {kind}", "type": kind, "code": kind}},
+        )
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "sedi"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+        text = provider.reply_for(messages, body.get("max_tokens"), body.get("response_format"))
+        first_token, error = provider.plan(timeout=None)
+        completion_id = "chatcmpl-fake-" + hashlib.md5(text.encode("utf-8")).hexdigest()[:12]
+        created = int(time.time())
+
+        await asyncio.sleep(first_token)
+        if error:
+            return error_response(error)
+
+        tokens = _tokenize(text)
+        counts = provider.count_usage(messages, text)
+        usage = {**counts, "total_tokens": counts["prompt_tokens"] + counts["completion_tokens"]}
+        if not body.get("stream"):
+            await asyncio.sleep(provider.token_delay() * (len(tokens) - 1))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for index, token in enumerate(tokens):
+                if index:
+                    await asyncio.sleep(provider.token_delay())
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                yield f"data: {json.dumps(payload)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
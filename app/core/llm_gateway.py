@@ -0,0 +1,397 @@
+# app/core/llm_gateway.py
+"""
+LLM Gateway - Single Entry Point for Model Calls
+
+RESPONSIBILITY:
+- Owns ONE pooled HTTP client (sync + async) with keep-alive reuse
+- Per-call timeouts (env default, per call site override, per call argument)
+- Max concurrency (in-flight calls per process)
+- Warm-up of TLS connections at startup
+- Pluggable providers, selected with LLM_PROVIDER
+- NO prompt building
+- NO fallback texts (callers keep their own fallbacks)
+- Metrics per call site: latency, outcome, errors, tokens (app/core/metrics.py)
+
+Every caller (chat replies, greetings, scheduler notifications, ask_sedi)
+goes through get_gateway(); nobody builds an OpenAI client of their own.
+
+Environment:
+- LLM_PROVIDER                 provider name: "openai" (default) or "fake"
+- LLM_TIMEOUT_SECONDS          default read timeout per call (default 30)
+- LLM_TIMEOUT_<CALL_SITE>      override for one call site, e.g. LLM_TIMEOUT_CHAT_REPLY=15
+- LLM_CONNECT_TIMEOUT_SECONDS  TCP/TLS connect timeout (default 5)
+- LLM_MAX_RETRIES              retries on 429/5xx/connection errors (default 2)
+- LLM_MAX_CONCURRENCY          max in-flight calls per process (default 64)
+- LLM_POOL_SIZE                max pooled connections (default 100)
+- LLM_KEEPALIVE_CONNECTIONS    idle keep-alive connections kept (default 20)
+- LLM_WARMUP_CONNECTIONS       connections opened at startup (default 4, 0 = off)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import httpx2 as httpx  # Transport used by newer openai releases
+except ImportError:
+    import httpx
+
+from app.core.metrics import (
+    LLM_ERRORS,
+    LLM_IN_FLIGHT,
+    LLM_REQUEST_DURATION,
+    LLM_REQUESTS,
+    LLM_TOKENS,
+)
+
+load_dotenv()
+
+# ---------- Call sites ----------
+CALL_SITE_CHAT_REPLY = "chat_reply"
+CALL_SITE_CHAT_STREAM = "chat_stream"
+CALL_SITE_GREETING = "greeting"
+CALL_SITE_NOTIFICATION = "notification"
+CALL_SITE_NOTIFICATION_BATCH = "notification_batch"
+CALL_SITE_NOTIFICATION_VARIANTS = "notification_variants"
+CALL_SITE_ASK_SEDI = "ask_sedi"
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# -------------------------------
+# Provider interface
+# -------------------------------
+class LLMProvider:
+    """
+    Base class for model backends.
+
+    Providers receive OpenAI-style `messages` and return plain text;
+    astream() yields text deltas. Errors are raised, not swallowed.
+    When the backend reports token usage, providers store it in the
+    `usage` dict ("prompt_tokens", "completion_tokens").
+    """
+
+    name = "base"
+
+    def complete(self, messages: List[Dict[str, str]], *, model: str, timeout: float, usage: Dict[str, int], **params) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, messages: List[Dict[str, str]], *, model: str, timeout: float, usage: Dict[str, int], **params) -> str:
+        raise NotImplementedError
+
+    async def astream(self, messages: List[Dict[str, str]], *, model: str, timeout: float, usage: Dict[str, int], **params) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    def warm_up(self, connections: int) -> None:
+        """Open connections ahead of the first real call (optional)"""
+
+    async def awarm_up(self, connections: int) -> None:
+        """Async variant of warm_up() for the async connection pool (optional)"""
+
+    def close(self) -> None:
+        """Release pooled connections (optional)"""
+
+    async def aclose(self) -> None:
+        """Async variant of close() (optional)"""
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI (or any OpenAI-compatible server via OPENAI_BASE_URL)"""
+
+    name = "openai"
+
+    def __init__(self):
+        from openai import OpenAI, AsyncOpenAI
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set in .env file")
+
+        timeout = httpx.Timeout(
+            _env_float("LLM_TIMEOUT_SECONDS", 30.0),
+            connect=_env_float("LLM_CONNECT_TIMEOUT_SECONDS", 5.0),
+        )
+        limits = httpx.Limits(
+            max_connections=_env_int("LLM_POOL_SIZE", 100),
+            max_keepalive_connections=_env_int("LLM_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=60.0,
+        )
+        max_retries = _env_int("LLM_MAX_RETRIES", 2)
+
+        self.client = OpenAI(
+            api_key=api_key,
+            max_retries=max_retries,
+            timeout=timeout,
+            http_client=httpx.Client(timeout=timeout, limits=limits),
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=max_retries,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(timeout=timeout, limits=limits),
+        )
+
+    @staticmethod
+    def _store_usage(usage: Dict[str, int], reported) -> None:
+        if reported is not None:
+            usage["prompt_tokens"] = reported.prompt_tokens or 0
+            usage["completion_tokens"] = reported.completion_tokens or 0
+
+    def complete(self, messages, *, model, timeout, usage, **params) -> str:
+        completion = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout,
+            **params,
+        )
+        self._store_usage(usage, completion.usage)
+        return completion.choices[0].message.content.strip()
+
+    async def acomplete(self, messages, *, model, timeout, usage, **params) -> str:
+        completion = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout,
+            **params,
+        )
+        self._store_usage(usage, completion.usage)
+        return completion.choices[0].message.content.strip()
+
+    async def astream(self, messages, *, model, timeout, usage, **params) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout,
+            stream=True,
+            stream_options={"include_usage": True},  # Usage arrives in a final chunk
+            **params,
+        )
+        try:
+            async for chunk in stream:
+                self._store_usage(usage, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
+
+    def warm_up(self, connections: int) -> None:
+        # models.list() is cheap and completes the TLS handshake
+        for _ in range(connections):
+            self.client.models.list()
+
+    async def awarm_up(self, connections: int) -> None:
+        # Concurrent requests, so the pool really opens N connections
+        await asyncio.gather(*[
+            self.async_client.models.list() for _ in range(connections)
+        ])
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        await self.async_client.close()
+
+
+# -------------------------------
+# Provider registry
+# -------------------------------
+def _fake_provider() -> LLMProvider:
+    # Imported lazily: llm_fake depends on this module
+    from app.core.llm_fake import FakeLLMProvider
+    return FakeLLMProvider()
+
+
+_PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {
+    OpenAIProvider.name: OpenAIProvider,
+    "fake": _fake_provider,  # Offline load testing, see llm_fake.py
+}
+
+
+def register_provider(name: str, factory: Callable[[], LLMProvider]) -> None:
+    """Make a provider selectable with LLM_PROVIDER=<name>"""
+    _PROVIDERS[name] = factory
+
+
+# -------------------------------
+# Gateway
+# -------------------------------
+class LLMGateway:
+    """Concurrency limits, timeouts and warm-up around one provider"""
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_concurrency: Optional[int] = None,
+        default_timeout: Optional[float] = None,
+    ):
+        self.provider = provider
+        self.max_concurrency = max_concurrency or _env_int("LLM_MAX_CONCURRENCY", 64)
+        self.default_timeout = default_timeout or _env_float("LLM_TIMEOUT_SECONDS", 30.0)
+        # Sync callers (threadpool routes, scheduler) and async callers
+        # (event loop) are limited separately; each limit is per process
+        self._sync_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_slots = asyncio.Semaphore(self.max_concurrency)
+
+    def timeout_for(self, call_site: str, timeout: Optional[float] = None) -> float:
+        """Per-call timeout: explicit argument > LLM_TIMEOUT_<CALL_SITE> > default"""
+        if timeout is not None:
+            return timeout
+        return _env_float(f"LLM_TIMEOUT_{call_site.upper()}", self.default_timeout)
+
+    @contextmanager
+    def _observe(self, call_site: str, usage: Dict[str, int]):
+        """Record latency, outcome and tokens of one provider call"""
+        in_flight = LLM_IN_FLIGHT.labels(call_site=call_site)
+        in_flight.inc()
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except Exception as e:
+            outcome = "error"
+            LLM_ERRORS.labels(call_site=call_site, error=type(e).__name__).inc()
+            raise
+        finally:
+            in_flight.dec()
+            LLM_REQUEST_DURATION.labels(call_site=call_site).observe(time.perf_counter() - started)
+            LLM_REQUESTS.labels(call_site=call_site, provider=self.provider.name, outcome=outcome).inc()
+            for kind in ("prompt", "completion"):
+                tokens = usage.get(f"{kind}_tokens")
+                if tokens:
+                    LLM_TOKENS.labels(call_site=call_site, kind=kind).inc(tokens)
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        call_site: str,
+        model: str,
+        timeout: Optional[float] = None,
+        **params,
+    ) -> str:
+        """Blocking completion; returns the stripped reply text"""
+        usage: Dict[str, int] = {}
+        with self._sync_slots, self._observe(call_site, usage):
+            return self.provider.complete(
+                messages,
+                model=model,
+                timeout=self.timeout_for(call_site, timeout),
+                usage=usage,
+                **params,
+            )
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        call_site: str,
+        model: str,
+        timeout: Optional[float] = None,
+        **params,
+    ) -> str:
+        """Async completion; returns the stripped reply text"""
+        usage: Dict[str, int] = {}
+        async with self._async_slots:
+            with self._observe(call_site, usage):
+                return await self.provider.acomplete(
+                    messages,
+                    model=model,
+                    timeout=self.timeout_for(call_site, timeout),
+                    usage=usage,
+                    **params,
+                )
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        call_site: str,
+        model: str,
+        timeout: Optional[float] = None,
+        **params,
+    ) -> AsyncIterator[str]:
+        """Async streaming completion; yields raw text deltas"""
+        usage: Dict[str, int] = {}
+        async with self._async_slots:
+            with self._observe(call_site, usage):
+                deltas = self.provider.astream(
+                    messages,
+                    model=model,
+                    timeout=self.timeout_for(call_site, timeout),
+                    usage=usage,
+                    **params,
+                )
+                try:
+                    async for delta in deltas:
+                        yield delta
+                finally:
+                    await deltas.aclose()
+
+    def warm_up(self) -> None:
+        """Open LLM_WARMUP_CONNECTIONS connections on the sync pool"""
+        connections = _env_int("LLM_WARMUP_CONNECTIONS", 4)
+        if connections <= 0:
+            return
+        try:
+            self.provider.warm_up(connections)
+            print(f"[LLM GATEWAY] Warmed up {connections} sync connections ({self.provider.name})")
+        except Exception as e:
+            print(f"[LLM GATEWAY] Warm-up failed: {e}")
+
+    async def awarm_up(self) -> None:
+        """Open LLM_WARMUP_CONNECTIONS connections on the async pool"""
+        connections = _env_int("LLM_WARMUP_CONNECTIONS", 4)
+        if connections <= 0:
+            return
+        try:
+            await self.provider.awarm_up(connections)
+            print(f"[LLM GATEWAY] Warmed up {connections} async connections ({self.provider.name})")
+        except Exception as e:
+            print(f"[LLM GATEWAY] Async warm-up failed: {e}")
+
+    async def aclose(self) -> None:
+        self.provider.close()
+        await self.provider.aclose()
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway, created on first use from LLM_PROVIDER"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                provider_name = os.getenv("LLM_PROVIDER", OpenAIProvider.name)
+                if provider_name not in _PROVIDERS:
+                    raise RuntimeError(f"Unknown LLM_PROVIDER '{provider_name}'")
+                _gateway = LLMGateway(_PROVIDERS[provider_name]())
+    return _gateway
+
+
+async def close_gateway() -> None:
+    """Close pooled connections; the next get_gateway() builds a fresh one"""
+    global _gateway
+    with _gateway_lock:
+        gateway, _gateway = _gateway, None
+    if gateway is not None:
+        await gateway.aclose()
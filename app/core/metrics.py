@@ -0,0 +1,423 @@
+# app/core/metrics.py
+"""
+Metrics - Prometheus Text Exposition Without Extra Dependencies
+
+RESPONSIBILITY:
+- Counter / Gauge / Histogram families with labels (thread-safe)
+- render() in Prometheus text format for GET /metrics
+- MetricsMiddleware: per-route latency histograms and status counts
+- Connection pool instrumentation for the SQLAlchemy engine
+- The metric families used across the app are defined here, so every
+  name is visible in one place
+
+Values are per process: with several uvicorn workers, scrape each
+worker (or run one worker per container).
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# -------------------------------
+# Metric families
+# -------------------------------
+class _Family:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def collect(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Family):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def collect(self):
+        for key, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(_Family):
+    """Gauge; children are either set/inc/dec directly or read from a callback"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def _new_child(self):
+        return _Value()
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._callbacks[key] = function
+
+    def collect(self):
+        for key, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+        with self._lock:
+            callbacks = list(self._callbacks.items())
+        for key, function in callbacks:
+            try:
+                value = function()
+            except Exception:
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "count", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], int, float]:
+        """(cumulative [(upper_bound, count)], count, sum)"""
+        with self._lock:
+            counts, total, total_sum = list(self.counts), self.count, self.sum
+        cumulative, running = [], 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+            running += count
+            cumulative.append((bound, running))
+        return cumulative, total, total_sum
+
+
+class Histogram(_Family):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def collect(self):
+        for key, child in self._items():
+            cumulative, total, total_sum = child.snapshot()
+            for bound, count in cumulative:
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total_sum)}"
+            yield f"{self.name}_count{labels} {total}"
+
+
+_REGISTRY: List[_Family] = []
+
+
+def _register(family):
+    _REGISTRY.append(family)
+    return family
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format (version 0.0.4)"""
+    lines = []
+    for family in _REGISTRY:
+        samples = list(family.collect())
+        if not samples:
+            continue
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# Application metrics
+# -------------------------------
+HTTP_REQUEST_DURATION = _register(Histogram(
+    "sedi_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"],
+))
+HTTP_REQUESTS = _register(Counter(
+    "sedi_http_requests_total", "HTTP requests by route and status code",
+    ["method", "route", "status"],
+))
+HTTP_IN_FLIGHT = _register(Gauge(
+    "sedi_http_requests_in_flight", "HTTP requests currently being served",
+))
+
+PHASE_DURATION = _register(Histogram(
+    "sedi_phase_duration_seconds", "Duration of traced phases (see app/core/tracing.py)",
+    ["phase"], buckets=FAST_BUCKETS,
+))
+
+DB_POOL_CONNECTIONS = _register(Gauge(
+    "sedi_db_pool_connections", "SQLAlchemy pool connections by state",
+    ["state"],
+))
+DB_POOL_CHECKOUTS = _register(Counter(
+    "sedi_db_pool_checkouts_total", "Connections checked out of the pool",
+))
+DB_POOL_CHECKOUT_DURATION = _register(Histogram(
+    "sedi_db_pool_checkout_seconds", "Time to get a connection from the pool (wait + connect + ping)",
+    buckets=FAST_BUCKETS,
+))
+DB_POOL_CONNECTS = _register(Counter(
+    "sedi_db_pool_connects_total", "New DBAPI connections opened",
+))
+DB_POOL_TIMEOUTS = _register(Counter(
+    "sedi_db_pool_timeouts_total", "Checkouts that failed because the pool was exhausted",
+))
+
+LLM_REQUEST_DURATION = _register(Histogram(
+    "sedi_llm_request_duration_seconds", "LLM call latency by call site",
+    ["call_site"],
+))
+LLM_REQUESTS = _register(Counter(
+    "sedi_llm_requests_total", "LLM calls by call site and outcome",
+    ["call_site", "provider", "outcome"],
+))
+LLM_ERRORS = _register(Counter(
+    "sedi_llm_errors_total", "Failed LLM calls by call site and error type",
+    ["call_site", "error"],
+))
+LLM_TOKENS = _register(Counter(
+    "sedi_llm_tokens_total", "LLM tokens by call site and kind (prompt/completion)",
+    ["call_site", "kind"],
+))
+LLM_IN_FLIGHT = _register(Gauge(
+    "sedi_llm_requests_in_flight", "LLM calls currently running",
+    ["call_site"],
+))
+
+SCHEDULER_JOB_DURATION = _register(Histogram(
+    "sedi_scheduler_job_duration_seconds", "Scheduler job run time",
+    ["job"], buckets=JOB_BUCKETS,
+))
+SCHEDULER_JOB_RUNS = _register(Counter(
+    "sedi_scheduler_job_runs_total", "Scheduler job runs by outcome",
+    ["job", "outcome"],
+))
+SCHEDULER_JOB_USERS = _register(Gauge(
+    "sedi_scheduler_job_users", "Users processed by the last run of a scheduler job",
+    ["job"],
+))
+SCHEDULER_JOB_PROGRESS = _register(Gauge(
+    "sedi_scheduler_job_progress_users", "Users processed so far by the current (or last) run",
+    ["job"],
+))
+SCHEDULER_JOB_TOTAL = _register(Gauge(
+    "sedi_scheduler_job_total_users", "Users selected by the current (or last) run",
+    ["job"],
+))
+SCHEDULER_JOB_USERS_TOTAL = _register(Counter(
+    "sedi_scheduler_job_users_total", "Users processed by a scheduler job, all runs",
+    ["job"],
+))
+
+NOTIFICATION_VARIANT_LOOKUPS = _register(Counter(
+    "sedi_notification_variant_lookups_total", "Notification texts taken from the variant cache (hit) or generated (miss)",
+    ["notification_type", "result"],
+))
+NOTIFICATION_VARIANT_POOLS = _register(Gauge(
+    "sedi_notification_variant_pools", "Variant pools (language, type, health bucket) currently cached",
+))
+
+DEVICE_FLEET = _register(Gauge(
+    "sedi_device_fleet_devices", "Devices known to this worker's fleet monitor by liveness state",
+    ["state"],
+))
+DEVICE_LIVENESS_EVENTS = _register(Counter(
+    "sedi_device_liveness_events_total", "Devices that went offline (missed their heartbeat deadline) or came back online",
+    ["event"],
+))
+DEVICE_COMMAND_WAITERS = _register(Gauge(
+    "sedi_device_command_waiters", "Long-polls of /device/pending-commands parked waiting for a command",
+))
+
+VITALS_SAMPLES = _register(Counter(
+    "sedi_vitals_samples_total", "Waveform samples analyzed by the vitals derivation job",
+    ["signal"],
+))
+VITALS_POINTS = _register(Counter(
+    "sedi_vitals_points_total", "HealthData points derived from waveforms",
+    ["signal"],
+))
+
+
+# -------------------------------
+# HTTP middleware
+# -------------------------------
+_route_prefixes: Dict[int, str] = {}
+
+
+def _route_template(scope) -> str:
+    """
+    "/interact/chat" for the matched route. Routes of an included router
+    may carry their path relative to the router prefix, so the prefix is
+    recovered from the request path once per route and cached.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    prefix = _route_prefixes.get(id(route))
+    if prefix is None:
+        path = scope.get("path", "")
+        regex = getattr(route, "path_regex", None)
+        prefix = ""
+        if regex is not None and not regex.match(path):
+            for index in range(1, len(path) + 1):
+                if (index == len(path) or path[index] == "/") and regex.match(path[index:]):
+                    prefix = path[:index]
+                    break
+        _route_prefixes[id(route)] = prefix
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template
+    (e.g. "/interact/chat", never raw URLs, so label cardinality stays
+    bounded). Streaming responses are timed until the body is complete.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.labels().inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.labels().dec()
+            route_path = _route_template(scope)
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.labels(method=method, route=route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method=method, route=route_path, status=status[0]).inc()
+
+
+# -------------------------------
+# SQLAlchemy pool
+# -------------------------------
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout (pass as poolclass=)"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels().inc()
+            raise
+        DB_POOL_CHECKOUT_DURATION.labels().observe(time.perf_counter() - started)
+        return connection
+
+
+def instrument_engine(engine) -> None:
+    """Pool gauges (size / checked out / idle / overflow) and checkout counters"""
+    pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels().inc()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTS.labels().inc()
+
+    if isinstance(pool, QueuePool):
+        DB_POOL_CONNECTIONS.set_function(pool.size, state="size")
+        DB_POOL_CONNECTIONS.set_function(pool.checkedout, state="checked_out")
+        DB_POOL_CONNECTIONS.set_function(pool.checkedin, state="idle")
+        DB_POOL_CONNECTIONS.set_function(lambda: max(pool.overflow(), 0), state="overflow")
@@ -0,0 +1,194 @@
+# app/core/notification_variants.py
+"""
+Notification Variants - Cached, Personalized Notification Texts
+
+RESPONSIBILITY:
+- Pool of NOTIFICATION_VARIANTS texts per (language, type, health bucket),
+  generated with ONE LLM call (request_notification_variants) and a
+  {name} placeholder for the user's name
+- Pools expire after NOTIFICATION_VARIANT_TTL_SECONDS; refresh()
+  regenerates every known pool (scheduled job) so campaigns find them warm
+- personalize(): picks a variant and fills in the user's name
+- NO per-user LLM calls: users without a pool get None and the caller
+  generates their text as before
+
+Health bucket: for inactivity pings, the hours since the last talk
+rounded down to INACTIVITY_BUCKETS_HOURS; for other types, the health
+summary text itself. Pass coarse summaries ("within normal range"), not
+raw readings, or every user gets a pool of their own.
+
+Environment:
+- NOTIFICATION_VARIANTS             texts per pool (default 8, 0 = off)
+- NOTIFICATION_VARIANT_TTL_SECONDS  pool lifetime (default 21600 = 6h)
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.ai_text_engine import (
+    NOTIF_TYPE_INACTIVE,
+    VARIANT_NAME_PLACEHOLDER,
+    request_notification_variants,
+)
+from app.core.metrics import NOTIFICATION_VARIANT_LOOKUPS, NOTIFICATION_VARIANT_POOLS
+from app.core.tracing import get_logger
+
+log = get_logger("notification_variants")
+
+VARIANT_COUNT = int(os.getenv("NOTIFICATION_VARIANTS", "8"))
+VARIANT_TTL_SECONDS = float(os.getenv("NOTIFICATION_VARIANT_TTL_SECONDS", "21600"))
+INACTIVITY_BUCKETS_HOURS = (3, 6, 24)  # Lower bounds
+FAILURE_RETRY_SECONDS = 300            # A pool that failed to generate is not retried sooner
+
+VariantKey = Tuple[str, str, str]
+
+
+def variant_key(request: Dict[str, any]) -> VariantKey:
+    """(language, notification_type, health bucket) of a notification request"""
+    language = request.get("language")
+    if language not in ("fa", "ar", "en"):
+        language = "en"
+    notification_type = request.get("notification_type")
+
+    if notification_type == NOTIF_TYPE_INACTIVE:
+        hours = request.get("hours_since_last_talk") or INACTIVITY_BUCKETS_HOURS[0]
+        bucket = max((b for b in INACTIVITY_BUCKETS_HOURS if hours >= b), default=INACTIVITY_BUCKETS_HOURS[0])
+        return language, notification_type, f"{bucket}h"
+
+    summary = request.get("health_summary")
+    bucket = hashlib.sha1(summary.encode("utf-8")).hexdigest()[:12] if summary else "default"
+    return language, notification_type, bucket
+
+
+class _Pool:
+    __slots__ = ("texts", "generated_at", "health_summary")
+
+    def __init__(self, texts: List[str], health_summary: Optional[str]):
+        self.texts = texts
+        self.generated_at = time.monotonic()
+        self.health_summary = health_summary
+
+
+class NotificationVariantCache:
+    """
+    In-process variant pools.
+
+        variant_cache.ensure(requests)              # generate missing/expired pools
+        text = variant_cache.personalize(request)   # None -> generate per user
+
+    `generate` (ensure/refresh) takes the keyword arguments of
+    request_notification_variants() and returns the texts; it defaults to
+    calling it directly. A pool whose regeneration fails keeps serving
+    its old texts.
+    """
+
+    def __init__(self, size: int = VARIANT_COUNT, ttl: float = VARIANT_TTL_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self._pools: Dict[VariantKey, _Pool] = {}
+        self._failed: Dict[VariantKey, float] = {}
+        self._lock = threading.Lock()
+        NOTIFICATION_VARIANT_POOLS.set_function(lambda: len(self._pools))
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _variant_request(self, key: VariantKey, health_summary: Optional[str]) -> Dict[str, any]:
+        language, notification_type, bucket = key
+        return dict(
+            count=self.size,
+            language=language,
+            notification_type=notification_type,
+            health_summary=health_summary,
+            hours_since_last_talk=int(bucket[:-1]) if notification_type == NOTIF_TYPE_INACTIVE else None,
+        )
+
+    def _generate(
+        self,
+        wanted: Dict[VariantKey, Optional[str]],
+        generate: Optional[Callable[..., Optional[List[str]]]],
+        executor_map: Callable = map,
+    ) -> int:
+        """Generate pools for `wanted` (key -> health summary); returns pools stored"""
+        generate = generate or request_notification_variants
+
+        def run(item):
+            key, health_summary = item
+            try:
+                return generate(**self._variant_request(key, health_summary))
+            except Exception as e:
+                log.warning("notification_variants_failed", key="/".join(key), error=str(e))
+                return None
+
+        items = list(wanted.items())
+        stored = 0
+        for (key, health_summary), texts in zip(items, executor_map(run, items)):
+            with self._lock:
+                if texts:
+                    self._pools[key] = _Pool(texts, health_summary)
+                    self._failed.pop(key, None)
+                    stored += 1
+                else:
+                    self._failed[key] = time.monotonic()
+        return stored
+
+    def ensure(
+        self,
+        requests: Iterable[Dict[str, any]],
+        generate: Optional[Callable[..., Optional[List[str]]]] = None,
+        executor_map: Callable = map,
+    ) -> int:
+        """
+        Generate the pools `requests` need that are missing or older than
+        the TTL (one LLM call per pool, run through `executor_map`). Pools
+        that failed within FAILURE_RETRY_SECONDS are skipped. Returns the
+        number of pools generated.
+        """
+        if not self.enabled:
+            return 0
+        now = time.monotonic()
+        wanted: Dict[VariantKey, Optional[str]] = {}
+        for request in requests:
+            key = variant_key(request)
+            if key in wanted:
+                continue
+            if now - self._failed.get(key, float("-inf")) < FAILURE_RETRY_SECONDS:
+                continue
+            pool = self._pools.get(key)
+            if pool is None or now - pool.generated_at >= self.ttl:
+                wanted[key] = request.get("health_summary")
+        return self._generate(wanted, generate, executor_map) if wanted else 0
+
+    def refresh(
+        self,
+        generate: Optional[Callable[..., Optional[List[str]]]] = None,
+        executor_map: Callable = map,
+    ) -> int:
+        """Regenerate every known pool; returns the number refreshed"""
+        with self._lock:
+            wanted = {key: pool.health_summary for key, pool in self._pools.items()}
+        return self._generate(wanted, generate, executor_map)
+
+    def personalize(self, request: Dict[str, any]) -> Optional[str]:
+        """A cached variant with the user's name filled in, or None if there is no pool"""
+        notification_type = request.get("notification_type")
+        pool = self._pools.get(variant_key(request)) if self.enabled else None
+        if pool is None:
+            NOTIFICATION_VARIANT_LOOKUPS.labels(notification_type=notification_type, result="miss").inc()
+            return None
+        NOTIFICATION_VARIANT_LOOKUPS.labels(notification_type=notification_type, result="hit").inc()
+        name = request.get("user_name") or "my friend"
+        return random.choice(pool.texts).replace(VARIANT_NAME_PLACEHOLDER, name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pools.clear()
+            self._failed.clear()
+
+
+variant_cache = NotificationVariantCache()
@@ -0,0 +1,171 @@
+# app/core/notification_writer.py
+"""
+Notification Writer - Batched Notification Inserts
+
+RESPONSIBILITY:
+- insert_notifications(): many rows in one statement (multi-row INSERT,
+  COPY on PostgreSQL for large batches) inside the caller's transaction
+- NotificationWriter: buffers rows and flushes them every
+  NOTIFICATION_BATCH_SIZE rows or NOTIFICATION_FLUSH_SECONDS seconds,
+  one transaction per flush instead of one per notification
+- NO text generation
+
+Environment:
+- NOTIFICATION_BATCH_SIZE      rows per flush (default 500)
+- NOTIFICATION_FLUSH_SECONDS   max age of a buffered row before flush (default 5)
+- NOTIFICATION_COPY_THRESHOLD  batches this large use COPY on PostgreSQL (default 1000)
+"""
+
+import csv
+import io
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import Notification
+
+BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))
+FLUSH_SECONDS = float(os.getenv("NOTIFICATION_FLUSH_SECONDS", "5"))
+COPY_THRESHOLD = int(os.getenv("NOTIFICATION_COPY_THRESHOLD", "1000"))
+
+_table = Notification.__table__
+# Row dicts use attribute keys (metadata_json); COPY needs the DB column names (metadata)
+_COLUMNS = [(column.key, column.name) for column in _table.columns if column.key != "id"]
+
+
+def notification_row(
+    user_id: int,
+    message: str,
+    type: str = "info",
+    priority: str = "normal",
+    title: Optional[str] = None,
+    actions: Optional[str] = None,
+    metadata_json: Optional[str] = None,
+    is_read: bool = False,
+    created_at: Optional[datetime] = None,
+    release_at: Optional[datetime] = None,
+) -> Dict[str, any]:
+    """
+    Complete row dict with the same defaults as the Notification model.
+    With release_at the row stays hidden until it is released.
+    """
+    return {
+        "user_id": user_id,
+        "type": type,
+        "priority": priority,
+        "title": title,
+        "message": message,
+        "actions": actions,
+        "metadata_json": metadata_json,
+        "is_read": is_read,
+        "created_at": created_at or datetime.utcnow(),
+        "release_at": release_at,
+    }
+
+
+def _copy_notifications(db: Session, rows: List[Dict[str, any]]) -> None:
+    """PostgreSQL COPY FROM STDIN on the session's own connection/transaction"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row.get(key) is None else row[key] for key, _ in _COLUMNS])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {_table.name} ({', '.join(name for _, name in _COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_notifications(db: Session, rows: List[Dict[str, any]]) -> int:
+    """
+    Insert rows (see notification_row) in one round trip. Runs in the
+    session's transaction - the caller commits.
+    """
+    if not rows:
+        return 0
+    if db.get_bind().dialect.name == "postgresql" and len(rows) >= COPY_THRESHOLD:
+        _copy_notifications(db, rows)
+    else:
+        # executemany -> batched multi-row INSERT ... VALUES (insertmanyvalues)
+        db.execute(insert(Notification), rows)
+    return len(rows)
+
+
+class NotificationWriter:
+    """
+    Buffer notifications and write them in batches.
+
+        with NotificationWriter(db) as writer:
+            for ...:
+                writer.add(user_id, message, type="health_check")
+
+    Rows are flushed (and committed) when the buffer reaches batch_size,
+    when the oldest buffered row is older than flush_interval (checked on
+    add), and on exit. With auto_flush=False only explicit flush() calls
+    and exit write, so the caller decides what one transaction contains.
+    Not thread-safe: use from one thread.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_SECONDS,
+        auto_flush: bool = True,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.auto_flush = auto_flush
+        self.written = 0
+        self._rows: List[Dict[str, any]] = []
+        self._oldest: Optional[float] = None
+
+    def add(self, user_id: int, message: str, **fields) -> None:
+        self.add_row(notification_row(user_id, message, **fields))
+
+    def add_row(self, row: Dict[str, any]) -> None:
+        if not self._rows:
+            self._oldest = time.monotonic()
+        self._rows.append(row)
+        if not self.auto_flush:
+            return
+        if len(self._rows) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval:
+            self.flush()
+
+    def flush(self, before_commit: Optional[Callable[[List[Dict[str, any]]], None]] = None) -> int:
+        """
+        Write and commit buffered rows; returns the number written.
+        before_commit(rows) runs in the same transaction, after the insert
+        (e.g. a checkpoint that must be stored together with the rows).
+        """
+        rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            insert_notifications(self.db, rows)
+            if before_commit is not None:
+                before_commit(rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.written += len(rows)
+        return len(rows)
+
+    def __enter__(self) -> "NotificationWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Rows buffered before an error are still valid notifications
+        self.flush()
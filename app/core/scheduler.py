@@ -1,14 +1,40 @@
 # app/core/scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 from fastapi import Depends
 import pytz
 
 from app.database import get_db
-from app.models import User, Notification
+from app.models import User, Memory, ConversationState
+from app.core.metrics import (
+    SCHEDULER_JOB_DURATION,
+    SCHEDULER_JOB_PROGRESS,
+    SCHEDULER_JOB_RUNS,
+    SCHEDULER_JOB_TOTAL,
+    SCHEDULER_JOB_USERS,
+    SCHEDULER_JOB_USERS_TOTAL,
+)
+from app.core.tracing import get_logger
+from app.core.notification_writer import NotificationWriter
+from app.core.job_lease import LEASE_TTL_SECONDS, current_lease, job_lease
+from app.core import job_runs
+from app.core import greeting_schedule
+from app.core import vitals
+from app.core.notification_variants import variant_cache
 from app.core.ai_text_engine import (
-    generate_notification_text,
+    request_notification_text,
+    request_notification_texts,
+    request_notification_variants,
+    fallback_notification_text,
     NOTIF_TYPE_MORNING,
     NOTIF_TYPE_HEALTH_CHECK,
     NOTIF_TYPE_INACTIVE,
@@ -19,111 +45,677 @@ from app.core.ai_text_engine import (
 # -------------------------------
 CHECK_INTERVAL_HOURS = 2       # Health check interval (every 2 hours)
 INACTIVE_HOURS = 3             # Inactive threshold (if no interaction for 3+ hours)
-MORNING_HOUR = 8               # Morning greeting time (8 AM)
+GREETING_TICK_SECONDS = 60     # Due morning greetings are picked up every minute (see greeting_schedule.py)
+GREETING_SYNC_MINUTES = 10     # New users get a greeting_schedule row within this time
+PREGENERATION_HOUR = int(os.getenv("GREETING_PREGENERATION_HOUR", "3"))  # Off-peak run (scheduler timezone)
+PREGENERATION_INTERVAL_HOURS = 24
+PREGENERATION_HORIZON_HOURS = 26  # Covers the next local morning in every timezone
+PREGENERATION_LEAD_MINUTES = 5    # Greetings due sooner are left to the morning_greeting tick
+CHUNK_SIZE = int(os.getenv("SCHEDULER_CHUNK_SIZE", "1000"))  # Users loaded per query
+GENERATION_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "16"))  # Parallel LLM calls per job
+LLM_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_LLM_MAX_ATTEMPTS", "5"))    # Per user, then fallback text
+LLM_BATCH_SIZE = int(os.getenv("SCHEDULER_LLM_BATCH_SIZE", "20"))       # Users per LLM request (1 = one call per user)
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+PROGRESS_INTERVAL_SECONDS = 30
+VARIANT_REFRESH_HOURS = 3      # Keep notification variant pools warm (see notification_variants.py)
+VITALS_INTERVAL_SECONDS = int(os.getenv("VITALS_INTERVAL_SECONDS", "60"))  # HR/HRV from new waveforms (see vitals.py)
+# Schedule per job, recorded with each run to flag runs that overran it (scheduler_runs.overran)
+JOB_INTERVALS = {
+    "morning_greeting": timedelta(seconds=GREETING_TICK_SECONDS),
+    "greeting_pregeneration": timedelta(hours=PREGENERATION_INTERVAL_HOURS),
+    "health_check": timedelta(hours=CHECK_INTERVAL_HOURS),
+    "inactive_check": timedelta(hours=INACTIVE_HOURS),
+}
+# An interrupted or failed run younger than this is resumed from its checkpoint
+# instead of starting over (see job_runs.py); older ones are superseded by the next run
+RESUME_WINDOWS = {
+    "health_check": timedelta(hours=CHECK_INTERVAL_HOURS),
+    "inactive_check": timedelta(hours=INACTIVE_HOURS),
+    "greeting_pregeneration": timedelta(hours=12),
+}
+
+LEASE_TOLERANCE_SECONDS = 60  # Cap on how much earlier than a full interval a job may run again (see lease_interval)
+
+log = get_logger("scheduler")
 
 scheduler = BackgroundScheduler(timezone=pytz.timezone("Asia/Tehran"))
 
+
+def lease_interval(interval: timedelta) -> timedelta:
+    """
+    min_interval for a job scheduled every `interval`: the full interval
+    less a small tolerance for timer jitter (10%, at most
+    LEASE_TOLERANCE_SECONDS). Much less than the interval would let nodes
+    whose schedules are out of phase each win the lease in turn, running
+    the job up to twice per interval.
+    """
+    return interval - min(interval * 0.1, timedelta(seconds=LEASE_TOLERANCE_SECONDS))
+
+
+def instrumented_job(job_id: str, min_interval: Optional[timedelta] = None):
+    """
+    Record duration, outcome and processed user count (job return value) in /metrics.
+
+    With `min_interval` the job is exclusive across worker processes: it
+    only runs on the node that gets the job lease, and not again on any
+    node within `min_interval` of the last start (see job_lease.py).
+    Other nodes record the run as "skipped". job.resume() runs it as soon
+    as nobody holds the lease, ignoring `min_interval` (the interrupted run
+    it continues already counted as the last start).
+    """
+    def decorator(job):
+        def leased(interval: Optional[timedelta], *args, **kwargs):
+            if interval is None:
+                return measured(*args, **kwargs)
+            with job_lease(job_id, interval) as lease:
+                if not lease.acquired:
+                    SCHEDULER_JOB_RUNS.labels(job=job_id, outcome="skipped").inc()
+                    print(f"[Sedi Scheduler] {job_id}: skipped, running or recently run on another node")
+                    return 0
+                return measured(*args, **kwargs)
+
+        @functools.wraps(job)
+        def run(*args, **kwargs):
+            return leased(min_interval, *args, **kwargs)
+
+        def resume(*args, **kwargs):
+            return leased(timedelta(0) if min_interval is not None else None, *args, **kwargs)
+
+        def measured(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                users = job(*args, **kwargs) or 0
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                SCHEDULER_JOB_DURATION.labels(job=job_id).observe(time.perf_counter() - started)
+                SCHEDULER_JOB_RUNS.labels(job=job_id, outcome=outcome).inc()
+            SCHEDULER_JOB_USERS.labels(job=job_id).set(users)
+            SCHEDULER_JOB_USERS_TOTAL.labels(job=job_id).inc(users)
+            return users
+
+        run.resume = resume
+        return run
+    return decorator
+
+# -------------------------------
+# Keyset-paginated user chunks
+# -------------------------------
+def iter_user_chunks(db: Session, statement, chunk_size: int = CHUNK_SIZE, start_after: int = 0) -> Iterator[List]:
+    """
+    Run `statement` (a select whose first column is User.id) in chunks of
+    `chunk_size` rows ordered by User.id, continuing after the last id of
+    the previous chunk (the first chunk starts after `start_after`). One
+    query per chunk and plain rows instead of ORM objects, so memory stays
+    bounded regardless of the number of users.
+    """
+    last_id = start_after
+    while True:
+        rows = db.execute(
+            statement.where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1].id
+
+
+def _user_columns():
+    return select(User.id, User.name, User.preferred_language)
+
+
+def inactive_users_statement(threshold: datetime):
+    """Users whose last interaction is older than `threshold` (or who never chatted)"""
+    # Last interaction per user: conversation_state keeps MAX(memory.created_at);
+    # users without a state row (not backfilled yet) fall back to the grouped
+    # MAX over their memory (index-only lookup, evaluated only for those rows)
+    last_interaction_at = func.coalesce(
+        ConversationState.last_interaction_at,
+        select(func.max(Memory.created_at))
+        .where(Memory.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery(),
+    ).label("last_interaction_at")
+
+    return (
+        _user_columns()
+        .add_columns(last_interaction_at)
+        .outerjoin(ConversationState, ConversationState.user_id == User.id)
+        .where(or_(last_interaction_at.is_(None), last_interaction_at < threshold))
+    )
+
+# -------------------------------
+# Concurrent notification generation
+# -------------------------------
+class RateLimitGate:
+    """
+    Shared pause for all generation workers. A 429 from the LLM pauses
+    every worker (not only the one that got it) until the cooldown ends,
+    so a burst of workers does not keep hammering the rate limit.
+    """
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Retry-After header of an API error, if the provider sent one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _call_with_backoff(
+    call: Callable[[], any],
+    gate: RateLimitGate,
+    stats: Optional[job_runs.RunStats] = None,
+    **context,
+) -> Optional[any]:
+    """
+    call() with retries: rate limits (429) pause all workers via `gate`;
+    server errors and timeouts back off per call. Exponential backoff
+    with full jitter; None once LLM_MAX_ATTEMPTS is exhausted or the
+    error is not retryable. Attempts and give-ups are counted in `stats`.
+    """
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        gate.wait()
+        if stats is not None:
+            stats.count_llm_call()
+        try:
+            return call()
+        except Exception as e:
+            status = _status_code(e)
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == LLM_MAX_ATTEMPTS - 1:
+                if stats is not None:
+                    stats.count_llm_failure()
+                log.warning(
+                    "notification_generation_failed",
+                    **context,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                    attempts=attempt + 1,
+                )
+                break
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if status == 429:
+                delay = max(delay, _retry_after(e) or 0.0)
+                gate.pause(delay)
+    return None
+
+
+def generate_with_backoff(
+    request: Dict[str, any], gate: RateLimitGate, stats: Optional[job_runs.RunStats] = None
+) -> str:
+    """request_notification_text() with retries, then the fallback text"""
+    text = _call_with_backoff(
+        lambda: request_notification_text(**request), gate, stats, user_name=request.get("user_name")
+    )
+    return text if text is not None else fallback_notification_text(request.get("language", "en"))
+
+
+def generate_batch_with_backoff(
+    requests: List[Dict[str, any]], gate: RateLimitGate, stats: Optional[job_runs.RunStats] = None
+) -> List[str]:
+    """
+    One batched request_notification_texts() call with retries. Users the
+    batch reply has no usable message for (unparseable JSON, missing
+    entries, failed call) get a regular per-user call instead.
+    """
+    if len(requests) == 1:
+        return [generate_with_backoff(requests[0], gate, stats)]
+
+    texts = _call_with_backoff(
+        lambda: request_notification_texts(requests), gate, stats, batch_size=len(requests)
+    ) or [None] * len(requests)
+    return [
+        text if text is not None else generate_with_backoff(request, gate, stats)
+        for request, text in zip(requests, texts)
+    ]
+
+
+def variants_with_backoff(
+    gate: RateLimitGate, stats: Optional[job_runs.RunStats] = None
+) -> Callable[..., Optional[List[str]]]:
+    """request_notification_variants() with retries, as the variant cache's `generate`"""
+    def generate(**variant_request) -> Optional[List[str]]:
+        return _call_with_backoff(
+            lambda: request_notification_variants(**variant_request),
+            gate,
+            stats,
+            variant_pool=f"{variant_request['language']}/{variant_request['notification_type']}",
+        )
+    return generate
+
+
+class JobProgress:
+    """Progress reporting for one job run (log line + /metrics gauge)"""
+
+    def __init__(self, job_id: str, total: int, done: int = 0):
+        self.job_id = job_id
+        self.total = total
+        self.done = done
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self.resumed_from = done  # Users done by the interrupted run this one continues
+        SCHEDULER_JOB_PROGRESS.labels(job=job_id).set(done)
+        SCHEDULER_JOB_TOTAL.labels(job=job_id).set(total)
+        resumed = f", resuming after {done} done" if done else ""
+        print(
+            f"[Sedi Scheduler] {job_id}: {total} users, concurrency {GENERATION_CONCURRENCY}, "
+            f"{max(LLM_BATCH_SIZE, 1)} users per LLM request{resumed}"
+        )
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+        SCHEDULER_JOB_PROGRESS.labels(job=self.job_id).set(self.done)
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_INTERVAL_SECONDS:
+            self._last_report = now
+            self._report(now, finished=False)
+
+    def finish(self) -> None:
+        self._report(time.monotonic(), finished=True)
+
+    def _report(self, now: float, finished: bool) -> None:
+        elapsed = now - self.started
+        rate = (self.done - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+        status = "done" if finished else f"ETA {max(self.total - self.done, 0) / rate:.0f}s" if rate else "..."
+        print(
+            f"[Sedi Scheduler] {self.job_id}: {self.done}/{self.total} users "
+            f"({rate:.1f}/s, {elapsed:.0f}s elapsed, {status})"
+        )
+
+
+def run_notification_job(
+    db: Session,
+    job_id: str,
+    statement,
+    build_request: Callable[[any], Dict[str, any]],
+    notif_type: str,
+    after_chunk: Optional[Callable[[List], None]] = None,
+    row_fields: Optional[Callable[[any], Dict[str, any]]] = None,
+    resume_within: Optional[timedelta] = None,
+) -> int:
+    """
+    Generate and save one notification per user selected by `statement`.
+
+    Users are read in keyset chunks. Texts come from the notification
+    variant cache (one LLM call per language/type/health bucket, name
+    filled in per user) when NOTIFICATION_VARIANTS is on; the remaining
+    texts are generated in batches of SCHEDULER_LLM_BATCH_SIZE users per
+    LLM request by up to SCHEDULER_CONCURRENCY worker threads and
+    buffered in order as they complete (the session stays on this
+    thread). Wall-clock time scales with users / (batch size *
+    concurrency) instead of users. Each chunk's rows are written by a
+    NotificationWriter: one multi-row INSERT/COPY and one commit per
+    chunk instead of one per user.
+
+    The run is recorded in scheduler_runs (job_runs.py). The chunk's
+    notifications, after_chunk(rows) (the caller's own updates, no
+    commit) and the run's checkpoint are committed in one transaction, so
+    an interrupted run that is resumed (latest run younger than
+    `resume_within`) continues after the last committed user without
+    notifying anyone twice. row_fields(row) adds Notification columns per
+    user (e.g. release_at). Returns the users processed by this call.
+
+    If the job's lease is lost (another node took it over), the run stops
+    before its next commit and is left running at its last checkpoint:
+    no chunk, checkpoint or final status is written after that point.
+
+    Runs with work to do are kept as history (see /admin/scheduler/runs):
+    users, notifications, LLM calls and failures, seconds per phase and
+    whether the run overran the job's JOB_INTERVALS entry.
+    """
+    stats = job_runs.RunStats()
+    with stats.phase("select"):
+        remaining_after = 0
+        run = job_runs.latest_run(db, job_id)
+        resumable = job_runs.is_resumable(run, resume_within)
+        if resumable:
+            remaining_after = run.checkpoint_user_id or 0
+        remaining = db.execute(
+            select(func.count()).select_from(statement.where(User.id > remaining_after).subquery())
+        ).scalar() or 0
+    if not remaining:
+        if resumable:
+            # Interrupted after its last checkpoint: nothing left to resume, close it
+            state = job_runs.RunState(run, resumed=True)
+            job_runs.finish_run(db, state, job_runs.STATUS_COMPLETED, stats)
+            print(f"[Sedi Scheduler] {job_id}: run {state.id} had no users left, marked completed")
+        return 0
+
+    state = job_runs.start_run(db, job_id, resume_within, interval=JOB_INTERVALS.get(job_id))
+    if state.resumed:
+        print(f"[Sedi Scheduler] {job_id}: resuming run {state.id} after user {state.checkpoint_user_id}")
+    total = state.processed + remaining
+    job_runs.set_total(db, state, total)
+    progress = JobProgress(job_id, total, done=state.processed)
+    gate = RateLimitGate()
+    lease = current_lease()
+
+    def lease_lost() -> bool:
+        if lease is None or not lease.lost:
+            return False
+        print(f"[Sedi Scheduler] {job_id}: lease lost, run {state.id} stopped after user {state.checkpoint_user_id}")
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY, thread_name_prefix=f"sedi-{job_id}") as pool:
+            writer = NotificationWriter(db, auto_flush=False)
+            chunks = iter_user_chunks(db, statement, start_after=state.checkpoint_user_id)
+            while True:
+                if lease_lost():
+                    return progress.done - progress.resumed_from
+                with stats.phase("select"):
+                    rows = next(chunks, None)
+                if rows is None:
+                    break
+
+                requests = [build_request(row) for row in rows]
+                messages: List[Optional[str]] = [None] * len(requests)
+                if variant_cache.enabled:
+                    with stats.phase("variants"):
+                        variant_cache.ensure(
+                            requests, generate=variants_with_backoff(gate, stats), executor_map=pool.map
+                        )
+                        messages = [variant_cache.personalize(request) for request in requests]
+
+                with stats.phase("generate"):
+                    pending = [i for i, message in enumerate(messages) if message is None]
+                    batch_size = max(LLM_BATCH_SIZE, 1)
+                    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+                    results = pool.map(
+                        lambda batch: generate_batch_with_backoff([requests[i] for i in batch], gate, stats),
+                        batches,
+                    )
+                    for batch, batch_messages in zip(batches, results):
+                        for i, message in zip(batch, batch_messages):
+                            messages[i] = message
+
+                for row, message in zip(rows, messages):
+                    writer.add(row.id, message, type=notif_type, **(row_fields(row) if row_fields else {}))
+
+                if lease_lost():
+                    return progress.done - progress.resumed_from
+
+                def before_commit(_, rows=rows):
+                    if after_chunk is not None:
+                        after_chunk(rows)
+                    job_runs.checkpoint(db, state, rows[-1].id, len(rows))
+
+                with stats.phase("write"):
+                    stats.notifications += writer.flush(before_commit=before_commit)
+                progress.advance(len(rows))
+    except Exception as e:
+        job_runs.finish_run(db, state, job_runs.STATUS_FAILED, stats, error=f"{type(e).__name__}: {e}")
+        raise
+
+    if lease_lost():
+        return progress.done - progress.resumed_from
+    job_runs.finish_run(db, state, job_runs.STATUS_COMPLETED, stats)
+    print(f"[Sedi Scheduler] {job_id}: {writer.written} notifications written")
+    progress.finish()
+    return progress.done - progress.resumed_from
+
 # -------------------------------
 # Function: Check inactive users
 # -------------------------------
+@instrumented_job("inactive_check", min_interval=lease_interval(timedelta(hours=INACTIVE_HOURS)))
 def check_inactive_users():
     with next(get_db()) as db:
-        from app.models import Memory
         now = datetime.utcnow()
-        threshold = now - timedelta(hours=INACTIVE_HOURS)
-
-        # Find users who haven't interacted recently (based on Memory table)
-        users = db.query(User).all()
-        inactive_users = []
-        
-        for user in users:
-            last_memory = db.query(Memory).filter(
-                Memory.user_id == user.id
-            ).order_by(Memory.created_at.desc()).first()
-            
-            if not last_memory or last_memory.created_at < threshold:
-                inactive_users.append(user)
-
-        for user in inactive_users:
+
+        def build_request(row):
             hours_since = INACTIVE_HOURS
-            if user.id in [u.id for u in inactive_users]:
-                last_mem = db.query(Memory).filter(
-                    Memory.user_id == user.id
-                ).order_by(Memory.created_at.desc()).first()
-                if last_mem:
-                    hours_since = int((now - last_mem.created_at).total_seconds() / 3600)
-            
-            message = generate_notification_text(
-                language=user.preferred_language or "en",
+            if row.last_interaction_at:
+                hours_since = int((now - row.last_interaction_at).total_seconds() / 3600)
+            return dict(
+                language=row.preferred_language or "en",
                 notification_type=NOTIF_TYPE_INACTIVE,
-                user_name=user.name or "my friend",
+                user_name=row.name or "my friend",
                 hours_since_last_talk=hours_since,
             )
-            save_notification(db, user.id, message, "inactive_ping")
+
+        return run_notification_job(
+            db,
+            "inactive_check",
+            inactive_users_statement(now - timedelta(hours=INACTIVE_HOURS)),
+            build_request,
+            "inactive_ping",
+            resume_within=RESUME_WINDOWS["inactive_check"],
+        )
 
 # -------------------------------
 # Function: Check daily health status
 # -------------------------------
+@instrumented_job("health_check", min_interval=lease_interval(timedelta(hours=CHECK_INTERVAL_HOURS)))
 def check_health_status():
     with next(get_db()) as db:
-        users = db.query(User).all()
-        for user in users:
+        def build_request(row):
             # For simple testing, use a fixed health summary
-            health_summary = "Your heart rate and temperature are within normal range."
-
-            message = generate_notification_text(
-                language=user.preferred_language or "en",
+            return dict(
+                language=row.preferred_language or "en",
                 notification_type=NOTIF_TYPE_HEALTH_CHECK,
-                user_name=user.name or "my friend",
-                health_summary=health_summary,
+                user_name=row.name or "my friend",
+                health_summary="Your heart rate and temperature are within normal range.",
             )
-            save_notification(db, user.id, message, "health_check")
+
+        return run_notification_job(
+            db,
+            "health_check",
+            _user_columns(),
+            build_request,
+            "health_check",
+            resume_within=RESUME_WINDOWS["health_check"],
+        )
 
 # -------------------------------
-# Function: Send morning greeting
+# Function: Send morning greeting (per-user local time)
 # -------------------------------
+def _greeting_request(row) -> Dict[str, any]:
+    return dict(
+        language=row.preferred_language or "en",
+        notification_type=NOTIF_TYPE_MORNING,
+        user_name=row.name or "my friend",
+        health_summary="You seem to be doing fine. Ready for a new day!",
+    )
+
+
+@instrumented_job("morning_greeting", min_interval=lease_interval(timedelta(seconds=GREETING_TICK_SECONDS)))
 def send_morning_greeting():
+    """
+    Runs every minute: greets the users whose next_due_at (MORNING_HOUR in
+    their timezone, jittered per user) has come, then moves them to the
+    next day. Load follows the users' local mornings instead of one burst.
+    Greetings written ahead by pregenerate_greetings are only released
+    (one UPDATE); the LLM is called here only for users without one.
+    """
     with next(get_db()) as db:
-        users = db.query(User).all()
-        for user in users:
-            health_summary = "You seem to be doing fine. Ready for a new day!"
-            message = generate_notification_text(
-                language=user.preferred_language or "en",
-                notification_type=NOTIF_TYPE_MORNING,
-                user_name=user.name or "my friend",
-                health_summary=health_summary,
-            )
-            save_notification(db, user.id, message, "morning_summary")
-    
+        now = datetime.utcnow()
+        released = greeting_schedule.release_due(db, now)
+        if released:
+            print(f"[Sedi Scheduler] morning_greeting: {released} pre-generated notifications released")
+        skipped = greeting_schedule.skip_stale(db, now)
+        if skipped:
+            print(f"[Sedi Scheduler] morning_greeting: {skipped} overdue greetings skipped")
+
+        def after_chunk(rows):
+            greeting_schedule.advance(db, rows, now)
+
+        return run_notification_job(
+            db,
+            "morning_greeting",
+            greeting_schedule.due_statement(now),
+            _greeting_request,
+            greeting_schedule.GREETING_TYPE,
+            after_chunk=after_chunk,
+        )
+
 # -------------------------------
-# Save notification to database
+# Function: Pre-generate tomorrow's greetings (off-peak)
 # -------------------------------
-def save_notification(db: Session, user_id: int, message: str, notif_type: str):
-    new_notif = Notification(
-        user_id=user_id,
-        type=notif_type,
-        priority="normal",
-        message=message,
-        is_read=False,
-        created_at=datetime.utcnow(),
-    )
-    db.add(new_notif)
-    db.commit()
-    print(f"[Sedi Scheduler] Notification created for user {user_id} → {notif_type}")
+@instrumented_job("greeting_pregeneration", min_interval=lease_interval(timedelta(hours=PREGENERATION_INTERVAL_HOURS)))
+def pregenerate_greetings():
+    """
+    Write the greetings due in the next PREGENERATION_HORIZON_HOURS as
+    unreleased notifications (release_at = due time), so delivery does not
+    wait for the LLM. Runs off-peak and is resumable: users already
+    pre-generated for their next due time are skipped.
+    """
+    with next(get_db()) as db:
+        now = datetime.utcnow()
+
+        def after_chunk(rows):
+            greeting_schedule.mark_pregenerated(db, rows)
+
+        return run_notification_job(
+            db,
+            "greeting_pregeneration",
+            # Leave the next minutes to the morning_greeting tick
+            greeting_schedule.pregeneration_statement(
+                now + timedelta(minutes=PREGENERATION_LEAD_MINUTES),
+                now + timedelta(hours=PREGENERATION_HORIZON_HOURS),
+            ),
+            _greeting_request,
+            greeting_schedule.GREETING_TYPE,
+            after_chunk=after_chunk,
+            row_fields=lambda row: {"release_at": row.next_due_at},
+            resume_within=RESUME_WINDOWS["greeting_pregeneration"],
+        )
+
+# -------------------------------
+# Function: Add new users to the greeting schedule
+# -------------------------------
+@instrumented_job("greeting_schedule_sync", min_interval=lease_interval(timedelta(minutes=GREETING_SYNC_MINUTES)))
+def sync_greeting_schedule():
+    with next(get_db()) as db:
+        added = greeting_schedule.sync_schedule(db)
+        if added:
+            print(f"[Sedi Scheduler] greeting_schedule_sync: {added} users scheduled")
+        return added
+
+# -------------------------------
+# Refresh notification variant pools
+# -------------------------------
+@instrumented_job("variant_refresh")
+def refresh_notification_variants():
+    """
+    Regenerate cached variant pools before they expire (returns pools
+    refreshed). Not exclusive: the cache is per process.
+    """
+    gate = RateLimitGate()
+    with ThreadPoolExecutor(max_workers=GENERATION_CONCURRENCY, thread_name_prefix="sedi-variants") as pool:
+        refreshed = variant_cache.refresh(generate=variants_with_backoff(gate), executor_map=pool.map)
+    print(f"[Sedi Scheduler] variant_refresh: {refreshed} notification variant pools refreshed")
+    return refreshed
+
+# -------------------------------
+# Derive HR / HRV from new waveforms
+# -------------------------------
+@instrumented_job("vitals_derivation", min_interval=lease_interval(timedelta(seconds=VITALS_INTERVAL_SECONDS)))
+def derive_vitals():
+    """Turn unprocessed ECG/PPG chunks into HealthData points (returns users with new chunks)"""
+    with next(get_db()) as db:
+        totals = vitals.derive_pending(db)
+    if totals["chunks"]:
+        print(
+            f"[Sedi Scheduler] vitals_derivation: {totals['chunks']} chunks, "
+            f"{totals['samples']} samples -> {totals['points']} HealthData points"
+        )
+    return totals["users"]
+
+# -------------------------------
+# Resume runs interrupted by a crash or restart
+# -------------------------------
+def resume_interrupted_runs():
+    """
+    One-off job after startup: continue notification runs whose latest
+    run is still "running" (its node died) or failed, within the job's
+    RESUME_WINDOWS, instead of waiting for the next regular run to start
+    from scratch. The job lease keeps a run that is still alive on
+    another node from being resumed twice.
+    """
+    jobs = {
+        "health_check": check_health_status,
+        "inactive_check": check_inactive_users,
+        "greeting_pregeneration": pregenerate_greetings,
+    }
+    with next(get_db()) as db:
+        interrupted = [
+            job_id for job_id in jobs
+            if job_runs.is_resumable(job_runs.latest_run(db, job_id), RESUME_WINDOWS[job_id])
+        ]
+    for job_id in interrupted:
+        print(f"[Sedi Scheduler] {job_id}: interrupted run found, resuming")
+        try:
+            jobs[job_id].resume()
+        except Exception as e:
+            log.warning("scheduler_resume_failed", job=job_id, error=str(e))
 
 # -------------------------------
 # Start Scheduler
 # -------------------------------
 def start_scheduler():
-    print("[Sedi Scheduler] Background scheduler started successfully ✅")
+    """
+    Start this process's scheduler (idempotent). Every worker may run one:
+    the notification jobs take a job lease, so each run happens on one
+    node only. SCHEDULER_ENABLED=false keeps a worker out entirely.
+    """
+    if scheduler.running:
+        return
+    if os.getenv("SCHEDULER_ENABLED", "true").lower() in ("0", "false", "no"):
+        print("[Sedi Scheduler] Disabled on this worker (SCHEDULER_ENABLED=false)")
+        return
 
-    # Schedule morning greeting every day at 8 AM
+    # Morning greetings: every minute, send the ones due (8 AM user-local, jittered)
     scheduler.add_job(
         send_morning_greeting,
+        "interval",
+        seconds=GREETING_TICK_SECONDS,
+        id="morning_greeting",
+        replace_existing=True,
+    )
+
+    # Pre-generate the next day's greetings off-peak (3 AM)
+    scheduler.add_job(
+        pregenerate_greetings,
         "cron",
-        hour=MORNING_HOUR,
+        hour=PREGENERATION_HOUR,
         minute=0,
-        id="morning_greeting",
+        id="greeting_pregeneration",
+        replace_existing=True,
+    )
+
+    # Give new users a greeting time every 10 minutes (and right away)
+    scheduler.add_job(
+        sync_greeting_schedule,
+        "interval",
+        minutes=GREETING_SYNC_MINUTES,
+        next_run_time=datetime.now(pytz.utc),
+        id="greeting_schedule_sync",
         replace_existing=True,
     )
 
@@ -144,6 +736,41 @@ def start_scheduler():
         id="inactive_check",
         replace_existing=True,
     )
+
+    # Resume interrupted runs once the leases of a crashed process have expired
+    scheduler.add_job(
+        resume_interrupted_runs,
+        "date",
+        run_date=datetime.now(pytz.utc) + timedelta(seconds=LEASE_TTL_SECONDS),
+        id="resume_interrupted_runs",
+        replace_existing=True,
+    )
+
+    # Derive HR / HRV from new ECG/PPG waveforms every minute
+    scheduler.add_job(
+        derive_vitals,
+        "interval",
+        seconds=VITALS_INTERVAL_SECONDS,
+        id="vitals_derivation",
+        replace_existing=True,
+    )
+
+    # Refresh notification variant pools every 3 hours
+    if variant_cache.enabled:
+        scheduler.add_job(
+            refresh_notification_variants,
+            "interval",
+            hours=VARIANT_REFRESH_HOURS,
+            id="variant_refresh",
+            replace_existing=True,
+        )
     
 
-    scheduler.start()
\ No newline at end of file
+    scheduler.start()
+    print("[Sedi Scheduler] Background scheduler started successfully ✅")
+
+
+def stop_scheduler():
+    """Stop this process's scheduler; running jobs finish (and release their leases) in the background"""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
@@ -0,0 +1,226 @@
+# app/core/signal_processing.py
+"""
+Signal Processing - Vectorized ECG/PPG Beat Detection, HR and HRV
+
+RESPONSIBILITY:
+- Whole-array NumPy operations only, no Python loop per sample:
+  FFT band-pass, beat detection (QRS energy envelope for ECG, pulse
+  peaks for PPG; local maxima from an O(n) sliding max with a
+  refractory distance), RR intervals with physiological and ectopic
+  rejection, HR, RMSSD and SDNN
+- analyze_group(): the unit of work of the vitals worker pool - the
+  compressed chunks of one user, device and signal, joined into gap-free
+  runs (no RR interval or successive difference spans a gap), each run
+  filtered once; one derived point per VITALS_WINDOW_SECONDS window.
+  Windows are aligned to absolute time (window_start()) and a chunk
+  belongs to the window its start_ts is in, so chunks analyzed in
+  different runs of the job still add up to the same windows
+- Plain dicts, bytes and arrays in and out: no database and no app
+  imports, so pool workers (spawned processes) only import NumPy
+- NO SpO2: it needs red and infrared PPG channels, a single PPG
+  waveform does not carry it
+
+Environment:
+- VITALS_WINDOW_SECONDS       analysis window per derived point (default 60)
+- VITALS_MIN_WINDOW_SECONDS   windows with less data give no point (default 10)
+"""
+
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+WINDOW_SECONDS = float(os.getenv("VITALS_WINDOW_SECONDS", "60"))
+MIN_WINDOW_SECONDS = float(os.getenv("VITALS_MIN_WINDOW_SECONDS", "10"))
+
+BANDS = {"ecg": (5.0, 15.0), "ppg": (0.5, 8.0)}          # Hz, pass band per signal
+REFRACTORY_SECONDS = {"ecg": 0.25, "ppg": 0.33}          # Shortest distance between two beats
+ENVELOPE_SECONDS = 0.15     # ECG: moving integration of the squared slope (Pan-Tompkins)
+PEAK_THRESHOLD = 0.3        # Beats rise above this fraction of the window's 98th percentile
+RR_RANGE_SECONDS = (0.3, 2.0)  # 200 .. 30 bpm
+ECTOPIC_TOLERANCE = 0.2     # RR intervals further than this from the window median are dropped
+MIN_HRV_INTERVALS = 20      # Fewer clean intervals give HR only
+
+_DTYPES = {"float32": np.dtype("<f4"), "int16": np.dtype("<i2")}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bandpass(samples: np.ndarray, sample_rate: float, low: float, high: float) -> np.ndarray:
+    """Zero-phase FFT band-pass of the whole array (one rfft / irfft pair)"""
+    spectrum = np.fft.rfft(samples - samples.mean())
+    freqs = np.fft.rfftfreq(len(samples), d=1.0 / sample_rate)
+    spectrum[(freqs < low) | (freqs > min(high, sample_rate / 2))] = 0
+    return np.fft.irfft(spectrum, n=len(samples))
+
+
+def moving_average(samples: np.ndarray, width: int) -> np.ndarray:
+    """Centered moving average (cumulative sum), same length as `samples`"""
+    if width <= 1 or width > len(samples):
+        return samples
+    cumulative = np.cumsum(np.concatenate(([0.0], samples)))
+    averaged = (cumulative[width:] - cumulative[:-width]) / width
+    pad = width - 1
+    return np.pad(averaged, (pad // 2, pad - pad // 2), mode="edge")
+
+
+def sliding_max(samples: np.ndarray, width: int) -> np.ndarray:
+    """
+    Max over the `width` samples centered on each sample (width odd), in
+    O(n) whatever the width: block-wise prefix and suffix maxima
+    (van Herk / Gil-Werman).
+    """
+    half = width // 2
+    n = len(samples)
+    padded_length = n + 2 * half
+    padded = np.full(padded_length + (-padded_length) % width, -np.inf)
+    padded[half:half + n] = samples
+    blocks = padded.reshape(-1, width)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n], prefix[width - 1:width - 1 + n])
+
+
+def find_peaks(samples: np.ndarray, distance: int, threshold: float) -> np.ndarray:
+    """Indexes of the samples above `threshold` that are the maximum within ±distance / 2"""
+    if not len(samples):
+        return np.empty(0, dtype=np.intp)
+    is_peak = (samples == sliding_max(samples, 2 * (distance // 2) + 1)) & (samples > threshold)
+    is_peak[1:] &= samples[1:] != samples[:-1]  # One index per flat top
+    return np.flatnonzero(is_peak)
+
+
+def detect_beats(signal: str, samples: np.ndarray, sample_rate: float) -> np.ndarray:
+    """Sample indexes of the heart beats in one gap-free run"""
+    filtered = bandpass(samples, sample_rate, *BANDS[signal])
+    if signal == "ecg":
+        slope = np.diff(filtered, prepend=filtered[0])
+        feature = moving_average(slope * slope, int(ENVELOPE_SECONDS * sample_rate))
+    else:
+        feature = filtered
+    threshold = PEAK_THRESHOLD * np.percentile(feature, 98)
+    return find_peaks(feature, max(int(REFRACTORY_SECONDS[signal] * sample_rate), 1), threshold)
+
+
+def beat_metrics(rr: np.ndarray) -> Optional[Dict[str, any]]:
+    """
+    HR (bpm) from the clean RR intervals (seconds) of one window; RMSSD
+    and SDNN (ms) with at least MIN_HRV_INTERVALS of them. Successive
+    differences only pair intervals that are both clean. None without
+    two clean intervals.
+    """
+    clean = (rr >= RR_RANGE_SECONDS[0]) & (rr <= RR_RANGE_SECONDS[1])
+    if np.count_nonzero(clean) < 2:
+        return None
+    median = np.median(rr[clean])
+    clean &= np.abs(rr - median) <= ECTOPIC_TOLERANCE * median
+    intervals = rr[clean]
+    if len(intervals) < 2:
+        return None
+
+    metrics = {
+        "heart_rate": 60.0 / intervals.mean(),
+        "hrv_rmssd": None,
+        "hrv_sdnn": None,
+        "intervals": len(intervals),
+    }
+    successive = np.diff(rr)[clean[1:] & clean[:-1]]
+    if len(intervals) >= MIN_HRV_INTERVALS and len(successive):
+        metrics["hrv_rmssd"] = float(np.sqrt(np.mean(successive * successive)) * 1000)
+        metrics["hrv_sdnn"] = float(intervals.std(ddof=1) * 1000)
+    return metrics
+
+
+def window_start(ts: datetime) -> datetime:
+    """Start of the VITALS_WINDOW_SECONDS window containing `ts` (windows are aligned to the epoch)"""
+    seconds = (ts - _EPOCH).total_seconds()
+    return _EPOCH + timedelta(seconds=seconds - seconds % WINDOW_SECONDS)
+
+
+def _runs(chunks: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """
+    Decompress chunks (sorted by start_ts) and join those that continue
+    each other within a sample period. Per run: sample_rate, samples,
+    its windows with the sample offset at which each one's chunks begin
+    and their sample counts.
+    """
+    runs = []
+    current = None
+    for chunk in chunks:
+        samples = np.frombuffer(zlib.decompress(chunk["data"]), dtype=_DTYPES[chunk["dtype"]])
+        rate = chunk["sample_rate"]
+        window = window_start(chunk["start_ts"])
+        if current is not None:
+            gap = (chunk["start_ts"] - current["start_ts"]).total_seconds() - current["count"] / current["sample_rate"]
+            if rate == current["sample_rate"] and abs(gap) < 1.5 / rate:
+                if window != current["windows"][-1]:
+                    current["windows"].append(window)
+                    current["window_offsets"].append(current["count"])
+                    current["window_counts"].append(0)
+                current["window_counts"][-1] += len(samples)
+                current["parts"].append(samples)
+                current["count"] += len(samples)
+                continue
+            runs.append(current)
+        current = {
+            "start_ts": chunk["start_ts"],
+            "sample_rate": rate,
+            "parts": [samples],
+            "count": len(samples),
+            "windows": [window],
+            "window_offsets": [0],
+            "window_counts": [len(samples)],
+        }
+    if current is not None:
+        runs.append(current)
+    for run in runs:
+        run["samples"] = np.concatenate(run.pop("parts")).astype(np.float64)
+    return runs
+
+
+def analyze_group(group: Dict[str, any]) -> Dict[str, any]:
+    """
+    group: user_id, signal and `chunks` (start_ts, sample_rate, dtype,
+    compressed data), oldest first. Every chunk belongs to the window its
+    start_ts falls in; an RR interval belongs to the window of the chunk
+    its closing beat is in. Returns the derived HealthData rows
+    ("points", one per window with at least MIN_WINDOW_SECONDS of
+    samples, stamped with the window's end) and the number of samples
+    analyzed.
+    """
+    signal = group["signal"]
+    seconds: Dict[datetime, float] = {}
+    intervals: Dict[datetime, List[np.ndarray]] = {}
+    analyzed = 0
+    for run in _runs(group["chunks"]):
+        rate, samples = run["sample_rate"], run["samples"]
+        analyzed += len(samples)
+        for window, count in zip(run["windows"], run["window_counts"]):
+            seconds[window] = seconds.get(window, 0.0) + count / rate
+        beats = detect_beats(signal, samples, rate)
+        if len(beats) < 2:
+            continue
+        rr = np.diff(beats) / rate
+        window_of = np.searchsorted(run["window_offsets"], beats[1:], side="right") - 1
+        bounds = np.searchsorted(window_of, np.arange(len(run["windows"]) + 1))
+        for index, window in enumerate(run["windows"]):
+            # NaN between runs: no successive difference across a gap
+            intervals.setdefault(window, []).extend([rr[bounds[index]:bounds[index + 1]], np.array([np.nan])])
+
+    points = []
+    for window in sorted(intervals):
+        if seconds.get(window, 0.0) < MIN_WINDOW_SECONDS:
+            continue
+        metrics = beat_metrics(np.concatenate(intervals[window]))
+        if metrics is None:
+            continue
+        points.append({
+            "user_id": group["user_id"],
+            "source": signal,
+            "heart_rate": str(round(metrics["heart_rate"])),
+            "hrv_rmssd": None if metrics["hrv_rmssd"] is None else round(metrics["hrv_rmssd"], 1),
+            "hrv_sdnn": None if metrics["hrv_sdnn"] is None else round(metrics["hrv_sdnn"], 1),
+            "created_at": window + timedelta(seconds=WINDOW_SECONDS),
+        })
+    return {"points": points, "samples": analyzed}
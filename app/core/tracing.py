@@ -0,0 +1,194 @@
+# app/core/tracing.py
+"""
+Tracing - Per-Phase Timings and Structured Logs
+
+RESPONSIBILITY:
+- phase("name") context manager: times one step of a request
+  (snapshot load, LLM call, memory save, ...)
+- Per-request trace, exposed as a Server-Timing response header
+  (ServerTimingMiddleware)
+- Latency histogram per phase (sedi_phase_duration_seconds on /metrics)
+- Leveled, sampled, JSON-lines logging (get_logger)
+
+Works with or without an active request: outside a request (scheduler,
+scripts) phases are still recorded in the histograms.
+
+Environment:
+- LOG_LEVEL          level of the "sedi" loggers (default WARNING)
+- LOG_SAMPLE_RATE    fraction of requests whose DEBUG/INFO lines are kept
+                     (default 1.0); WARNING and above are never sampled
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.core.metrics import PHASE_DURATION
+
+load_dotenv()
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+
+# -------------------------------
+# Per-request trace
+# -------------------------------
+class Trace:
+    """Phases recorded during one request"""
+
+    __slots__ = ("phases", "sampled")
+
+    def __init__(self, sampled: bool):
+        self.phases: List[Tuple[str, float]] = []
+        self.sampled = sampled
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.phases.append((name, duration_ms))
+
+    def server_timing(self) -> str:
+        """'snapshot;dur=1.8, llm;dur=412.0' (repeated phases are summed)"""
+        totals: Dict[str, float] = {}
+        for name, duration_ms in self.phases:
+            totals[name] = totals.get(name, 0.0) + duration_ms
+        return ", ".join(f"{name};dur={duration_ms:.1f}" for name, duration_ms in totals.items())
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("sedi_trace", default=None)
+
+
+def start_trace() -> Trace:
+    """Begin a trace for the current request (context-local)"""
+    trace = Trace(sampled=random.random() < LOG_SAMPLE_RATE)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def record_phase(name: str, duration_ms: float) -> None:
+    """Record an already measured duration (histogram + current trace)"""
+    PHASE_DURATION.labels(phase=name).observe(duration_ms / 1000.0)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, duration_ms)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the enclosed block as one phase"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, (time.perf_counter() - started) * 1000.0)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware: starts a trace per HTTP request and adds a
+    Server-Timing header with the phases recorded before the response
+    starts, plus the total as "app".
+
+    Streaming responses start before their phases run, so they only get
+    "app"; their phases still reach the histograms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace()
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = trace.server_timing()
+                total = f"app;dur={(time.perf_counter() - started) * 1000.0:.1f}"
+                value = f"{value}, {total}" if value else total
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+
+# -------------------------------
+# Structured logging
+# -------------------------------
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+_root_logger = logging.getLogger("sedi")
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(_JSONFormatter())
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
+    _root_logger.propagate = False
+
+
+class StructuredLogger:
+    """
+    log.debug("event_name", key=value, ...) -> one JSON line.
+
+    Disabled levels return after a single integer comparison; DEBUG/INFO
+    lines are also dropped for requests that were not sampled.
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"sedi.{name}")
+
+    def enabled(self, level: int) -> bool:
+        if not self._logger.isEnabledFor(level):
+            return False
+        if level >= logging.WARNING:
+            return True
+        trace = _current_trace.get()
+        if trace is not None:
+            return trace.sampled
+        return LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
+
+    def _log(self, level: int, event: str, fields: Dict[str, any]) -> None:
+        if self.enabled(level):
+            self._logger.log(level, event, extra={"fields": fields})
+
+    def debug(self, event: str, **fields) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields) -> None:
+        self._log(logging.ERROR, event, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Structured logger under the "sedi" namespace, e.g. get_logger("brain")"""
+    return StructuredLogger(name)
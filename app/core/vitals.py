@@ -0,0 +1,159 @@
+# app/core/vitals.py
+"""
+Vitals - HR / HRV Derived from Stored Waveforms
+
+RESPONSIBILITY:
+- derive_pending(): take the waveform_chunks not processed yet of the
+  windows that have closed (signal_processing.window_start), stream by
+  stream (user, device, signal) in time order and about
+  VITALS_BATCH_CHUNKS per batch - a batch never splits the window of a
+  stream -, analyze them in a worker pool
+  (signal_processing.analyze_group) and write the derived HealthData
+  points (source "ecg" / "ppg") and the chunks' processed_at in one
+  transaction per batch - a crash repeats at most one batch and never
+  writes a point twice. Chunks of a window still open stay unprocessed
+  until a later run
+- Worker pool: processes, since the NumPy work is CPU-bound; spawned,
+  not forked, because the API process runs threads. Created only when
+  there is work; VITALS_WORKERS=0 analyzes in the calling thread
+- NO signal processing (signal_processing.py), NO scheduling
+  (scheduler.py runs derive_vitals every VITALS_INTERVAL_SECONDS)
+
+Environment:
+- VITALS_WORKERS          pool processes (default: CPU count)
+- VITALS_BATCH_CHUNKS     chunks per batch and transaction (default 2000)
+- VITALS_SETTLE_SECONDS   a window is analyzed this long after it ends; samples
+                          uploaded later give a point of their own (default 60)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Dict, Iterator
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import HealthData, WaveformChunk
+from app.core.metrics import VITALS_POINTS, VITALS_SAMPLES
+from app.core.signal_processing import analyze_group, window_start
+
+WORKERS = int(os.getenv("VITALS_WORKERS", str(os.cpu_count() or 1)))
+BATCH_CHUNKS = int(os.getenv("VITALS_BATCH_CHUNKS", "2000"))
+SETTLE_SECONDS = float(os.getenv("VITALS_SETTLE_SECONDS", "60"))
+
+
+def _stream_pages(db: Session, ready_before: datetime) -> Iterator[Dict[str, any]]:
+    """
+    analyze_group() inputs: the unprocessed chunks of each stream (user,
+    device, signal) in windows that closed before `ready_before`, oldest
+    first, at most BATCH_CHUNKS per page. A full page ends at a window
+    boundary, so no window is split between two pages.
+    """
+    streams = db.execute(
+        select(WaveformChunk.user_id, WaveformChunk.device_id, WaveformChunk.signal)
+        .where(WaveformChunk.processed_at.is_(None), WaveformChunk.start_ts < ready_before)
+        .distinct()
+    ).all()
+    for user_id, device_id, signal in streams:
+        after = None
+        while True:
+            statement = (
+                select(
+                    WaveformChunk.id,
+                    WaveformChunk.start_ts,
+                    WaveformChunk.sample_rate,
+                    WaveformChunk.dtype,
+                    WaveformChunk.data,
+                )
+                .where(
+                    WaveformChunk.user_id == user_id,
+                    WaveformChunk.device_id == device_id,
+                    WaveformChunk.signal == signal,
+                    WaveformChunk.processed_at.is_(None),
+                    WaveformChunk.start_ts < ready_before,
+                )
+                .order_by(WaveformChunk.start_ts)
+                .limit(BATCH_CHUNKS)
+            )
+            if after is not None:
+                statement = statement.where(WaveformChunk.start_ts >= after)
+            rows = db.execute(statement).all()
+            if not rows:
+                break
+            full = len(rows) == BATCH_CHUNKS
+            if full:
+                # The last window may continue on the next page: leave it for that page
+                last_window = window_start(rows[-1].start_ts)
+                trimmed = [row for row in rows if window_start(row.start_ts) < last_window]
+                rows, after = (trimmed, last_window) if trimmed else (rows, rows[-1].start_ts + timedelta(microseconds=1))
+            yield {
+                "user_id": user_id,
+                "device_id": device_id,
+                "signal": signal,
+                "ids": [row.id for row in rows],
+                "chunks": [
+                    {"start_ts": row.start_ts, "sample_rate": row.sample_rate, "dtype": row.dtype, "data": row.data}
+                    for row in rows
+                ],
+            }
+            if not full:
+                break
+
+
+def derive_pending(db: Session, workers: int = WORKERS) -> Dict[str, int]:
+    """
+    Process the unprocessed chunks of every window that closed at least
+    VITALS_SETTLE_SECONDS ago; commits per batch of about BATCH_CHUNKS
+    chunks. Chunks of windows still open stay unprocessed until a later
+    run. Returns chunks, samples, points and users (distinct users with
+    chunks).
+    """
+    ready_before = window_start(datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS))
+    totals = {"chunks": 0, "samples": 0, "points": 0, "users": 0}
+    users = set()
+    with ExitStack() as stack:
+        executor_map = None
+        pages = _stream_pages(db, ready_before)
+        while True:
+            groups = []
+            for group in pages:
+                groups.append(group)
+                if sum(len(group["ids"]) for group in groups) >= BATCH_CHUNKS:
+                    break
+            if not groups:
+                break
+
+            if executor_map is None:
+                if workers > 0:
+                    pool = stack.enter_context(ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                    ))
+                    executor_map = pool.map
+                else:
+                    executor_map = map
+            results = list(executor_map(analyze_group, groups))
+
+            points = [point for result in results for point in result["points"]]
+            ids = [chunk_id for group in groups for chunk_id in group["ids"]]
+            if points:
+                db.execute(insert(HealthData), points)
+            db.execute(
+                update(WaveformChunk)
+                .where(WaveformChunk.id.in_(ids))
+                .values(processed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+            for group, result in zip(groups, results):
+                VITALS_SAMPLES.labels(signal=group["signal"]).inc(result["samples"])
+                VITALS_POINTS.labels(signal=group["signal"]).inc(len(result["points"]))
+                totals["samples"] += result["samples"]
+                users.add(group["user_id"])
+            totals["chunks"] += len(ids)
+            totals["points"] += len(points)
+    totals["users"] = len(users)
+    return totals
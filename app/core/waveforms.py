@@ -0,0 +1,230 @@
+# app/core/waveforms.py
+"""
+Waveforms - Chunked, Compressed ECG/PPG Sample Storage
+
+RESPONSIBILITY:
+- Encode incoming samples (JSON numbers or raw little-endian float32 /
+  int16 bytes) into a packed array - never one Python object or one row
+  per sample
+- Split them into chunks of WAVEFORM_CHUNK_SECONDS, zlib-compress each
+  and write all chunks of an upload in one multi-row INSERT
+  (waveform_chunks, keyed by device, user, signal, start_ts, sample_rate;
+  re-sent chunks are ignored)
+- read_window(): the chunks overlapping a time window (one index range
+  scan), decompressed and trimmed with memoryview slices - samples are
+  not copied or converted until the response is written
+- NO signal processing
+
+Binary read format (GET /device/waveform?format=binary), one record per
+segment, little-endian:
+    header  <dfIB  start (unix seconds, float64), sample_rate (float32),
+                   sample count (uint32), dtype (0 = float32, 1 = int16)
+    samples count * itemsize bytes
+
+Environment:
+- WAVEFORM_CHUNK_SECONDS      samples per stored chunk, in seconds (default 10)
+- WAVEFORM_MAX_SAMPLES        largest accepted upload (default 300000)
+- WAVEFORM_COMPRESSION_LEVEL  zlib level (default 1, fast)
+"""
+
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models import WaveformChunk
+
+CHUNK_SECONDS = float(os.getenv("WAVEFORM_CHUNK_SECONDS", "10"))
+MAX_SAMPLES = int(os.getenv("WAVEFORM_MAX_SAMPLES", "300000"))
+COMPRESSION_LEVEL = int(os.getenv("WAVEFORM_COMPRESSION_LEVEL", "1"))
+MAX_SAMPLE_RATE = 2000.0
+MAX_READ_SECONDS = 3600.0  # Longest window one binary read may ask for
+MAX_JSON_READ_SECONDS = 60.0  # JSON builds a Python float per sample (15k at 250 Hz): longer windows use binary
+
+SIGNALS = ("ecg", "ppg")
+DTYPES = {"float32": "f", "int16": "h"}  # dtype name -> array typecode
+_DTYPE_CODES = {"float32": 0, "int16": 1}
+_SEGMENT_HEADER = struct.Struct("<dfIB")
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _little_endian(samples: array) -> array:
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples
+
+
+def _finite(samples: array) -> array:
+    """Reject NaN / infinity (a sum is not finite if any float sample is not)"""
+    if samples.typecode == "f" and not math.isfinite(sum(samples)):
+        raise ValueError("samples must be finite float32 values (no NaN, no infinity, |value| < 3.4e38)")
+    return samples
+
+
+def samples_from_values(values: Iterable, dtype: str = "float32") -> array:
+    """JSON sample list -> packed array (int16 values must fit, float32 values are rounded and must stay finite)"""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+    try:
+        samples = array(DTYPES[dtype], values)
+    except (TypeError, OverflowError) as e:
+        raise ValueError(f"samples are not valid {dtype} values: {e}")
+    return _finite(samples)
+
+
+def samples_from_bytes(data: bytes, dtype: str = "float32") -> array:
+    """Raw little-endian bytes -> packed array (one copy; float32 only summed to reject NaN / infinity)"""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+    samples = array(DTYPES[dtype])
+    if len(data) % samples.itemsize:
+        raise ValueError(f"body length {len(data)} is not a multiple of {samples.itemsize} ({dtype})")
+    samples.frombytes(data)
+    return _finite(_little_endian(samples))
+
+
+def store(
+    db: Session,
+    user_id: int,
+    device_id: str,
+    signal: str,
+    start_ts: datetime,
+    sample_rate: float,
+    samples: array,
+    dtype: str = "float32",
+) -> int:
+    """
+    Write `samples` as compressed chunks in the session's transaction (the
+    caller commits). Returns the number of chunks.
+    """
+    if signal not in SIGNALS:
+        raise ValueError(f"signal must be one of {', '.join(SIGNALS)}")
+    if not (0 < sample_rate <= MAX_SAMPLE_RATE):
+        raise ValueError(f"sample_rate must be in (0, {MAX_SAMPLE_RATE:g}]")
+    if not samples:
+        return 0
+    if len(samples) > MAX_SAMPLES:
+        raise ValueError(f"at most {MAX_SAMPLES} samples per upload")
+
+    per_chunk = max(int(sample_rate * CHUNK_SECONDS), 1)
+    raw = memoryview(_little_endian(samples)).cast("B")
+    itemsize = samples.itemsize
+    now = datetime.utcnow()
+    rows = []
+    for first in range(0, len(samples), per_chunk):
+        count = min(per_chunk, len(samples) - first)
+        chunk_start = start_ts + timedelta(seconds=first / sample_rate)
+        rows.append({
+            "user_id": user_id,
+            "device_id": device_id,
+            "signal": signal,
+            "start_ts": chunk_start,
+            "end_ts": chunk_start + timedelta(seconds=count / sample_rate),
+            "sample_rate": sample_rate,
+            "sample_count": count,
+            "dtype": dtype,
+            "data": zlib.compress(raw[first * itemsize:(first + count) * itemsize], COMPRESSION_LEVEL),
+            "created_at": now,
+        })
+
+    insert = upsert_insert(db.get_bind())
+    db.execute(
+        insert(WaveformChunk).on_conflict_do_nothing(
+            index_elements=[
+                WaveformChunk.device_id,
+                WaveformChunk.user_id,
+                WaveformChunk.signal,
+                WaveformChunk.start_ts,
+                WaveformChunk.sample_rate,
+            ]
+        ),
+        rows,
+    )
+    return len(rows)
+
+
+def read_window(
+    db: Session,
+    user_id: int,
+    signal: str,
+    start: datetime,
+    end: datetime,
+    device_id: Optional[str] = None,
+) -> List[Dict[str, any]]:
+    """
+    Segments of `signal` in [start, end), oldest first: start_ts,
+    sample_rate, dtype, device_id and `samples` (a memoryview over the
+    decompressed chunk, already trimmed to the window).
+    """
+    # A chunk never spans more than CHUNK_SECONDS, which bounds the index range from below
+    statement = (
+        select(WaveformChunk)
+        .where(
+            WaveformChunk.user_id == user_id,
+            WaveformChunk.signal == signal,
+            WaveformChunk.start_ts > start - timedelta(seconds=CHUNK_SECONDS),
+            WaveformChunk.start_ts < end,
+            WaveformChunk.end_ts > start,
+        )
+        .order_by(WaveformChunk.start_ts)
+    )
+    if device_id is not None:
+        statement = statement.where(WaveformChunk.device_id == device_id)
+
+    segments = []
+    for chunk in db.execute(statement).scalars():
+        data = zlib.decompress(chunk.data)
+        if sys.byteorder == "big":
+            stored = array(DTYPES[chunk.dtype])
+            stored.frombytes(data)
+            stored.byteswap()
+            data = stored
+        samples = memoryview(data).cast("B").cast(DTYPES[chunk.dtype])
+        first = max(0, math.ceil((start - chunk.start_ts).total_seconds() * chunk.sample_rate))
+        last = min(chunk.sample_count, math.ceil((end - chunk.start_ts).total_seconds() * chunk.sample_rate))
+        if last <= first:
+            continue
+        segments.append({
+            "device_id": chunk.device_id,
+            "start_ts": chunk.start_ts + timedelta(seconds=first / chunk.sample_rate),
+            "sample_rate": chunk.sample_rate,
+            "dtype": chunk.dtype,
+            "samples": samples[first:last],
+        })
+    return segments
+
+
+def segments_json(segments: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    return [
+        {
+            "device_id": segment["device_id"],
+            "start_ts": segment["start_ts"],
+            "sample_rate": segment["sample_rate"],
+            "dtype": segment["dtype"],
+            "samples": segment["samples"].tolist(),
+        }
+        for segment in segments
+    ]
+
+
+def segments_binary(segments: List[Dict[str, any]]) -> bytes:
+    """Binary read format (see module docstring); one join, samples as stored"""
+    parts = []
+    for segment in segments:
+        samples = segment["samples"]
+        parts.append(_SEGMENT_HEADER.pack(
+            (segment["start_ts"] - _EPOCH).total_seconds(),
+            segment["sample_rate"],
+            len(samples),
+            _DTYPE_CODES[segment["dtype"]],
+        ))
+        parts.append(samples.cast("B"))
+    return b"".join(parts)
@@ -3,6 +3,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from app.core.metrics import InstrumentedQueuePool, instrument_engine
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -18,8 +19,10 @@ engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,  # بررسی اتصال قبل از استفاده
     pool_size=5,
-    max_overflow=10
+    max_overflow=10,
+    poolclass=InstrumentedQueuePool,  # زمان انتظار برای اتصال در /metrics
 )
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -32,3 +35,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def upsert_insert(bind):
+    """
+    Return the dialect-specific insert() construct that supports
+    on_conflict_do_update (PostgreSQL in production, SQLite locally).
+    """
+    if bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
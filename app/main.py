@@ -1,5 +1,7 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 from app.database import engine, Base
@@ -10,12 +12,45 @@ from app.routers import (
     lifestyle,
     notifications,
     ai_core,
+    metrics,
+    admin,
+    device,
+    device_data,
 )
-from app.core.scheduler import start_scheduler  # For automatic notifications
+from app.core.scheduler import start_scheduler, stop_scheduler  # For automatic notifications
+from app.core.llm_gateway import get_gateway, close_gateway
+from app.core.tracing import ServerTimingMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.device_status import store as device_status_store
+from app.core.fleet_monitor import monitor as fleet_monitor
+from app.core.device_commands import listener as device_command_listener
 
 # ------------------ Create Database Tables ------------------
 Base.metadata.create_all(bind=engine)
 
+# ------------------ Startup / Shutdown ------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open LLM connections (TLS handshakes) before the first user request
+    gateway = get_gateway()
+    await run_in_threadpool(gateway.warm_up)
+    await gateway.awarm_up()
+    # Once per worker process; job leases keep each run on a single worker
+    start_scheduler()
+    # Heartbeats are buffered per worker and flushed as upserts every few seconds
+    device_status_store.start()
+    # Offline detection (timing wheel over heartbeat deadlines)
+    fleet_monitor.start()
+    # Wakes parked /device/pending-commands polls for commands enqueued by other workers
+    device_command_listener.start()
+    yield
+    stop_scheduler()
+    device_command_listener.stop()
+    fleet_monitor.stop()
+    device_status_store.stop()
+    await close_gateway()
+
+
 # ------------------ Create FastAPI Application ------------------
 app = FastAPI(
     title="Sedi Intelligent Health Assistant",
@@ -25,6 +60,7 @@ app = FastAPI(
         "and integrates GPT-powered intelligence, adaptive memory, and emotional engagement."
     ),
     version="2.0.1",
+    lifespan=lifespan,
 )
 
 # ------------------ CORS Configuration ------------------
@@ -38,19 +74,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# ------------------ Per-phase timings (Server-Timing header) ------------------
+app.add_middleware(ServerTimingMiddleware)
+
+# ------------------ Request metrics (latency / status per route) ------------------
+app.add_middleware(MetricsMiddleware)
+
 # ------------------ Main Routes (Routers) ------------------
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(interact.router, prefix="/interact", tags=["Interaction"])
 app.include_router(health.router, prefix="/health", tags=["Health Data"])
 app.include_router(lifestyle.router, prefix="/lifestyle", tags=["Lifestyle Data"])
 app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+app.include_router(device.router, prefix="/device", tags=["Device"])
+app.include_router(device_data.router, prefix="/device", tags=["Device Data"])
 app.include_router(ai_core.router, prefix="/ai_core", tags=["AI Core"])
-
-# ------------------ Activate Scheduler ------------------
-from app.core.scheduler import start_scheduler
-start_scheduler()
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 # ------------------ Root Endpoint for Testing ------------------
 @app.get("/")
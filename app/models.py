@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Index, LargeBinary
 from datetime import datetime
 from app.database import Base
 
@@ -27,6 +27,22 @@ class Memory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Recent messages per user (newest first) and per-user counts
+Index("ix_memory_user_id_created_at", Memory.user_id, Memory.created_at.desc())
+
+
+# -------------------- ConversationState --------------------
+class ConversationState(Base):
+    """Per-user conversation counters, maintained by ConversationMemory.save_conversation"""
+    __tablename__ = "conversation_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    stage = Column(String, nullable=False, default="first_contact")  # ConversationStage value
+    first_contact_at = Column(DateTime, nullable=True)
+    last_interaction_at = Column(DateTime, nullable=True, index=True)  # Inactivity checks
+
+
 # -------------------- HealthData --------------------
 class HealthData(Base):
     __tablename__ = "health_data"
@@ -36,9 +52,16 @@ class HealthData(Base):
     heart_rate = Column(String, nullable=True)
     temperature = Column(String, nullable=True)
     spo2 = Column(String, nullable=True)
+    source = Column(String, nullable=True)                  # NULL/"device" = reported; "ecg" | "ppg" = derived (app/core/vitals.py)
+    hrv_rmssd = Column(Float, nullable=True)                # ms, derived only
+    hrv_sdnn = Column(Float, nullable=True)                 # ms, derived only
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Latest readings per user
+Index("ix_health_data_user_id_created_at", HealthData.user_id, HealthData.created_at.desc())
+
+
 # -------------------- Notification --------------------
 class Notification(Base):
     __tablename__ = "notifications"
@@ -53,3 +76,156 @@ class Notification(Base):
     metadata_json = Column("metadata", String, nullable=True)  # JSON string of metadata object (column name is 'metadata' in DB)
     is_read = Column(Boolean, default=False)  # Contract: is_read
     created_at = Column(DateTime, default=datetime.utcnow)  # Contract: created_at
+    release_at = Column(DateTime, nullable=True)  # Pre-generated, hidden until this time (UTC); NULL = visible
+
+
+# GET /notifications page + total count
+Index("ix_notifications_user_id_created_at", Notification.user_id, Notification.created_at.desc())
+# Unread count
+Index("ix_notifications_user_id_is_read_created_at", Notification.user_id, Notification.is_read, Notification.created_at)
+# Release of pre-generated notifications (only the few unreleased rows are indexed)
+Index(
+    "ix_notifications_release_at",
+    Notification.release_at,
+    postgresql_where=Notification.release_at.isnot(None),
+    sqlite_where=Notification.release_at.isnot(None),
+)
+
+
+# -------------------- GreetingSchedule --------------------
+class GreetingSchedule(Base):
+    """Due-queue of morning greetings: next send time per user (app/core/greeting_schedule.py)"""
+    __tablename__ = "greeting_schedule"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    timezone = Column(String, nullable=True)                # IANA name; NULL = GREETING_DEFAULT_TIMEZONE
+    next_due_at = Column(DateTime, nullable=False, index=True)  # UTC; the scheduler takes rows as they come due
+    pregenerated_for = Column(DateTime, nullable=True)          # next_due_at of an unreleased greeting already written
+
+
+# -------------------- SchedulerLease --------------------
+class SchedulerLease(Base):
+    """Which node runs a scheduler job, and when it last started (app/core/job_lease.py)"""
+    __tablename__ = "scheduler_leases"
+
+    job_id = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)              # "<host>:<pid>:<random>" of the running node
+    expires_at = Column(DateTime, nullable=False)       # Renewed while the job runs
+    last_run_at = Column(DateTime, nullable=False)      # Start of the last run on any node
+
+
+# -------------------- SchedulerRun --------------------
+class SchedulerRun(Base):
+    """One run of a scheduler job, with its checkpoint (app/core/job_runs.py)"""
+    __tablename__ = "scheduler_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running | completed | failed
+    owner = Column(String, nullable=True)                   # Node that runs (or last ran) it
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)            # Last checkpoint
+    finished_at = Column(DateTime, nullable=True)
+    checkpoint_user_id = Column(Integer, nullable=False, default=0)  # Users up to this id are done
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    resumes = Column(Integer, nullable=False, default=0)    # Times picked up again after a crash/restart
+    error = Column(String, nullable=True)
+    notifications = Column(Integer, nullable=True)          # Notifications written
+    llm_calls = Column(Integer, nullable=True)              # LLM requests, retries included
+    llm_failures = Column(Integer, nullable=True)           # Requests that gave up (fallback text used)
+    phase_seconds = Column(String, nullable=True)           # JSON: {"select": s, "variants": s, "generate": s, "write": s}
+    interval_seconds = Column(Integer, nullable=True)       # The job's schedule interval
+    overran = Column(Boolean, nullable=True)                # Took longer than interval_seconds
+
+
+# Latest run per job
+Index("ix_scheduler_runs_job_id_started_at", SchedulerRun.job_id, SchedulerRun.started_at.desc())
+
+
+# -------------------- DeviceStatus --------------------
+class DeviceStatus(Base):
+    """Last heartbeat per device, upserted in batches (app/core/device_status.py)"""
+    __tablename__ = "device_status"
+
+    device_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    battery = Column(Integer, nullable=True)                # Percent
+    temperature = Column(Float, nullable=True)              # °C
+    status = Column(String, nullable=True)                  # As reported by the device ("active", ...)
+    last_seen_at = Column(DateTime, nullable=False)         # Time of the last heartbeat
+
+
+# -------------------- DeviceCommand --------------------
+class DeviceCommand(Base):
+    """Queue of voice commands for gadgets, claimed by /device/pending-commands (app/core/device_commands.py)"""
+    __tablename__ = "device_commands"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    device_id = Column(String, nullable=True)               # NULL = any device of the user
+    notification_id = Column(Integer, ForeignKey("notifications.id"), nullable=True)
+    sound_id = Column(String, nullable=False, default="alert_default")
+    text = Column(String, nullable=False)
+    volume = Column(Integer, nullable=False, default=90)
+    repeat = Column(Integer, nullable=False, default=1)
+    language = Column(String, nullable=False, default="fa")
+    priority = Column(Integer, nullable=False, default=3)
+    status = Column(String, nullable=False, default="pending")  # pending | delivered | acknowledged
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+    delivered_to = Column(String, nullable=True)            # device_id that claimed it
+    acknowledged_at = Column(DateTime, nullable=True)
+
+
+# Claiming: only the pending commands are indexed
+Index(
+    "ix_device_commands_pending",
+    DeviceCommand.user_id,
+    DeviceCommand.id,
+    postgresql_where=DeviceCommand.status == "pending",
+    sqlite_where=DeviceCommand.status == "pending",
+)
+
+
+# -------------------- WaveformChunk --------------------
+class WaveformChunk(Base):
+    """A few seconds of one ECG/PPG waveform, zlib-compressed packed samples (app/core/waveforms.py)"""
+    __tablename__ = "waveform_chunks"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    device_id = Column(String, nullable=False)
+    signal = Column(String, nullable=False)                 # ecg | ppg
+    start_ts = Column(DateTime, nullable=False)             # UTC time of the first sample
+    end_ts = Column(DateTime, nullable=False)               # start_ts + sample_count / sample_rate
+    sample_rate = Column(Float, nullable=False)             # Hz
+    sample_count = Column(Integer, nullable=False)
+    dtype = Column(String, nullable=False)                  # float32 | int16 (little-endian)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)          # Vitals derived (app/core/vitals.py)
+
+
+# Time-window reads per user and signal
+Index("ix_waveform_chunks_user_id_signal_start_ts", WaveformChunk.user_id, WaveformChunk.signal, WaveformChunk.start_ts)
+# One chunk per key: re-sent uploads are ignored
+Index(
+    "ux_waveform_chunks_key",
+    WaveformChunk.device_id,
+    WaveformChunk.user_id,
+    WaveformChunk.signal,
+    WaveformChunk.start_ts,
+    WaveformChunk.sample_rate,
+    unique=True,
+)
+# Vitals derivation: only the chunks not processed yet are indexed, per stream in time order
+Index(
+    "ix_waveform_chunks_unprocessed_stream",
+    WaveformChunk.user_id,
+    WaveformChunk.device_id,
+    WaveformChunk.signal,
+    WaveformChunk.start_ts,
+    postgresql_where=WaveformChunk.processed_at.is_(None),
+    sqlite_where=WaveformChunk.processed_at.is_(None),
+)
@@ -0,0 +1,59 @@
+# app/routers/admin.py
+import hmac
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas import APIResponse
+from app.core import job_runs
+
+router = APIRouter()
+
+# Admin endpoints require the X-Admin-Token header; without ADMIN_TOKEN they are closed
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+# ------------------ Scheduler run history ------------------
+@router.get("/scheduler/runs", response_model=APIResponse, dependencies=[Depends(require_admin)])
+def get_scheduler_runs(
+    job_id: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern="^(running|completed|failed)$"),
+    before_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Individual scheduler runs, newest first: users scanned, notifications,
+    LLM calls/failures, seconds per phase and whether the run overran its
+    interval. Page with before_id = next_before_id of the previous page.
+    """
+    runs = job_runs.list_runs(db, job_id=job_id, status=status, before_id=before_id, limit=limit)
+    return APIResponse(
+        ok=True,
+        data={
+            "runs": [job_runs.run_dict(run) for run in runs],
+            "next_before_id": runs[-1].id if len(runs) == limit else None,
+        },
+    )
+
+
+@router.get("/scheduler/summary", response_model=APIResponse, dependencies=[Depends(require_admin)])
+def get_scheduler_summary(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    db: Session = Depends(get_db),
+):
+    """Per job over the last `hours`: run durations against the interval, overruns and work done"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    runs = job_runs.list_runs(db, since=since, limit=10000)
+    return APIResponse(ok=True, data={"since": since, "jobs": job_runs.summarize(runs)})
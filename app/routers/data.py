@@ -5,24 +5,15 @@ from datetime import datetime
 from app.database import get_db
 from app import models
 from app.schemas import APIResponse, ErrorInfo
+from app.core.notification_writer import insert_notifications, notification_row
+from app.core import device_commands
 
 router = APIRouter()
 
 
-def create_auto_notification(db: Session, user_id: int, title: str, message: str, priority: int = 2):
-    """ساخت خودکار اعلان در صورت تشخیص وضعیت غیرعادی"""
-    notif = models.Notification(
-        user_id=user_id,
-        type="alert",
-        title=title,
-        message=message,
-        priority=priority,
-        sound_id="alert_health",
-        language="fa",
-        created_at=datetime.utcnow(),
-    )
-    db.add(notif)
-    db.commit()
+def auto_notification_row(user_id: int, title: str, message: str, priority: int = 2) -> dict:
+    """ردیف اعلان خودکار برای وضعیت غیرعادی (نوشتن گروهی با insert_notifications)"""
+    return notification_row(user_id, message, type="alert", title=title, priority=str(priority))
 
 
 @router.post("/upload", response_model=APIResponse)
@@ -71,9 +62,16 @@ def upload_data(payload: dict, db: Session = Depends(get_db)):
         if record.temperature and record.temperature > 37.8:
             alerts.append(("افزایش دمای بدن", f"دمای بدن {record.temperature}°C است."))
 
-        # ایجاد اعلان‌ها
-        for title, msg in alerts:
-            create_auto_notification(db, user.id, title, msg, priority=3)
+        # ایجاد اعلان‌ها و فرمان صوتی گجت (همه در یک تراکنش)
+        if alerts:
+            insert_notifications(db, [auto_notification_row(user.id, title, msg, priority=3) for title, msg in alerts])
+            device_commands.enqueue(db, [
+                device_commands.command_row(
+                    user.id, msg, sound_id="alert_health", repeat=2, language=user.preferred_language or "fa"
+                )
+                for _, msg in alerts
+            ])
+            db.commit()
 
         return APIResponse(ok=True, data={"record_id": record.id, "alerts_generated": len(alerts)})
 
@@ -1,46 +1,34 @@
 # app/routers/device.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
 from app.database import get_db
 from app import models
 from app.schemas import APIResponse, ErrorInfo
+from app.core import device_commands, device_status
+from app.core.fleet_monitor import monitor as fleet_monitor
 
 router = APIRouter()
 
 
 # 🔹 1. دریافت فرمان‌های صوتی جدید برای گجت
 @router.get("/pending-commands", response_model=APIResponse)
-def get_pending_commands(user_id: int, db: Session = Depends(get_db)):
+async def get_pending_commands(
+    user_id: int,
+    device_id: Optional[str] = None,
+    wait: float = Query(0, ge=0, le=device_commands.MAX_WAIT_SECONDS),
+    limit: int = Query(20, ge=1, le=100),
+):
     """
     گجت فرمان‌های صوتی جدید را از این مسیر می‌گیرد
-    """
-    alerts = (
-        db.query(models.Notification)
-        .filter(models.Notification.user_id == user_id)
-        .filter(models.Notification.is_read == False)
-        .filter(models.Notification.priority >= 3)
-        .order_by(models.Notification.created_at.desc())
-        .all()
-    )
 
-    if not alerts:
-        return APIResponse(ok=True, data={"commands": []})
-
-    commands = []
-    for a in alerts:
-        command = {
-            "sound_id": a.sound_id or "alert_default",
-            "text": a.message or a.title or "هشدار سلامت",
-            "volume": 90,
-            "repeat": 2 if a.priority >= 3 else 1,
-            "language": a.language or "fa",
-            "priority": a.priority,
-        }
-        commands.append(command)
-        a.is_read = True
-
-    db.commit()
+    Commands are claimed from the device_commands queue
+    (app/core/device_commands.py): each is delivered to exactly one poll.
+    With wait > 0 the request is a long-poll - it returns as soon as a
+    command is enqueued, or with an empty list after `wait` seconds.
+    """
+    commands = await device_commands.next_commands(user_id, device_id=device_id, wait=wait, limit=limit)
     return APIResponse(ok=True, data={"commands": commands})
 
 
@@ -56,30 +44,77 @@ def device_heartbeat(payload: dict, db: Session = Depends(get_db)):
         "temperature": 41.3,
         "status": "active"
     }
+    Only the latest values per device are kept (app/core/device_status.py):
+    an in-memory update here, batched upserts into device_status.
     """
-    user = db.query(models.User).filter(models.User.id == payload.get("user_id")).first()
-    if not user:
+    device_id = payload.get("device_id")
+    user_id = payload.get("user_id")
+    if not device_id:
+        return APIResponse(
+            ok=False, error=ErrorInfo(code="DEVICE_ID_REQUIRED", message="device_id is required.")
+        )
+
+    if not isinstance(user_id, int) or isinstance(user_id, bool):
         return APIResponse(
             ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found.")
         )
 
-    msg = (
-        f"Device {payload.get('device_id')} heartbeat received. "
-        f"Battery={payload.get('battery')}%, Temp={payload.get('temperature')}°C"
+    # The user lookup is only needed the first time this worker sees the device
+    known_user = device_status.store.known_user(device_id)
+    if (known_user is None or known_user != user_id) and db.get(models.User, user_id) is None:
+        return APIResponse(
+            ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found.")
+        )
+
+    entry = device_status.store.record(
+        device_id,
+        user_id,
+        battery=payload.get("battery"),
+        temperature=payload.get("temperature"),
+        status=payload.get("status"),
     )
+    fleet_monitor.heartbeat(device_id, entry["last_seen_at"])
+    return APIResponse(ok=True, data={"message": "Heartbeat received successfully."})
 
-    notif = models.Notification(
-        user_id=user.id,
-        type="info",
-        title="Heartbeat",
-        message=msg,
-        priority=1,
-        created_at=datetime.utcnow(),
+
+# 🔹 وضعیت فعلی گجت‌ها (آخرین heartbeat)
+@router.get("/status", response_model=APIResponse)
+def get_device_status(
+    device_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Last seen / battery / temperature of one device (device_id) or of all
+    devices of a user (user_id).
+    """
+    if device_id:
+        status = device_status.device_status(db, device_id)
+        if status is None:
+            return APIResponse(
+                ok=False, error=ErrorInfo(code="DEVICE_NOT_FOUND", message="No heartbeat from this device yet.")
+            )
+        return APIResponse(ok=True, data=status)
+    if user_id is not None:
+        return APIResponse(ok=True, data={"devices": device_status.user_devices(db, user_id)})
+    return APIResponse(
+        ok=False, error=ErrorInfo(code="DEVICE_ID_REQUIRED", message="device_id or user_id is required.")
     )
-    db.add(notif)
-    db.commit()
 
-    return APIResponse(ok=True, data={"message": "Heartbeat received successfully."})
+
+# 🔹 وضعیت آنلاین/آفلاین همه گجت‌ها
+@router.get("/fleet", response_model=APIResponse)
+def get_fleet(
+    state: Optional[str] = Query(None, pattern="^(online|offline)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Online / offline device counts (app/core/fleet_monitor.py). With
+    state=online|offline also one page of that list: online devices least
+    recently seen first, offline devices most recently lost first.
+    """
+    return APIResponse(ok=True, data=fleet_monitor.fleet(state=state, limit=limit, offset=offset))
 
 
 # 🔹 3. تأیید اجرای فرمان توسط گجت (Acknowledge)
@@ -89,9 +124,11 @@ def acknowledge_command(payload: dict, db: Session = Depends(get_db)):
     گجت پس از اجرای فرمان صوتی، نتیجه را اعلام می‌کند.
     {
         "user_id": 1,
-        "sound_id": "alert_temp",
+        "command_ids": [12, 13],
         "status": "played"
     }
+    Older gadgets send "sound_id" instead of "command_ids"; that is still
+    logged as a notification.
     """
     user = db.query(models.User).filter(models.User.id == payload.get("user_id")).first()
     if not user:
@@ -99,6 +136,10 @@ def acknowledge_command(payload: dict, db: Session = Depends(get_db)):
             ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found.")
         )
 
+    if payload.get("command_ids"):
+        acknowledged = device_commands.acknowledge(db, user.id, payload["command_ids"])
+        return APIResponse(ok=True, data={"acknowledged": True, "commands": acknowledged})
+
     notif = models.Notification(
         user_id=user.id,
         type="log",
@@ -1,14 +1,39 @@
 # app/routers/device_data.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 from app.database import get_db
 from app import models
 from app.schemas import APIResponse, ErrorInfo
+from app.core import waveforms
+import base64
+import binascii
 import json
 
 router = APIRouter()
 
+# Rates assumed for sensors.ecg / sensors.ppg when the upload does not send "sample_rates"
+DEFAULT_SAMPLE_RATES = {"ecg": 250.0, "ppg": 100.0}
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """ISO 8601 (e.g. "2025-11-06T10:05:23Z") -> naive UTC; None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _waveform_error(message: str) -> APIResponse:
+    return APIResponse(ok=False, error=ErrorInfo(code="INVALID_WAVEFORM", message=message))
+
 
 @router.post("/data/upload", response_model=APIResponse)
 def upload_device_data(payload: dict, db: Session = Depends(get_db)):
@@ -26,20 +51,33 @@ def upload_device_data(payload: dict, db: Session = Depends(get_db)):
         "spo2": 97,
         "steps": 3456
       },
+      "sample_rates": {"ecg": 250, "ppg": 100},
       "timestamp": "2025-11-06T10:05:23Z"
     }
+    ecg/ppg arrays are stored as waveform chunks of the device starting at
+    "timestamp" (device_id is then required; see POST /device/waveform for
+    larger or binary uploads).
     """
     user = db.query(models.User).filter(models.User.id == payload.get("user_id")).first()
     if not user:
         return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
 
     sensors = payload.get("sensors", {})
+    device_id = payload.get("device_id")
+    has_waveforms = any(isinstance(sensors.get(signal), list) and sensors.get(signal) for signal in waveforms.SIGNALS)
+    if has_waveforms and not device_id:
+        # Waveforms are stored (and analyzed) per device: never merge several devices into one stream
+        return _waveform_error("device_id is required with ecg/ppg samples.")
+    sample_rates = payload.get("sample_rates") or {}
+    if not isinstance(sample_rates, dict):
+        return _waveform_error('sample_rates must be an object, e.g. {"ecg": 250}.')
+
     created_at = datetime.utcnow()
+    start_ts = _parse_timestamp(payload.get("timestamp")) or created_at
 
     # ذخیره داده‌های حیاتی (HealthData)
     record_health = models.HealthData(
         user_id=user.id,
-        source="device",
         heart_rate=sensors.get("heart_rate"),
         spo2=sensors.get("spo2"),
         temperature=sensors.get("temperature"),
@@ -47,26 +85,136 @@ def upload_device_data(payload: dict, db: Session = Depends(get_db)):
     )
     db.add(record_health)
 
-    # ذخیره داده‌های سبک زندگی (LifestyleData)
-    record_life = models.LifestyleData(
-        user_id=user.id,
-        steps=sensors.get("steps"),
-        calories=None,
-        sleep_hours=None,
-        stress_level=None,
-        created_at=created_at
-    )
-    db.add(record_life)
+    # steps: no lifestyle table in this schema yet (models.LifestyleData does not exist)
+
+    # ذخیره سیگنال‌های خام (ECG/PPG) به صورت chunk فشرده
+    waveform_chunks = 0
+    try:
+        for signal in waveforms.SIGNALS:
+            values = sensors.get(signal)
+            if isinstance(values, list) and values:
+                waveform_chunks += waveforms.store(
+                    db,
+                    user.id,
+                    device_id,
+                    signal,
+                    start_ts,
+                    float(sample_rates.get(signal) or DEFAULT_SAMPLE_RATES[signal]),
+                    waveforms.samples_from_values(values),
+                )
+    except (AttributeError, TypeError, ValueError) as e:
+        db.rollback()
+        return _waveform_error(str(e))
 
     db.commit()
     db.refresh(record_health)
-    db.refresh(record_life)
 
     return APIResponse(
         ok=True,
         data={
             "health_id": record_health.id,
-            "lifestyle_id": record_life.id,
+            "lifestyle_id": None,
+            "waveform_chunks": waveform_chunks,
             "timestamp": created_at.isoformat()
         }
     )
+
+
+# ------------------ سیگنال‌های خام ECG/PPG ------------------
+@router.post("/waveform", response_model=APIResponse)
+def upload_waveform(payload: dict, db: Session = Depends(get_db)):
+    """
+    ثبت سیگنال خام با نرخ بالا
+    {
+      "device_id": "Sedi001",
+      "user_id": 1,
+      "signal": "ecg",
+      "start_ts": "2025-11-06T10:05:23.120Z",
+      "sample_rate": 250,
+      "samples": [0.12, 0.15, ...]          # or
+      "data": "<base64>", "dtype": "int16"  # little-endian float32 / int16
+    }
+    """
+    user = db.get(models.User, payload.get("user_id"))
+    if not user:
+        return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
+    start_ts = _parse_timestamp(payload.get("start_ts"))
+    if start_ts is None or not payload.get("device_id"):
+        return _waveform_error("device_id and an ISO 8601 start_ts are required.")
+
+    dtype = payload.get("dtype", "float32")
+    try:
+        if payload.get("data") is not None:
+            samples = waveforms.samples_from_bytes(base64.b64decode(payload["data"], validate=True), dtype)
+        else:
+            samples = waveforms.samples_from_values(payload.get("samples") or [], dtype)
+        chunks = waveforms.store(
+            db, user.id, payload["device_id"], payload.get("signal"), start_ts,
+            float(payload.get("sample_rate") or 0), samples, dtype,
+        )
+    except (TypeError, ValueError, binascii.Error) as e:
+        db.rollback()
+        return _waveform_error(str(e))
+    db.commit()
+    return APIResponse(ok=True, data={"samples": len(samples), "chunks": chunks})
+
+
+@router.post("/waveform/binary", response_model=APIResponse)
+def upload_waveform_binary(
+    user_id: int,
+    device_id: str,
+    signal: str,
+    start_ts: str,
+    sample_rate: float,
+    dtype: str = "float32",
+    body: bytes = Body(..., media_type="application/octet-stream"),
+    db: Session = Depends(get_db),
+):
+    """
+    Same as POST /waveform with the samples as the raw request body
+    (Content-Type: application/octet-stream, little-endian float32 or int16)
+    """
+    if db.get(models.User, user_id) is None:
+        return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
+    start = _parse_timestamp(start_ts)
+    if start is None:
+        return _waveform_error("start_ts must be ISO 8601.")
+    try:
+        samples = waveforms.samples_from_bytes(body, dtype)
+        chunks = waveforms.store(db, user_id, device_id, signal, start, sample_rate, samples, dtype)
+    except ValueError as e:
+        db.rollback()
+        return _waveform_error(str(e))
+    db.commit()
+    return APIResponse(ok=True, data={"samples": len(samples), "chunks": chunks})
+
+
+@router.get("/waveform")
+def get_waveform(
+    user_id: int,
+    signal: str = Query(..., pattern="^(ecg|ppg)$"),
+    start: str = Query(..., description="ISO 8601"),
+    end: str = Query(..., description="ISO 8601"),
+    device_id: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|binary)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Samples of one signal in [start, end), as JSON segments (windows up to
+    MAX_JSON_READ_SECONDS) or in the binary format of app/core/waveforms.py
+    (format=binary, up to MAX_READ_SECONDS).
+    """
+    window_start, window_end = _parse_timestamp(start), _parse_timestamp(end)
+    if window_start is None or window_end is None or window_end <= window_start:
+        return _waveform_error("start and end must be ISO 8601 with start < end.")
+    max_seconds = waveforms.MAX_READ_SECONDS if format == "binary" else waveforms.MAX_JSON_READ_SECONDS
+    if (window_end - window_start).total_seconds() > max_seconds:
+        return _waveform_error(
+            f"Window is longer than {max_seconds:g} seconds"
+            + ("." if format == "binary" else " (use format=binary for longer windows).")
+        )
+
+    segments = waveforms.read_window(db, user_id, signal, window_start, window_end, device_id=device_id)
+    if format == "binary":
+        return Response(content=waveforms.segments_binary(segments), media_type="application/octet-stream")
+    return APIResponse(ok=True, data={"segments": waveforms.segments_json(segments)})
@@ -6,6 +6,7 @@ from app.database import get_db
 from app import models
 from app.schemas import APIResponse, ErrorInfo
 from app.core.ai_text_engine import generate_notification_text
+from app.core import device_commands
 
 router = APIRouter()
 
@@ -53,18 +54,27 @@ def add_health_data(payload: dict, db: Session = Depends(get_db)):
         }
     )
 
-    # ثبت نوتیف جدید
+    # ثبت نوتیف جدید و فرمان صوتی گجت (در یک تراکنش)
     notif = models.Notification(
         user_id=user.id,
         type="alert",
         title="Health Update",
         message=msg,
         priority=3,
-        sound_id="alert_health",
-        language=user.preferred_language or "en",
         created_at=datetime.utcnow(),
     )
     db.add(notif)
+    db.flush()
+    device_commands.enqueue(db, [
+        device_commands.command_row(
+            user.id,
+            msg,
+            sound_id="alert_health",
+            repeat=2,
+            language=user.preferred_language or "en",
+            notification_id=notif.id,
+        )
+    ])
     db.commit()
     db.refresh(notif)
 
@@ -10,21 +10,26 @@ RESPONSIBILITY:
 """
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import User, Memory
 from app.core.conversation.brain import ConversationBrain
+from app.core.tracing import get_logger, phase
 from app.schemas import InteractionResponse
 from datetime import datetime
 from fastapi import Depends
-from typing import Optional
+from typing import Optional, Tuple
+import json
 import uuid
 
 router = APIRouter()
+log = get_logger("interact")
 
 # ---------------- Introduce User ----------------
 @router.post("/introduce", response_model=InteractionResponse)
-def introduce_user(
+async def introduce_user(
     name: str = Query(...),
     secret_key: str = Query(...),
     lang: str = Query("en"),
@@ -38,6 +43,28 @@ def introduce_user(
     Otherwise, creates new user account.
     Returns greeting from Conversation Brain.
     """
+    registered_id = await run_in_threadpool(_register_user, db, name, secret_key, lang, user_id)
+
+    # Use Conversation Brain for greeting
+    brain = ConversationBrain(db, language=lang)
+    greeting = await brain.aget_greeting(registered_id)
+
+    return InteractionResponse(
+        message=greeting["message"],
+        language=lang,
+        user_id=registered_id,
+        timestamp=datetime.utcnow()
+    )
+
+
+def _register_user(
+    db: Session,
+    name: str,
+    secret_key: str,
+    lang: str,
+    user_id: Optional[int]
+) -> int:
+    """Upgrade an anonymous user or create a new one; returns the user id"""
     # If user_id provided, try to upgrade anonymous user
     if user_id:
         existing_user = db.query(User).filter(User.id == user_id).first()
@@ -57,18 +84,8 @@ def introduce_user(
                 existing_user.secret_key = secret_key
                 existing_user.preferred_language = lang
                 db.commit()
-                db.refresh(existing_user)
-                
-                # Use Conversation Brain for greeting
-                brain = ConversationBrain(db, language=lang)
-                greeting = brain.get_greeting(existing_user.id)
                 
-                return InteractionResponse(
-                    message=greeting["message"],
-                    language=lang,
-                    user_id=existing_user.id,
-                    timestamp=datetime.utcnow()
-                )
+                return user_id
     
     # Check if name already exists
     existing_user = db.query(User).filter(User.name == name).first()
@@ -78,24 +95,16 @@ def introduce_user(
     # Create new user
     new_user = User(name=name, secret_key=secret_key, preferred_language=lang)
     db.add(new_user)
+    db.flush()
+    new_user_id = new_user.id
     db.commit()
-    db.refresh(new_user)
 
-    # Use Conversation Brain for greeting
-    brain = ConversationBrain(db, language=lang)
-    greeting = brain.get_greeting(new_user.id)
-
-    return InteractionResponse(
-        message=greeting["message"],
-        language=lang,
-        user_id=new_user.id,
-        timestamp=datetime.utcnow()
-    )
+    return new_user_id
 
 
 # ---------------- Chat with Sedi ----------------  
 @router.post("/chat", response_model=InteractionResponse)
-def chat_with_sedi(
+async def chat_with_sedi(
     message: str = Query(...),
     lang: str = Query("en"),
     user_id: Optional[int] = Query(None),  # CRITICAL: Frontend must send user_id from previous response
@@ -111,20 +120,139 @@ def chat_with_sedi(
     For new users without credentials, creates a temporary anonymous user.
     
     CRITICAL: Frontend should send user_id from previous response to maintain conversation continuity.
+    
+    Async end to end: user lookup runs in the threadpool and the LLM call
+    is awaited, so a slow completion does not hold a worker thread.
+    """
+    with phase("resolve_user"):
+        user_id, requires_security_check = await run_in_threadpool(
+            _resolve_chat_user, db, lang, user_id, name, secret_key
+        )
+    
+    # Use Conversation Brain to process message
+    brain = ConversationBrain(db, language=lang)
+    
+    # If this is a greeting request, use get_greeting instead
+    if message.strip() == "__GREETING__":
+        greeting = await brain.aget_greeting(user_id)
+        return InteractionResponse(
+            message=greeting["message"],
+            language=greeting["language"],
+            user_id=user_id,
+            timestamp=datetime.utcnow(),
+            requires_security_check=requires_security_check
+        )
+    
+    # Normal chat message
+    result = await brain.aprocess_message(user_id, message)
+    
+    return InteractionResponse(
+        message=result["message"],
+        language=result["language"],
+        user_id=user_id,
+        timestamp=datetime.utcnow(),
+        requires_security_check=requires_security_check
+    )
+
+
+# ---------------- Chat with Sedi (streaming) ----------------
+@router.post("/chat/stream")
+async def chat_with_sedi_stream(
+    message: str = Query(...),
+    lang: str = Query("en"),
+    user_id: Optional[int] = Query(None),
+    name: Optional[str] = Query(None),
+    secret_key: Optional[str] = Query(None),
+):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+    
+    Same parameters and user handling as /chat. Events:
+    - token: {"delta": "..."} - reply text as the model produces it
+    - done:  full InteractionResponse fields + stage/metadata, sent after
+             the reply has been saved to memory
+    - error: {"message": "...", "error": "..."}
+    
+    The stream owns its session (not Depends), used only before the
+    first token: the transaction ends once the turn is prepared, and the
+    reply is saved on a new short session, so a slow stream never keeps
+    a pooled connection checked out.
+    """
+    db = SessionLocal()
+    try:
+        user_id, requires_security_check = await run_in_threadpool(
+            _resolve_chat_user, db, lang, user_id, name, secret_key
+        )
+    except Exception:
+        db.close()
+        raise
+    
+    brain = ConversationBrain(db, language=lang)
+    
+    async def greeting_events():
+        greeting = await brain.aget_greeting(user_id)
+        yield {"event": "token", "delta": greeting["message"]}
+        yield {"event": "done", **greeting}
+    
+    async def event_stream():
+        if message.strip() == "__GREETING__":
+            events = greeting_events()
+        else:
+            events = brain.astream_message(user_id, message, session_factory=SessionLocal)
+        
+        try:
+            async for event in events:
+                event_name = event.pop("event")
+                if event_name == "done":
+                    event.update(
+                        user_id=user_id,
+                        timestamp=datetime.utcnow().isoformat(),
+                        requires_security_check=requires_security_check
+                    )
+                yield _sse(event_name, event)
+        finally:
+            await run_in_threadpool(db.close)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+        },
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _resolve_chat_user(
+    db: Session,
+    lang: str,
+    user_id: Optional[int],
+    name: Optional[str],
+    secret_key: Optional[str]
+) -> Tuple[int, bool]:
+    """
+    Find the chatting user (or create an anonymous one).
+    
+    Returns:
+        (user_id, requires_security_check)
     """
     user = None
     requires_security_check = False
-    is_anonymous = False
     
     # PRIORITY 1: If user_id provided, use it directly (maintains conversation continuity)
     if user_id:
-        print(f"[ROUTER DEBUG] user_id provided: {user_id}")
         user = db.query(User).filter(User.id == user_id).first()
         if user:
-            print(f"[ROUTER DEBUG] Found user: id={user.id}, name={user.name}")
+            log.debug("chat_user_found", user_id=user.id)
         else:
             # Invalid user_id provided - fall through to create new user
-            print(f"[ROUTER DEBUG] Invalid user_id - will create new user")
+            log.info("chat_user_not_found", user_id=user_id)
             user = None
     
     # PRIORITY 2: If credentials provided, try to find user
@@ -139,9 +267,6 @@ def chat_with_sedi(
     
     # PRIORITY 3: If no user found and no credentials, create anonymous user for new users
     if not user and (not name or not secret_key):
-        # TEMP DEBUG: Log anonymous user creation
-        print(f"[ROUTER DEBUG] No user_id/credentials provided - creating anonymous user")
-        
         # Create temporary anonymous user for new users
         # Use UUID to ensure uniqueness - always create new to avoid conflicts
         anonymous_name = f"anonymous_{uuid.uuid4().hex[:12]}"
@@ -154,10 +279,9 @@ def chat_with_sedi(
             preferred_language=lang
         )
         db.add(user)
+        db.flush()
+        log.info("anonymous_user_created", user_id=user.id)
         db.commit()
-        db.refresh(user)
-        is_anonymous = True
-        print(f"[ROUTER DEBUG] Created anonymous user - user_id={user.id}, name={user.name}")
     
     # If still no user (shouldn't happen), return error
     if not user:
@@ -166,35 +290,18 @@ def chat_with_sedi(
             detail="Failed to create or find user account."
         )
     
-    # Use Conversation Brain to process message
-    brain = ConversationBrain(db, language=lang)
-    
-    # If this is a greeting request, use get_greeting instead
-    if message.strip() == "__GREETING__":
-        greeting = brain.get_greeting(user.id)
-        return InteractionResponse(
-            message=greeting["message"],
-            language=greeting["language"],
-            user_id=user.id,
-            timestamp=datetime.utcnow(),
-            requires_security_check=requires_security_check
-        )
-    
-    # Normal chat message
-    result = brain.process_message(user.id, message)
-    
-    return InteractionResponse(
-        message=result["message"],
-        language=result["language"],
-        user_id=user.id,
-        timestamp=datetime.utcnow(),
-        requires_security_check=requires_security_check
-    )
+    # Return the id (not the object): ending the transaction expires `user`
+    # and any later attribute access would cost a reload query
+    resolved_id = user.id
+    # End the (read) transaction: the connection goes back to the pool
+    # instead of staying checked out while the LLM call is awaited
+    db.rollback()
+    return resolved_id, requires_security_check
 
 
 # ---------------- Get Greeting ----------------
 @router.get("/greeting")
-def get_greeting(
+async def get_greeting(
     user_id: int = Query(...),
     lang: str = Query("en"),
     db: Session = Depends(get_db)
@@ -203,12 +310,14 @@ def get_greeting(
     Get greeting message from Conversation Brain.
     Used when user opens chat.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user_exists = await run_in_threadpool(
+        lambda: db.query(User.id).filter(User.id == user_id).first() is not None
+    )
+    if not user_exists:
         raise HTTPException(status_code=404, detail="User not found")
     
     brain = ConversationBrain(db, language=lang)
-    greeting = brain.get_greeting(user_id)
+    greeting = await brain.aget_greeting(user_id)
     
     return {
         "message": greeting["message"],
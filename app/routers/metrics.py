@@ -0,0 +1,16 @@
+# app/routers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import render
+
+router = APIRouter()
+
+
+# Prometheus scrape endpoint (text format 0.0.4)
+@router.get("", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Request latency/status per route, DB pool, LLM calls per call site,
+    scheduler jobs and brain phases. Values are per worker process.
+    """
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -7,6 +7,7 @@ import json
 from app.database import get_db
 from app import models
 from app.schemas import APIResponse, ErrorInfo, NotificationResponse, NotificationFeedback, Action, NotificationMetadata
+from app.core import greeting_schedule
 
 router = APIRouter()
 
@@ -28,17 +29,19 @@ def get_notifications(
     if not user:
         return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
 
-    # Get total count
-    total = db.query(models.Notification).filter(models.Notification.user_id == user_id).count()
-    unread_count = db.query(models.Notification).filter(
+    # Pre-generated notifications stay hidden until released
+    visible = db.query(models.Notification).filter(
         models.Notification.user_id == user_id,
-        models.Notification.is_read == False
-    ).count()
+        models.Notification.release_at.is_(None)
+    )
+
+    # Get total count
+    total = visible.count()
+    unread_count = visible.filter(models.Notification.is_read == False).count()
 
     # Get notifications with pagination
     notifs = (
-        db.query(models.Notification)
-        .filter(models.Notification.user_id == user_id)
+        visible
         .order_by(models.Notification.created_at.desc())
         .offset(offset)
         .limit(limit)
@@ -178,3 +181,34 @@ def submit_feedback(feedback: NotificationFeedback, db: Session = Depends(get_db
         })
 
     return APIResponse(ok=False, error=ErrorInfo(code="UNKNOWN_ERROR", message="Unknown error occurred."))
+
+
+# ------------------ زمان‌بندی پیام صبحگاهی (منطقهٔ زمانی کاربر) ------------------
+@router.get("/greeting-schedule", response_model=APIResponse)
+def get_greeting_schedule(user_id: int, db: Session = Depends(get_db)):
+    """Timezone and next morning greeting time (UTC) of a user"""
+    info = greeting_schedule.schedule_info(db, user_id)
+    if info is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user:
+            return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
+        # Not synced yet: report what the scheduler will use
+        info = {
+            "user_id": user_id,
+            "timezone": greeting_schedule.DEFAULT_TIMEZONE,
+            "next_due_at": greeting_schedule.next_due_at(user_id, None),
+        }
+    return APIResponse(ok=True, data=info)
+
+
+@router.put("/greeting-schedule", response_model=APIResponse)
+def set_greeting_schedule(user_id: int, timezone: str, db: Session = Depends(get_db)):
+    """Set the user's timezone (IANA name, e.g. "Europe/Berlin"); the morning greeting follows it"""
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        return APIResponse(ok=False, error=ErrorInfo(code="USER_NOT_FOUND", message="User not found."))
+    if not greeting_schedule.valid_timezone(timezone):
+        return APIResponse(ok=False, error=ErrorInfo(code="INVALID_TIMEZONE", message="Unknown timezone."))
+
+    due = greeting_schedule.set_timezone(db, user_id, timezone)
+    return APIResponse(ok=True, data={"user_id": user_id, "timezone": timezone, "next_due_at": due})
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files (from benchmarks/run.py).
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/BASE.json benchmarks/results/NEW.json [--fail-over 10]
+
+Exits with status 1 if any scenario's p95 latency or SQL statements per
+request got worse by more than --fail-over percent.
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100.0
+
+
+def _fmt(value: Optional[float], change: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if change is None:
+        return f"{value}"
+    return f"{value} ({change:+.1f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--fail-over", type=float, default=None,
+                        help="fail if p95 or sql/req regresses by more than this percent")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    print(f"{'scenario':<18}{'rps':<22}{'p50 ms':<22}{'p95 ms':<22}{'p99 ms':<22}{'sql/req':<18}")
+
+    regressions = []
+    for name, new_stats in new["scenarios"].items():
+        old_stats = base["scenarios"].get(name)
+        if not old_stats:
+            print(f"{name:<18}(not in base run)")
+            continue
+
+        row = [name.ljust(18)]
+        row.append(_fmt(new_stats["throughput_rps"],
+                        _change(old_stats["throughput_rps"], new_stats["throughput_rps"])).ljust(22))
+        for pct in ("p50", "p95", "p99"):
+            old_value = old_stats["latency_ms"][pct]
+            new_value = new_stats["latency_ms"][pct]
+            change = _change(old_value, new_value)
+            row.append(_fmt(new_value, change).ljust(22))
+            if pct == "p95" and args.fail_over is not None and change is not None and change > args.fail_over:
+                regressions.append(f"{name} p95 {change:+.1f}%")
+
+        sql_change = _change(old_stats.get("sql_per_request"), new_stats.get("sql_per_request"))
+        row.append(_fmt(new_stats.get("sql_per_request"), sql_change).ljust(18))
+        if args.fail_over is not None and sql_change is not None and sql_change > args.fail_over:
+            regressions.append(f"{name} sql/req {sql_change:+.1f}%")
+        print("".join(row))
+
+    if regressions:
+        print("❌ Regressions: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
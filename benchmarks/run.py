@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Drive hot endpoints at a fixed concurrency and report latency percentiles,
+throughput and SQL statements per request.
+
+Two modes:
+- in-process (default): the app is imported and called through
+  TestClient; every SQL statement the engine executes is counted, so
+  results include sql_per_request. Use LLM_PROVIDER=fake for chat.
+- --base-url http://host:8000: a running server is driven over HTTP
+  (sql_per_request is not available).
+
+User ids are sampled from the seeded bench users (see benchmarks/seed.py)
+through DATABASE_URL.
+
+Usage:
+    LLM_PROVIDER=fake python -m benchmarks.run --scenarios chat,notifications --requests 2000 --concurrency 32
+    python -m benchmarks.run --base-url http://127.0.0.1:8000 --scenarios notifications --duration 60
+
+    # Chat is only bounded by the LLM: fails if fewer than --concurrency calls are in flight
+    LLM_PROVIDER=fake LLM_FAKE_LATENCY=fixed:2 python -m benchmarks.run --scenarios chat,chat_stream \
+        --concurrency 40 --requests 40 --check-concurrency
+
+Results are written to benchmarks/results/<timestamp>-<commit>.json;
+compare two runs with benchmarks/compare.py.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, select
+
+from app.database import engine, SessionLocal
+from app.models import User
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_CHAT_MESSAGES = [
+    "hi",
+    "I slept badly last night",
+    "went for a walk today",
+    "feeling a bit stressed",
+    "what should I eat for dinner?",
+]
+
+
+def _device_payload(rng: random.Random, user_id: int) -> Dict:
+    return {
+        "device_id": f"bench-{user_id}",
+        "user_id": user_id,
+        "sensors": {
+            "temperature": round(rng.uniform(36.0, 38.5), 1),
+            "heart_rate": rng.randint(55, 120),
+            "spo2": rng.randint(90, 100),
+            "steps": rng.randint(0, 20000),
+        },
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+# name -> (method, path, request kwargs builder)
+SCENARIOS: Dict[str, tuple] = {
+    "chat": (
+        "POST", "/interact/chat",
+        lambda rng, uid: {"params": {"message": rng.choice(_CHAT_MESSAGES), "user_id": uid}},
+    ),
+    "chat_stream": (
+        "POST", "/interact/chat/stream",
+        lambda rng, uid: {"params": {"message": rng.choice(_CHAT_MESSAGES), "user_id": uid}},
+    ),
+    "notifications": (
+        "GET", "/notifications",
+        lambda rng, uid: {"params": {"user_id": uid, "limit": 20}},
+    ),
+    "pending_commands": (
+        "GET", "/device/pending-commands",
+        lambda rng, uid: {"params": {"user_id": uid}},
+    ),
+    "ingest": (
+        "POST", "/device/data/upload",
+        lambda rng, uid: {"json": _device_payload(rng, uid)},
+    ),
+}
+
+
+class SQLCounter:
+    """Counts statements executed by the app's engine (in-process mode only)"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def reset(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+class InFlightSampler:
+    """
+    Peak number of LLM calls running at the same time (in-process mode
+    only), from the sedi_llm_requests_in_flight gauge sampled every few
+    milliseconds while a scenario runs.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.peak = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        return self.peak
+
+    def _run(self) -> None:
+        from app.core.metrics import LLM_IN_FLIGHT
+
+        while not self._stop.wait(self.interval):
+            current = int(sum(child.value for _, child in LLM_IN_FLIGHT._items()))
+            self.peak = max(self.peak, current)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def sample_user_ids(limit: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        ids = [
+            row[0] for row in db.execute(
+                select(User.id).where(User.name.like("bench_%")).limit(limit)
+            )
+        ]
+    finally:
+        db.close()
+    if not ids:
+        raise SystemExit("No bench users found - run `python -m benchmarks.seed` first")
+    return ids
+
+
+def run_scenario(
+    send: Callable,
+    name: str,
+    user_ids: List[int],
+    concurrency: int,
+    requests: Optional[int],
+    duration: Optional[float],
+    sql_counter: Optional[SQLCounter],
+    seed: int,
+    in_flight: Optional[InFlightSampler] = None,
+) -> Dict:
+    method, path, build = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while True:
+            with lock:
+                if requests is not None and issued[0] >= requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                issued[0] += 1
+            kwargs = build(rng, rng.choice(user_ids))
+            started = time.perf_counter()
+            try:
+                status = str(send(method, path, **kwargs).status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    if sql_counter:
+        sql_counter.reset()
+    if in_flight:
+        in_flight.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for worker_id in range(concurrency):
+            pool.submit(worker, worker_id)
+    wall = time.perf_counter() - started
+    sql_statements = sql_counter.reset() if sql_counter else None
+    llm_in_flight_peak = in_flight.stop() if in_flight else None
+
+    latencies.sort()
+    total = len(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    to_ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "method": method,
+        "path": path,
+        "requests": total,
+        "errors": errors,
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(latencies, 50)),
+            "p95": to_ms(percentile(latencies, 95)),
+            "p99": to_ms(percentile(latencies, 99)),
+            "max": to_ms(latencies[-1] if latencies else None),
+            "mean": to_ms(sum(latencies) / total if total else None),
+        },
+        "sql_per_request": round(sql_statements / total, 2) if sql_statements is not None and total else None,
+        "llm_in_flight_peak": llm_in_flight_peak,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sedi backend load benchmark")
+    parser.add_argument("--scenarios", default="chat,notifications,pending_commands,ingest",
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--duration", type=float, default=None, help="seconds per scenario (overrides --requests)")
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of in-process")
+    parser.add_argument("--users", type=int, default=10000, help="bench user ids to sample")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="result JSON path")
+    parser.add_argument("--check-concurrency", action="store_true",
+                        help="fail unless the chat scenarios reach --concurrency LLM calls in flight "
+                             "(in-process, with a slow fake LLM, e.g. LLM_FAKE_LATENCY=fixed:2)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {unknown}")
+
+    user_ids = sample_user_ids(args.users)
+    sql_counter = None
+    in_flight = None
+    if args.check_concurrency and args.base_url:
+        raise SystemExit("--check-concurrency needs in-process mode (no --base-url)")
+
+    if args.base_url:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=args.concurrency))
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=args.concurrency))
+        base = args.base_url.rstrip("/")
+        send = lambda method, path, **kw: session.request(method, base + path, timeout=120, **kw)
+        mode = "http"
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        client = TestClient(app)
+        client.__enter__()  # Run lifespan (LLM warm-up) once for the whole run
+        sql_counter = SQLCounter()
+        in_flight = InFlightSampler()
+        send = client.request
+        mode = "in-process"
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "mode": mode,
+            "base_url": args.base_url,
+            "database": engine.dialect.name,
+            "llm_provider": os.getenv("LLM_PROVIDER", "openai"),
+            "concurrency": args.concurrency,
+            "requests": None if args.duration else args.requests,
+            "duration": args.duration,
+            "users_sampled": len(user_ids),
+        },
+        "scenarios": {},
+    }
+
+    failures = []
+    for name in names:
+        print(f"▶ {name} ...", flush=True)
+        stats = run_scenario(
+            send, name, user_ids, args.concurrency,
+            None if args.duration else args.requests, args.duration,
+            sql_counter, args.seed, in_flight,
+        )
+        results["scenarios"][name] = stats
+        latency = stats["latency_ms"]
+        print(
+            f"  {stats['requests']} req, {stats['errors']} err, {stats['throughput_rps']} rps, "
+            f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms, "
+            f"sql/req={stats['sql_per_request']}, llm in flight (peak)={stats['llm_in_flight_peak']}"
+        )
+        # Chat must not be capped by anything but the LLM: a request that keeps its
+        # DB connection while the call is awaited caps it at the pool size instead
+        expected = min(args.concurrency, stats["requests"])
+        if args.check_concurrency and name.startswith("chat") and stats["llm_in_flight_peak"] < expected:
+            failures.append(f"{name}: {stats['llm_in_flight_peak']} LLM calls in flight, expected {expected}")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['commit'] or 'nogit'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"✅ Results saved to {output}")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
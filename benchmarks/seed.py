@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Seed a database with realistic volumes for benchmarks.
+
+Creates bench users (name prefix "bench_") plus Memory, HealthData and
+Notification rows spread over the last 90 days, and the matching
+conversation_state rows. On PostgreSQL rows are loaded with COPY,
+elsewhere with multi-row INSERTs.
+
+Usage (from backend root, DATABASE_URL pointing at a scratch database):
+    python -m benchmarks.seed --users 100000 --memory 2000000 --health 1000000 --notifications 1000000
+    python -m benchmarks.seed --users 1000 --memory 20000 --health 10000 --notifications 10000   # laptop
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, select
+
+from app.database import engine, Base
+from app.models import User, Memory, HealthData, Notification, ConversationState
+from app.core.conversation.stages import stage_for_count
+
+BENCH_PREFIX = "bench_"
+BATCH_SIZE = 20000
+
+_MESSAGES = [
+    ("hi", "Hello. How are you today?"),
+    ("I slept badly", "I'm sorry to hear that. Take it easy today 🌿"),
+    ("went for a walk", "That sounds lovely. How did it feel?"),
+    ("feeling stressed", "I hear you. Would you like to talk about it?"),
+    ("thanks", "Anytime 😊"),
+]
+_NOTIFICATION_TYPES = ["info", "alert", "reminder", "check_in", "achievement"]
+_PRIORITIES = ["low", "normal", "high", "urgent"]
+
+
+def _copy_rows(table, columns: List[str], rows: List[Dict]) -> None:
+    """PostgreSQL COPY FROM STDIN (CSV) - an order of magnitude faster than INSERT"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def bulk_insert(model, rows: Iterable[Dict]) -> int:
+    """Insert rows in batches; returns number of rows written"""
+    table = model.__table__
+    total = 0
+    batch: List[Dict] = []
+
+    def flush():
+        if not batch:
+            return
+        if engine.dialect.name == "postgresql":
+            _copy_rows(table, list(batch[0].keys()), batch)
+        else:
+            with engine.begin() as conn:
+                conn.execute(table.insert(), batch)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+            total += len(batch)
+            batch = []
+    flush()
+    return total + len(batch)
+
+
+def _per_user_counts(rng: random.Random, user_ids: List[int], total: int) -> Dict[int, int]:
+    """Skewed distribution: most users have a few rows, some have many"""
+    weights = [rng.paretovariate(1.5) for _ in user_ids]
+    scale = total / sum(weights)
+    return {uid: int(w * scale) for uid, w in zip(user_ids, weights)}
+
+
+def _timestamps(rng: random.Random, now: datetime, count: int) -> List[datetime]:
+    return sorted(now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600)) for _ in range(count))
+
+
+def seed(users: int, memory: int, health: int, notifications: int, seed_value: int = 7) -> None:
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    Base.metadata.create_all(bind=engine)
+
+    started = time.time()
+    run_tag = f"{BENCH_PREFIX}{int(started)}_"
+    languages = ["en"] * 6 + ["fa"] * 3 + ["ar"]
+    bulk_insert(User, (
+        {
+            "name": f"{run_tag}{i}",
+            "secret_key": "bench",
+            "preferred_language": rng.choice(languages),
+            "created_at": now - timedelta(days=rng.randint(0, 365)),
+        }
+        for i in range(users)
+    ))
+    with engine.connect() as conn:
+        user_ids = [
+            row[0] for row in conn.execute(
+                select(User.id).where(User.name.like(f"{run_tag}%"))
+            )
+        ]
+    print(f"users: {len(user_ids)} ({time.time() - started:.1f}s)")
+
+    memory_counts = _per_user_counts(rng, user_ids, memory)
+
+    def memory_rows():
+        for uid, count in memory_counts.items():
+            for created_at in _timestamps(rng, now, count):
+                user_message, sedi_response = rng.choice(_MESSAGES)
+                yield {
+                    "user_id": uid,
+                    "user_message": user_message,
+                    "sedi_response": sedi_response,
+                    "language": "en",
+                    "created_at": created_at,
+                }
+
+    written = bulk_insert(Memory, memory_rows())
+    print(f"memory: {written} ({time.time() - started:.1f}s)")
+
+    # conversation_state rows consistent with the seeded Memory
+    with engine.connect() as conn:
+        aggregates = conn.execute(
+            select(Memory.user_id, func.count(Memory.id), func.min(Memory.created_at), func.max(Memory.created_at))
+            .where(Memory.user_id.in_(select(User.id).where(User.name.like(f"{run_tag}%"))))
+            .group_by(Memory.user_id)
+        ).all()
+    bulk_insert(ConversationState, (
+        {
+            "user_id": uid,
+            "message_count": count,
+            "stage": stage_for_count(count).value,
+            "first_contact_at": first,
+            "last_interaction_at": last,
+        }
+        for uid, count, first, last in aggregates
+    ))
+    print(f"conversation_state: {len(aggregates)} ({time.time() - started:.1f}s)")
+
+    health_counts = _per_user_counts(rng, user_ids, health)
+
+    def health_rows():
+        for uid, count in health_counts.items():
+            for created_at in _timestamps(rng, now, count):
+                yield {
+                    "user_id": uid,
+                    "heart_rate": str(rng.randint(55, 120)),
+                    "temperature": str(round(rng.uniform(36.0, 38.5), 1)),
+                    "spo2": str(rng.randint(90, 100)),
+                    "created_at": created_at,
+                }
+
+    written = bulk_insert(HealthData, health_rows())
+    print(f"health_data: {written} ({time.time() - started:.1f}s)")
+
+    notification_counts = _per_user_counts(rng, user_ids, notifications)
+
+    def notification_rows():
+        for uid, count in notification_counts.items():
+            for created_at in _timestamps(rng, now, count):
+                yield {
+                    "user_id": uid,
+                    "type": rng.choice(_NOTIFICATION_TYPES),
+                    "priority": rng.choice(_PRIORITIES),
+                    "title": None,
+                    "message": "Remember to drink some water 🌿",
+                    "is_read": rng.random() < 0.7,
+                    "created_at": created_at,
+                }
+
+    written = bulk_insert(Notification, notification_rows())
+    print(f"notifications: {written} ({time.time() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--memory", type=int, default=2000000)
+    parser.add_argument("--health", type=int, default=1000000)
+    parser.add_argument("--notifications", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    seed(args.users, args.memory, args.health, args.notifications, args.seed)
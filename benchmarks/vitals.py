@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Throughput of the vitals pipeline (app/core/signal_processing.py) in
+samples per second, on one core and through the worker pool.
+
+Synthetic ECG / PPG (known RR intervals, baseline wander, noise) is
+chunked and compressed like app/core/waveforms.py stores it, so the
+measured time includes decompression, filtering, beat detection and
+HR/HRV per window - everything a pool worker does. No database.
+
+Usage:
+    python -m benchmarks.vitals --signal ecg --rate 250 --minutes 5 --groups 64 --workers 4
+
+Results are written to benchmarks/results/<timestamp>-<commit>-vitals.json
+(not comparable with benchmarks/compare.py, which reads run.py results).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.signal_processing import analyze_group
+from benchmarks.run import RESULTS_DIR, _git_commit
+
+CHUNK_SECONDS = 10.0
+
+
+def synthetic_waveform(signal: str, rate: float, seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Beat template convolved with a beat train (HR 55-100, ~40 ms HRV), plus wander and noise"""
+    n = int(rate * seconds)
+    rr = rng.uniform(0.6, 1.1) + rng.normal(0, 0.04, int(seconds / 0.5))
+    beats = (np.cumsum(rr) * rate).astype(np.intp)
+    train = np.zeros(n)
+    train[beats[beats < n]] = 1.0
+    t = np.arange(int(0.8 * rate)) / rate
+    if signal == "ecg":
+        template = np.exp(-((t - 0.1) / 0.012) ** 2) + 0.2 * np.exp(-((t - 0.35) / 0.06) ** 2)
+    else:
+        template = np.exp(-((t - 0.2) / 0.09) ** 2) + 0.35 * np.exp(-((t - 0.5) / 0.08) ** 2)
+    wave = np.convolve(train, template)[:n]
+    timeline = np.arange(n) / rate
+    wave += 0.3 * np.sin(2 * np.pi * 0.25 * timeline) + rng.normal(0, 0.03, n)
+    return wave.astype(np.float32)
+
+
+def synthetic_groups(signal: str, rate: float, minutes: float, groups: int, seed: int) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    per_chunk = int(rate * CHUNK_SECONDS)
+    start = datetime(2025, 1, 1)
+    result = []
+    for user_id in range(1, groups + 1):
+        wave = synthetic_waveform(signal, rate, minutes * 60, rng)
+        result.append({
+            "user_id": user_id,
+            "device_id": f"bench-{user_id}",
+            "signal": signal,
+            "chunks": [
+                {
+                    "start_ts": start + timedelta(seconds=first / rate),
+                    "sample_rate": rate,
+                    "dtype": "float32",
+                    "data": zlib.compress(wave[first:first + per_chunk].tobytes(), 1),
+                }
+                for first in range(0, len(wave), per_chunk)
+            ],
+        })
+    return result
+
+
+def measure(executor_map, groups: List[Dict]) -> Dict:
+    started = time.perf_counter()
+    results = list(executor_map(analyze_group, groups))
+    wall = time.perf_counter() - started
+    samples = sum(result["samples"] for result in results)
+    return {
+        "samples": samples,
+        "points": sum(len(result["points"]) for result in results),
+        "wall_seconds": round(wall, 3),
+        "samples_per_second": round(samples / wall) if wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sedi vitals pipeline throughput")
+    parser.add_argument("--signal", choices=("ecg", "ppg"), default="ecg")
+    parser.add_argument("--rate", type=float, default=250.0, help="sample rate (Hz)")
+    parser.add_argument("--minutes", type=float, default=5.0, help="waveform length per group")
+    parser.add_argument("--groups", type=int, default=64, help="users (analyze_group calls)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool processes, 0 = single core only")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="result JSON path")
+    args = parser.parse_args()
+
+    groups = synthetic_groups(args.signal, args.rate, args.minutes, args.groups, args.seed)
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "signal": args.signal,
+            "sample_rate": args.rate,
+            "minutes_per_group": args.minutes,
+            "groups": args.groups,
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+        },
+    }
+
+    print("▶ single core ...", flush=True)
+    analyze_group(groups[0])  # Warm-up (FFT plans, page faults)
+    single = measure(map, groups)
+    results["single_core"] = single
+    print(f"  {single['samples']} samples in {single['wall_seconds']}s: {single['samples_per_second']} samples/s")
+
+    if args.workers > 0:
+        print(f"▶ pool of {args.workers} ...", flush=True)
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(analyze_group, groups[:args.workers]))  # Start the workers, import NumPy
+            pooled = measure(pool.map, groups)
+        pooled["workers"] = args.workers
+        pooled["samples_per_second_per_core"] = (
+            round(pooled["samples_per_second"] / min(args.workers, os.cpu_count() or 1))
+            if pooled["samples_per_second"] else None
+        )
+        results["pool"] = pooled
+        print(
+            f"  {pooled['samples_per_second']} samples/s, "
+            f"{pooled['samples_per_second_per_core']} samples/s per core"
+        )
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['commit'] or 'nogit'}-vitals.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"✅ Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
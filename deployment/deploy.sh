@@ -37,6 +37,11 @@ ssh ${SERVER_USER}@${SERVER_IP} << 'ENDSSH'
     # Enable service
     sudo systemctl enable sedi-backend
     
+    # Database schema before the new code starts (idempotent, see scripts/README.md)
+    cd /var/www/sedi/backend
+    sudo .venv/bin/python scripts/apply_columns.py || { echo "❌ Column migration failed"; exit 1; }
+    sudo .venv/bin/python scripts/apply_indexes.py || echo "⚠️  Index migration failed, continuing..."
+    
     # Start service
     sudo systemctl restart sedi-backend
     
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Add columns declared in app/models.py that are missing on an existing
+database.
+
+Base.metadata.create_all() creates missing tables but never alters
+existing ones. Only nullable columns without a server default are added
+(ALTER TABLE ... ADD COLUMN), which is a metadata-only change on
+PostgreSQL and does not rewrite the table. Anything else is reported and
+left for a manual migration. Idempotent. Run apply_indexes.py afterwards
+for indexes on the new columns.
+
+Usage (from backend root):
+    python scripts/apply_columns.py            # add missing columns
+    python scripts/apply_columns.py --dry-run  # only print the statements
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from app.database import engine, Base
+import app.models  # noqa: F401  (registers tables on Base.metadata)
+
+
+def apply_columns(dry_run: bool = False) -> int:
+    """Add missing nullable columns; returns the number of statements executed"""
+    missing_tables = set(Base.metadata.tables) - set(inspect(engine).get_table_names())
+    for name in sorted(missing_tables):
+        print(f"CREATE TABLE {name}" + (" (dry run: not created)" if dry_run else ""))
+    if not dry_run:
+        Base.metadata.create_all(bind=engine)  # New tables, with all their columns
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    executed = 0
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name in missing_tables:
+                continue  # Created with all its columns (or would be)
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable or column.server_default is not None:
+                    print(f"⚠️ {table.name}.{column.name} needs a manual migration (NOT NULL or server default)")
+                    continue
+
+                statement = (
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                )
+                print(statement)
+                if dry_run:
+                    continue
+                conn.execute(text(statement))
+                executed += 1
+
+    return executed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add missing nullable model columns")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    count = apply_columns(dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"✅ Columns added: {count}")
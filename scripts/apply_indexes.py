@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Create indexes declared in app/models.py on an existing database.
+
+Base.metadata.create_all() only creates indexes together with new
+tables, so indexes added to existing tables have to be applied here.
+On PostgreSQL every index is built with CREATE INDEX CONCURRENTLY, which
+does not block inserts/updates while it runs (it cannot run inside a
+transaction, so each statement is autocommitted). Invalid leftovers of an
+interrupted concurrent build are dropped and rebuilt. Idempotent.
+
+Usage (from backend root):
+    python scripts/apply_indexes.py            # apply missing indexes
+    python scripts/apply_indexes.py --dry-run  # only print the statements
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import engine, Base
+import app.models  # noqa: F401  (registers tables and indexes on Base.metadata)
+
+
+def _invalid_index_exists(conn, name: str) -> bool:
+    """True if a failed CONCURRENTLY build left an INVALID index behind"""
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first() is not None
+
+
+def apply_indexes(dry_run: bool = False) -> int:
+    """Create missing indexes; returns the number of statements executed"""
+    postgres = engine.dialect.name == "postgresql"
+    executed = 0
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if postgres and not dry_run:
+            # Large tables take a while; don't let a server-side default abort the build,
+            # but never wait long for the brief lock at the start/end of the build
+            conn.execute(text("SET statement_timeout = 0"))
+            conn.execute(text("SET lock_timeout = '10s'"))
+
+        for table in Base.metadata.sorted_tables:
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if postgres:
+                    index.dialect_options["postgresql"]["concurrently"] = True
+                    if not dry_run and _invalid_index_exists(conn, index.name):
+                        print(f"⚠️ Dropping invalid index {index.name}")
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+
+                statement = CreateIndex(index, if_not_exists=True)
+                print(str(statement.compile(dialect=engine.dialect)).strip())
+                if dry_run:
+                    continue
+
+                started = time.time()
+                conn.execute(statement)
+                executed += 1
+                print(f"   done in {time.time() - started:.1f}s")
+
+            if postgres and not dry_run and table.indexes:
+                conn.execute(text(f'ANALYZE "{table.name}"'))
+
+    return executed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply model indexes without blocking writes")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    count = apply_indexes(dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"✅ Index statements applied: {count}")
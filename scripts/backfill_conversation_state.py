@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Backfill conversation_state rows for users who chatted before the table
+existed. Idempotent - users that already have a row are skipped.
+
+Usage (from backend root):
+    python scripts/backfill_conversation_state.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, engine, Base
+from app.core.conversation.memory import backfill_conversation_state
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        created = backfill_conversation_state(db)
+        print(f"✅ conversation_state rows created: {created}")
+    finally:
+        db.close()
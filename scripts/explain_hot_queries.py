@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN the hot queries against a seeded database and flag plans that
+scan or sort a whole table instead of using an index.
+
+The queries mirror what the API and scheduler run per request. They are
+explained for the user with the most rows (worst case), so run this
+against a database seeded with benchmarks/seed.py - on tiny tables the
+planner prefers sequential scans and the check is meaningless.
+
+Usage (from backend root):
+    python scripts/explain_hot_queries.py
+    python scripts/explain_hot_queries.py --analyze --output plans.json
+
+Exits with status 1 if any query that should be index-backed is not.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+
+from app.database import engine
+from app.models import User, Memory, HealthData, Notification, DeviceCommand, WaveformChunk
+from app.core.scheduler import CHUNK_SIZE, inactive_users_statement
+from app.core.greeting_schedule import due_statement
+from app.core.waveforms import CHUNK_SECONDS as WAVEFORM_CHUNK_SECONDS
+from app.core.signal_processing import window_start
+from app.core.vitals import BATCH_CHUNKS as VITALS_BATCH_CHUNKS, SETTLE_SECONDS as VITALS_SETTLE_SECONDS
+
+HOT_TABLES = {"memory", "health_data", "notifications", "conversation_state", "greeting_schedule", "device_commands", "waveform_chunks"}
+
+
+def hot_queries(user_id: int) -> Dict[str, tuple]:
+    """name -> (statement, expect_index)"""
+    inactive_threshold = datetime.utcnow() - timedelta(hours=3)
+    waveform_start = datetime.utcnow() - timedelta(hours=1)
+    return {
+        # ConversationMemory.get_recent_messages
+        "recent_messages": (
+            select(Memory).where(Memory.user_id == user_id)
+            .order_by(Memory.created_at.desc()).limit(5),
+            True,
+        ),
+        # ConversationMemory.load_snapshot (users without a conversation_state row)
+        "memory_count": (
+            select(func.count(Memory.id), func.max(Memory.created_at)).where(Memory.user_id == user_id),
+            True,
+        ),
+        # GET /notifications
+        "notifications_page": (
+            select(Notification).where(Notification.user_id == user_id, Notification.release_at.is_(None))
+            .order_by(Notification.created_at.desc()).offset(0).limit(20),
+            True,
+        ),
+        "notifications_total": (
+            select(func.count()).select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.release_at.is_(None)),
+            True,
+        ),
+        "notifications_unread": (
+            select(func.count()).select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.is_read == False, Notification.release_at.is_(None)),
+            True,
+        ),
+        # GET /device/pending-commands: rows a claim takes (partial index on pending commands)
+        "pending_commands": (
+            select(DeviceCommand.id)
+            .where(DeviceCommand.user_id == user_id, DeviceCommand.status == "pending")
+            .order_by(DeviceCommand.id).limit(20),
+            True,
+        ),
+        # GET /device/waveform: chunks overlapping a 1-minute window (see waveforms.read_window)
+        "waveform_window": (
+            select(WaveformChunk)
+            .where(
+                WaveformChunk.user_id == user_id,
+                WaveformChunk.signal == "ecg",
+                WaveformChunk.start_ts > waveform_start - timedelta(seconds=WAVEFORM_CHUNK_SECONDS),
+                WaveformChunk.start_ts < waveform_start + timedelta(minutes=1),
+                WaveformChunk.end_ts > waveform_start,
+            )
+            .order_by(WaveformChunk.start_ts),
+            True,
+        ),
+        # Scheduler: one page of one stream in vitals_derivation (see vitals._stream_pages)
+        "vitals_pending": (
+            select(WaveformChunk.id, WaveformChunk.start_ts, WaveformChunk.data)
+            .where(
+                WaveformChunk.user_id == user_id,
+                WaveformChunk.device_id == "explain",
+                WaveformChunk.signal == "ecg",
+                WaveformChunk.processed_at.is_(None),
+                WaveformChunk.start_ts < window_start(datetime.utcnow() - timedelta(seconds=VITALS_SETTLE_SECONDS)),
+            )
+            .order_by(WaveformChunk.start_ts).limit(VITALS_BATCH_CHUNKS),
+            True,
+        ),
+        # GET /medical/records, POST /ai_core/analyze
+        "latest_health": (
+            select(HealthData).where(HealthData.user_id == user_id)
+            .order_by(HealthData.created_at.desc()).limit(1),
+            True,
+        ),
+        # Scheduler: one keyset chunk of check_inactive_users (walks users by primary key)
+        "inactive_users_chunk": (
+            inactive_users_statement(inactive_threshold)
+            .where(User.id > 0).order_by(User.id).limit(CHUNK_SIZE),
+            True,
+        ),
+        # Scheduler: release of pre-generated notifications (partial index)
+        "release_due": (
+            select(Notification.id)
+            .where(Notification.release_at.isnot(None), Notification.release_at <= datetime.utcnow()),
+            True,
+        ),
+        # Scheduler: one keyset chunk of due morning greetings. Range scan on
+        # next_due_at; the sort by user id only covers the minute's due slice
+        "due_greetings_chunk": (
+            due_statement(datetime.utcnow())
+            .where(User.id > 0).order_by(User.id).limit(CHUNK_SIZE),
+            False,
+        ),
+    }
+
+
+def _busiest_user(conn) -> int:
+    row = conn.execute(
+        select(Notification.user_id).group_by(Notification.user_id)
+        .order_by(func.count().desc()).limit(1)
+    ).first()
+    if row is None:
+        row = conn.execute(select(User.id).limit(1)).first()
+    if row is None:
+        raise SystemExit("Database is empty - run `python -m benchmarks.seed` first")
+    return row[0]
+
+
+def _walk(node: Dict, nodes: List[Dict]) -> None:
+    nodes.append(node)
+    for child in node.get("Plans", []):
+        _walk(child, nodes)
+
+
+def explain_postgres(conn, sql: str, analyze: bool) -> Dict:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    plan = conn.execute(text(f"EXPLAIN ({options}) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    nodes: List[Dict] = []
+    _walk(root["Plan"], nodes)
+
+    issues = []
+    for node in nodes:
+        relation = node.get("Relation Name")
+        if node["Node Type"] == "Seq Scan" and relation in HOT_TABLES:
+            issues.append(f"Seq Scan on {relation}")
+        if node["Node Type"] in ("Sort", "Incremental Sort"):
+            issues.append(f"{node['Node Type']} ({', '.join(node.get('Sort Key', []))})")
+
+    summary = []
+    for node in nodes:
+        label = node["Node Type"]
+        if node.get("Index Name"):
+            label += f" using {node['Index Name']}"
+        elif node.get("Relation Name"):
+            label += f" on {node['Relation Name']}"
+        summary.append(label)
+
+    return {
+        "plan": summary,
+        "total_cost": root["Plan"].get("Total Cost"),
+        "execution_ms": root.get("Execution Time"),
+        "issues": issues,
+    }
+
+
+def explain_sqlite(conn, sql: str, analyze: bool) -> Dict:
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    details = [row[-1] for row in rows]
+    issues = []
+    for detail in details:
+        words = detail.split()
+        if words[:1] == ["SCAN"] and len(words) > 1 and words[1] in HOT_TABLES and "INDEX" not in detail:
+            issues.append(detail)
+        if "TEMP B-TREE" in detail:
+            issues.append(detail)
+    return {"plan": details, "total_cost": None, "execution_ms": None, "issues": issues}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN hot queries and flag full scans/sorts")
+    parser.add_argument("--user-id", type=int, default=None, help="default: user with most notifications")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (PostgreSQL; runs the queries)")
+    parser.add_argument("--output", default=None, help="write plans as JSON for later comparison")
+    args = parser.parse_args()
+
+    explain = explain_postgres if engine.dialect.name == "postgresql" else explain_sqlite
+    results = {}
+    failed = []
+
+    with engine.connect() as conn:
+        user_id = args.user_id or _busiest_user(conn)
+        print(f"Explaining hot queries for user_id={user_id} ({engine.dialect.name})\n")
+
+        for name, (statement, expect_index) in hot_queries(user_id).items():
+            sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            result = explain(conn, sql, args.analyze)
+            result["expect_index"] = expect_index
+            results[name] = result
+
+            status = "✅"
+            if result["issues"] and expect_index:
+                status = "❌"
+                failed.append(name)
+            elif result["issues"]:
+                status = "➖"
+            timing = f", {result['execution_ms']:.2f} ms" if result["execution_ms"] is not None else ""
+            print(f"{status} {name}{timing}")
+            for line in result["plan"]:
+                print(f"     {line}")
+            for issue in result["issues"]:
+                print(f"     ! {issue}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"dialect": engine.dialect.name, "user_id": user_id, "queries": results}, f, indent=2)
+        print(f"\nPlans saved to {args.output}")
+
+    if failed:
+        print(f"\n❌ Not index-backed: {', '.join(failed)}")
+        sys.exit(1)
+    print("\n✅ All hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Delete the "Heartbeat" notifications that /device/heartbeat used to
+insert on every call (device status now lives in device_status).
+
+Deletes in batches of --batch-size ids, one short transaction each, so
+the notifications table is never locked for long. Idempotent.
+
+Usage (from backend root):
+    python scripts/purge_heartbeat_notifications.py --dry-run   # only count
+    python scripts/purge_heartbeat_notifications.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select
+
+from app.database import SessionLocal
+from app.models import Notification
+
+
+def _heartbeat_rows():
+    return (Notification.type == "info") & (Notification.title == "Heartbeat")
+
+
+def purge(batch_size: int = 5000, dry_run: bool = False) -> int:
+    """Delete heartbeat notifications; returns the number of rows deleted (or found with dry_run)"""
+    with SessionLocal() as db:
+        if dry_run:
+            return db.execute(select(func.count(Notification.id)).where(_heartbeat_rows())).scalar() or 0
+
+        deleted = 0
+        while True:
+            ids = db.execute(
+                select(Notification.id).where(_heartbeat_rows()).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return deleted
+            db.execute(
+                delete(Notification)
+                .where(Notification.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            deleted += len(ids)
+            print(f"   {deleted} deleted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stored device heartbeat notifications")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    count = purge(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(f"✅ Heartbeat notifications {'found' if args.dry_run else 'deleted'}: {count}")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Signal Processing Test Script
+Checks app/core/signal_processing.py against synthetic signals with known
+RR intervals (no database, no server)
+"""
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core import signal_processing as sp
+
+RATE = 250.0
+CHUNK_SECONDS = 10.0
+START = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def synthetic_ecg(rr: np.ndarray, seconds: float, rate: float = RATE) -> np.ndarray:
+    """QRS-like spikes at the cumulative sums of `rr`, plus a T wave, breathing wander and noise"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    wave = 0.3 * np.sin(2 * np.pi * 0.25 * t) + rng.normal(0, 0.02, len(t))
+    for beat in np.cumsum(rr):
+        if beat < seconds - 0.5:
+            wave += np.exp(-((t - beat) / 0.012) ** 2) + 0.2 * np.exp(-((t - beat - 0.25) / 0.06) ** 2)
+    return wave.astype(np.float32)
+
+
+def chunked(wave: np.ndarray, start: datetime = START, rate: float = RATE) -> List[Dict[str, Any]]:
+    """Compressed CHUNK_SECONDS chunks, like app/core/waveforms.py stores them"""
+    per_chunk = int(rate * CHUNK_SECONDS)
+    return [
+        {
+            "start_ts": start + timedelta(seconds=first / rate),
+            "sample_rate": rate,
+            "dtype": "float32",
+            "data": zlib.compress(wave[first:first + per_chunk].tobytes(), 1),
+        }
+        for first in range(0, len(wave), per_chunk)
+    ]
+
+
+def report(name: str, issues: list) -> Dict[str, Any]:
+    if issues:
+        for issue in issues:
+            print(f"❌ {issue}")
+    else:
+        print(f"✅ {name}")
+    return {"ok": not issues, "issues": issues}
+
+
+def test_known_rr_metrics() -> None:
+    """Known RR intervals give the expected HR, RMSSD and SDNN"""
+    print(f"\n{'='*60}")
+    print("TEST 1: known RR -> HR / RMSSD / SDNN")
+    print(f"{'='*60}")
+    issues = []
+
+    # Alternating 0.8 s / 0.9 s: HR 70.6 bpm, RMSSD 100 ms, SDNN ~50.6 ms
+    rr = np.tile([0.8, 0.9], 20)
+    metrics = sp.beat_metrics(rr)
+    expected = {
+        "heart_rate": 60.0 / rr.mean(),
+        "hrv_rmssd": 100.0,
+        "hrv_sdnn": rr.std(ddof=1) * 1000,
+    }
+    if metrics is None:
+        issues.append("beat_metrics returned None for 40 clean intervals")
+    else:
+        for key, value in expected.items():
+            if abs(metrics[key] - value) > 1e-6:
+                issues.append(f"beat_metrics {key}: {metrics[key]:.3f}, expected {value:.3f}")
+
+    # The same RR intervals through the whole pipeline: one point per aligned minute
+    true_rr = np.tile([0.8, 0.9], 100)
+    result = sp.analyze_group({"user_id": 1, "signal": "ecg", "chunks": chunked(synthetic_ecg(true_rr, 120))})
+    points = result["points"]
+    print(f"Points: {points}")
+    if [point["created_at"] for point in points] != [START + timedelta(minutes=1), START + timedelta(minutes=2)]:
+        issues.append("expected one point at the end of each of the two minutes")
+    for point in points:
+        if abs(int(point["heart_rate"]) - 71) > 1:
+            issues.append(f"{point['created_at']}: HR {point['heart_rate']}, expected 71")
+        # Beats are located to the sample (4 ms at 250 Hz): HRV within 15%
+        if point["hrv_rmssd"] is None or abs(point["hrv_rmssd"] - 100.0) > 15:
+            issues.append(f"{point['created_at']}: RMSSD {point['hrv_rmssd']}, expected ~100")
+        if point["hrv_sdnn"] is None or abs(point["hrv_sdnn"] - 50.1) > 7.5:
+            issues.append(f"{point['created_at']}: SDNN {point['hrv_sdnn']}, expected ~50")
+    if result["samples"] != int(120 * RATE):
+        issues.append(f"samples analyzed: {result['samples']}, expected {int(120 * RATE)}")
+
+    assert report("known RR metrics", issues)["ok"]
+
+
+def test_gap_splits_run() -> None:
+    """A missing chunk splits the run: no RR interval spans the gap"""
+    print(f"\n{'='*60}")
+    print("TEST 2: gap splits a run")
+    print(f"{'='*60}")
+    issues = []
+
+    chunks = chunked(synthetic_ecg(np.full(200, 0.75), 120))
+    del chunks[3]  # 00:30 .. 00:40 never arrived
+    runs = sp._runs(chunks)
+    if len(runs) != 2:
+        issues.append(f"{len(runs)} runs, expected 2")
+    elif runs[0]["count"] != int(30 * RATE):
+        issues.append(f"first run has {runs[0]['count']} samples, expected {int(30 * RATE)}")
+
+    # The first minute keeps its 50 s of data and its HR (80 bpm)
+    points = sp.analyze_group({"user_id": 1, "signal": "ecg", "chunks": chunks})["points"]
+    print(f"Points: {points}")
+    if len(points) != 2:
+        issues.append(f"{len(points)} points, expected 2")
+    for point in points:
+        if abs(int(point["heart_rate"]) - 80) > 1:
+            issues.append(f"{point['created_at']}: HR {point['heart_rate']}, expected 80")
+
+    # Both sides of the gap still belong to the same (aligned) minute
+    if sp.window_start(chunks[3]["start_ts"]) != sp.window_start(chunks[0]["start_ts"]):
+        issues.append("chunks of the same minute fall in different windows")
+
+    # Less than MIN_WINDOW_SECONDS of data in a window gives no point
+    short = sp.analyze_group({"user_id": 1, "signal": "ecg", "chunks": chunked(synthetic_ecg(np.full(20, 0.75), 5))})
+    if short["points"]:
+        issues.append("5 s of data gave a point")
+
+    assert report("gap splits run", issues)["ok"]
+
+
+def test_flat_line() -> None:
+    """A flat line (lead off, sensor not worn) gives no point"""
+    print(f"\n{'='*60}")
+    print("TEST 3: flat line")
+    print(f"{'='*60}")
+    issues = []
+
+    for signal in ("ecg", "ppg"):
+        wave = np.zeros(int(120 * RATE), dtype=np.float32)
+        result = sp.analyze_group({"user_id": 1, "signal": signal, "chunks": chunked(wave)})
+        if result["points"]:
+            issues.append(f"{signal}: {len(result['points'])} point(s) from a flat line")
+        if result["samples"] != len(wave):
+            issues.append(f"{signal}: samples analyzed {result['samples']}, expected {len(wave)}")
+
+    assert report("flat line", issues)["ok"]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for test in (test_known_rr_metrics, test_gap_splits_run, test_flat_line):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+
+    print("\n" + "="*60)
+    print("TEST COMPLETE" if not failed else f"TEST FAILED ({failed})")
+    print("="*60)
+    raise SystemExit(1 if failed else 0)